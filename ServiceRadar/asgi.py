@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ServiceRadar.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Django yüklendikten sonra import edilmeli (ayarlar ve modeller gerekli)
+from core.notifications import STREAM_PATH, sse_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """Bildirim akışını (SSE) doğrudan karşılar, diğer tüm istekleri Django'ya iletir."""
+    if scope['type'] == 'http' and scope['path'] == STREAM_PATH:
+        await sse_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
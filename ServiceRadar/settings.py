@@ -5,7 +5,9 @@ Generated by 'django-admin startproject' using Django 5.2.8.
 """
 
 from pathlib import Path
-from datetime import timedelta # JWT için timedelta import edildi
+from datetime import datetime, time, timedelta # JWT için timedelta import edildi
+from zoneinfo import ZoneInfo
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -24,6 +26,11 @@ FERNET_KEY = os.environ.get(
     'rX2q1N1s574r61MO9tdQk_lsFlbqBZwbqWEkyWbOTfQ='
 )
 
+# Anahtar rotasyonu: FERNET_KEYS="yeni_anahtar,eski_anahtar" (virgülle ayrılmış, en yenisi başta).
+# Şifreleme her zaman ilk anahtarla yapılır, çözme listedeki tüm anahtarlarla denenir.
+# Eski anahtarla şifreli kayıtlar `manage.py rotate_fernet_keys` ile yeni anahtara taşınır.
+FERNET_KEYS = [key.strip() for key in os.environ.get('FERNET_KEYS', '').split(',') if key.strip()] or [FERNET_KEY]
+
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
@@ -68,6 +75,8 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     # CORS Middleware'ı SecurityMiddleware'den hemen sonra olmalı
     'corsheaders.middleware.CorsMiddleware', 
+    # Katalog okumalarını replikaya, yazma sonrası okumaları primary'e yönlendirir
+    'core.replicas.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -78,6 +87,13 @@ MIDDLEWARE = [
     'allauth.account.middleware.AccountMiddleware',
 ]
 
+# Geliştirmede bir istek içinde tekrarlanan aynı SQL'i (N+1) çağrı yığınıyla loglar;
+# aynı SQL metni eşik kadar veya aynı parametrelerle iki kez çalışırsa uyarı verilir
+QUERY_DEBUG = os.environ.get('QUERY_DEBUG', str(DEBUG)).lower() in ('1', 'true', 'yes')
+QUERY_DEBUG_REPEAT_THRESHOLD = 3
+if QUERY_DEBUG:
+    MIDDLEWARE.append('core.querylog.RepeatedQueryMiddleware')
+
 ROOT_URLCONF = 'ServiceRadar.urls'
 
 TEMPLATES = [
@@ -108,6 +124,58 @@ DATABASES = {
     }
 }
 
+# Üretim SQLite profili: DB_PROFILE=sqlite-production
+# Q-Cluster worker'ları ve web worker'ları aynı anda yazarken "database is locked"
+# hatalarını önlemek için WAL modu, bekleme süresi ve bellek ayarları her bağlantıda uygulanır.
+DB_PROFILE = os.environ.get('DB_PROFILE', 'default')
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',        # Okuyucular yazarı, yazar okuyucuları bloklamaz
+    'synchronous': 'NORMAL',      # WAL ile güvenli; her commit'te fsync yapılmaz
+    'busy_timeout': 5000,         # Kilitli veritabanında hata vermeden önce 5 sn bekle
+    'mmap_size': 268435456,       # 256 MB bellek eşlemeli okuma
+    'cache_size': -65536,         # Bağlantı başına 64 MB sayfa önbelleği
+    'temp_store': 'MEMORY',
+}
+
+if DB_PROFILE == 'sqlite-production':
+    DATABASES['default']['OPTIONS'] = {
+        'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+        # Yazma transaction'ları kilidi başta alır; okuma kilidinden yazmaya yükseltirken oluşan
+        # ve busy_timeout'un çözemediği SQLITE_BUSY hatalarını engeller
+        'transaction_mode': 'IMMEDIATE',
+        # Bekleme süresi yalnızca PRAGMA busy_timeout ile verilir; sqlite3 'timeout' seçeneği
+        # init_command tarafından ezileceği için ayrıca ayarlanmaz
+    }
+
+# Okuma replikaları: DB_REPLICAS="/yol/replica1.sqlite3,/yol/replica2.sqlite3"
+# Yerel kurulumda replikalar primary'nin dosya kopyasıdır (bkz. `manage.py sync_replicas`).
+# Başka bir backend'deki replikalar DATABASES'e eklenip DB_REPLICA_ALIASES'e yazılabilir.
+DB_REPLICA_ALIASES = []
+for index, path in enumerate(filter(None, map(str.strip, os.environ.get('DB_REPLICAS', '').split(','))), start=1):
+    alias = f'replica_{index}'
+    options = dict(DATABASES['default'].get('OPTIONS', {}))
+    options.pop('transaction_mode', None)
+    options['init_command'] = ';'.join(filter(None, [options.get('init_command'), 'PRAGMA query_only=ON']))
+    DATABASES[alias] = {**DATABASES['default'], 'NAME': path, 'OPTIONS': options, 'TEST': {'MIRROR': 'default'}}
+    DB_REPLICA_ALIASES.append(alias)
+
+DATABASE_ROUTERS = ['core.replicas.PrimaryReplicaRouter']
+# Replikaya gidebilecek (herkese açık katalog) GET yolları
+DB_REPLICA_READ_PATHS = ['/api/core/services/', '/api/core/categories']
+# Yazmadan sonra istemcinin primary'e bağlı kalacağı süre (sn)
+DB_REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 5))
+DB_REPLICA_PIN_COOKIE = 'srdb_primary'
+# Yazma cevabında dönen ve istemcinin sonraki isteklerde geri gönderdiği son yazma zamanı
+DB_REPLICA_WRITE_HEADER = 'X-DB-Last-Write'
+# Bu gecikmeyi (sn) aşan replika kullanılmaz; gecikme en fazla bu aralıkla yeniden ölçülür
+DB_REPLICA_MAX_LAG = int(os.environ.get('DB_REPLICA_MAX_LAG', 180))
+DB_REPLICA_LAG_CHECK_INTERVAL = 10
+
+# Geçici kilit hatalarında (database is locked) yeniden deneme sayısı ve ilk bekleme (sn)
+DB_LOCK_RETRIES = int(os.environ.get('DB_LOCK_RETRIES', 3))
+DB_LOCK_RETRY_BACKOFF = 0.05
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -216,6 +284,9 @@ CORS_ALLOWED_ORIGINS = [
 
 # Eğer tarayıcıda Cookieleri veya Yetkilendirme başlıklarını kullanacaksak:
 CORS_ALLOW_CREDENTIALS = True
+# Read-your-writes başlığı (core.replicas): cevapta okunabilmeli, istekte gönderilebilmeli
+CORS_EXPOSE_HEADERS = [DB_REPLICA_WRITE_HEADER]
+CORS_ALLOW_HEADERS = (*default_headers, DB_REPLICA_WRITE_HEADER.lower())
 
 
 # =======================================================
@@ -234,13 +305,26 @@ HAYSTACK_CONNECTIONS = {
 HAYSTACK_SEARCH_RESULTS_PER_PAGE = 20
 
 # Veritabanına her kayıt/güncelleme yapıldığında indeksi otomatik güncelleyecek.
-HAYSTACK_SIGNAL_PROCESSOR = 'haystack.signals.RealtimeSignalProcessor'
+# core.search.deferred_index_updates() bloklarında güncellemeler toplanıp commit sonrası tek seferde yazılır.
+HAYSTACK_SIGNAL_PROCESSOR = 'core.search.BatchingSignalProcessor'
+
+
+# Anlık bildirimler (SSE): web worker'ları ve Q-Cluster ayrı süreçlerdir; olayların
+# tüm SSE bağlantılarına ulaşması için Redis pub/sub köprüsü gerekir (bkz. core.notifications)
+NOTIFICATIONS_REDIS_URL = os.environ.get('NOTIFICATIONS_REDIS_URL') or None
 
 
 # =======================================================
 # DJANGO-Q (ASENKRON GÖREVLER) AYARLARI
 # =======================================================
 
+# Haftalık rapor bir önceki (pazartesi başlayan) haftanın özetini okur; ilk çalıştırma
+# deploy anına değil hafta sınırına (bir sonraki pazartesi 00:00, TIME_ZONE) hizalanır
+_today = datetime.now(ZoneInfo(TIME_ZONE)).date()
+WEEKLY_REPORT_NEXT_RUN = datetime.combine(
+    _today + timedelta(days=7 - _today.weekday()), time.min, tzinfo=ZoneInfo(TIME_ZONE)
+)
+
 Q_CLUSTER = {
     'name': 'ServiceRadarCluster',
     'workers': 4, 
@@ -254,18 +338,46 @@ Q_CLUSTER = {
         {
             'name': 'check_referral_timeout',
             'func': 'core.tasks.check_referral_timeout', # Hangi fonksiyon çalışacak
-            'minutes': 30, # Her 30 dakikada bir çalıştır
+            'minutes': 1, # Her dakika çalıştır (expires_at indeksi sayesinde sadece süresi dolanlar okunur)
             'repeats': -1, # Sürekli tekrar et
             'hook': 'core.tasks.log_completion', # Opsiyonel: Görev bitince ne yapsın
         },
-        # Ekstra: Haftalık raporlama için taslak
-        # {
-        #     'name': 'weekly_commission_report',
-        #     'func': 'core.tasks.generate_weekly_commission_report',
-        #     'schedule_type': 'W', # Haftalık
-        #     'repeats': -1,
-        #     'next_run': timezone.now() + timedelta(days=7), 
-        # },
+        # Haftalık komisyon raporu (yalnızca haftalık özet satırlarını okur)
+        {
+            'name': 'weekly_commission_report',
+            'func': 'core.tasks.generate_weekly_commission_report',
+            'schedule_type': 'W', # Haftalık
+            'next_run': WEEKLY_REPORT_NEXT_RUN,
+            'repeats': -1,
+        },
+        # Replika gecikmesi ölçümü için primary'deki heartbeat satırını güncelle
+        {
+            'name': 'replica_heartbeat',
+            'func': 'core.tasks.replica_heartbeat',
+            'minutes': 1,
+            'repeats': -1,
+        },
+        # Dosya replikaları (DB_REPLICAS) aşağıda sync_replicas ile ayrıca tazelenir
+        # Komisyon defteri mutabakatı (ham talepler ile parça parça karşılaştırma)
+        {
+            'name': 'reconcile_commission_ledger',
+            'func': 'core.tasks.reconcile_commission_ledger',
+            'schedule_type': 'D', # Günlük
+            'repeats': -1,
+        },
     ]
 }
+# SQLite dosya replikaları kendiliğinden güncellenmez: DB_REPLICAS ayarlıysa primary
+# DB_REPLICA_SYNC_MINUTES dakikada bir kopyalanır. Aralık DB_REPLICA_MAX_LAG'den kısa
+# olmalıdır, yoksa replikalar gecikme sınırını aşıp hiç kullanılmaz. Q-Cluster
+# çalıştırılmayan kurulumlarda aynı iş cron ile yapılır:
+#     * * * * * cd /proje && DB_REPLICAS=... python manage.py sync_replicas
+DB_REPLICA_SYNC_MINUTES = int(os.environ.get('DB_REPLICA_SYNC_MINUTES', 1))
+if DB_REPLICA_ALIASES and DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    Q_CLUSTER['schedule'].append({
+        'name': 'sync_replicas',
+        'func': 'core.tasks.sync_replicas',
+        'minutes': DB_REPLICA_SYNC_MINUTES,
+        'repeats': -1,
+    })
 AUTH_USER_MODEL = 'users.User'
\ No newline at end of file
@@ -1,6 +1,7 @@
 # core/admin.py
 from django.contrib import admin
 from .models import UserProfile, Company, Service, ReferralRequest, Category
+from .models import CommissionLedgerEntry, WeeklyCommissionRollup, ReferralEvent, CompanyReferralStats
 
 # UserProfile modelini Admin'de göster (Kullanıcı Rolü takibi için)
 @admin.register(UserProfile)
@@ -12,9 +13,10 @@ class UserProfileAdmin(admin.ModelAdmin):
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('name', 'slug', 'description')
+    list_display = ('name', 'slug', 'parent', 'description')
     search_fields = ('name', 'description')
     prepopulated_fields = {'slug': ('name',)}
+    ordering = ('path',)  # Ağaç sırası
 
 
 @admin.register(Company)
@@ -37,4 +39,33 @@ class ReferralRequestAdmin(admin.ModelAdmin):
     list_display = ('target_company', 'customer_email', 'status', 'created_at', 'is_commission_due')
     list_filter = ('status', 'target_company', 'is_commission_due')
     search_fields = ('customer_email', 'target_company__name')
-    readonly_fields = ('created_at', 'updated_at')
\ No newline at end of file
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(CommissionLedgerEntry)
+class CommissionLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('company', 'referral', 'amount', 'week_start', 'created_at')
+    list_filter = ('week_start',)
+    raw_id_fields = ('referral', 'company')
+    readonly_fields = ('referral', 'company', 'amount', 'week_start', 'created_at')
+
+
+@admin.register(WeeklyCommissionRollup)
+class WeeklyCommissionRollupAdmin(admin.ModelAdmin):
+    list_display = ('company', 'week_start', 'referral_count', 'total_amount', 'updated_at')
+    list_filter = ('week_start',)
+    readonly_fields = ('company', 'week_start', 'referral_count', 'total_amount', 'updated_at')
+
+
+@admin.register(ReferralEvent)
+class ReferralEventAdmin(admin.ModelAdmin):
+    list_display = ('referral', 'event_type', 'actor', 'created_at')
+    list_filter = ('event_type',)
+    raw_id_fields = ('referral', 'actor')
+
+
+@admin.register(CompanyReferralStats)
+class CompanyReferralStatsAdmin(admin.ModelAdmin):
+    list_display = ('company', 'period', 'bucket_start', 'created_count', 'accepted_count', 'rejected_count', 'timeout_count')
+    list_filter = ('period',)
+    raw_id_fields = ('company',)
@@ -0,0 +1,44 @@
+# core/api/conditional.py
+"""
+Koşullu GET (ETag / Last-Modified) yardımcıları.
+
+Endpoint önce ucuz bir sürüm sorgusu yapar (satırın `updated_at` değeri veya
+`core.versions` koleksiyon sayacı) ve `conditional_response` çağırır. İstemcinin
+`If-None-Match` / `If-Modified-Since` başlıkları eşleşirse nesne yüklenmeden ve
+serileştirilmeden 304 döner; aksi halde `build()` çağrılır ve 200 cevabına doğrulayıcı
+başlıklar eklenir.
+
+ETag zayıftır (W/) ve sürümle birlikte sorgu dizesini (`fields`, filtreler) de kapsar;
+aynı kaynağın farklı gösterimleri farklı ETag alır.
+"""
+
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def weak_etag(request, version):
+    digest = hashlib.blake2b(request.META.get('QUERY_STRING', '').encode(), digest_size=6).hexdigest()
+    return f'W/"{version}-{digest}"'
+
+
+def row_version(*timestamps):
+    """Bir veya daha fazla `updated_at` değerinden (None'lar atlanır) sürüm ve Last-Modified üretir."""
+    latest = max((ts for ts in timestamps if ts is not None), default=None)
+    return (int(latest.timestamp() * 1_000_000) if latest else 0), latest
+
+
+def conditional_response(request, version, last_modified, build):
+    etag = weak_etag(request, version)
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified)
+    return response
@@ -1,10 +1,11 @@
 # core/api/router.py
 
 from ninja import Router, NinjaAPI
-from typing import List, Optional
+from typing import List, Optional, Literal
+from datetime import datetime
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
-from django.http import HttpRequest, JsonResponse
+from django.db.models import Q, Subquery
+from django.http import Http404, HttpRequest, JsonResponse
 
 
 # 3rd Party Auth/Search Imports
@@ -14,12 +15,31 @@ from rest_framework.exceptions import AuthenticationFailed
 from haystack.query import SearchQuerySet 
 
 # Local Imports
-from core.models import Service, Company, ReferralRequest
+from core.models import Service, ServiceCard, Category, Company, ReferralRequest, ReferralEvent
+from core.exports import stream_referrals
+from core.notifications import notify_referral_created
+from core.events import referral_events, record_referral_event, record_first_views
+from core.stats import record_created, company_stats
+from core.dedup import is_duplicate, remember, normalize_email
+from core.referrals import transition_referrals, ACTION_STATUS
+from core.replicas import replica_metrics
+from core.versions import SERVICES, current_version
+from core.categories import category_tree
+from core.cards import refresh_service_cards
+from core.search import deferred_index_updates
 from .schemas import ServiceSchema, ReferralRequestIn, ReferralRequestOut, RequestActionIn, CompanySchema, CompanyUpdateIn
-from .schemas import CategorySchema, ServiceCreateIn
-from django.db import transaction
+from .schemas import CategoryNodeSchema, CategoryTreeSchema, ServiceCreateIn, ReferralBatchIn, ServiceCardSchema, SERVICE_CARD_SOURCES
+from .serialization import renderer, bulk_response, serialize_rows, render_response
+from .serialization import parse_fields, FieldSelectionError, invalid_fields_response, select_fields
+from .conditional import conditional_response, row_version
+from .schemas import BulkRequestActionIn, BulkRequestActionOut, ReferralEventOut, FirmStatsOut
+from .schemas import ServiceBatchIn, ServiceBatchOut, ServiceUpdateIn
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.contrib.auth.hashers import make_password
+from django.utils import timezone
 from django.utils.text import slugify
+from django.conf import settings
 
 # User and Firm models for register endpoints
 from users.models import User
@@ -59,7 +79,9 @@ class GlobalAuth(HttpBearer):
 # =======================================================
 
 # 1. Yetkilendirmeli Ana API objesini tanımlıyoruz.
-api = NinjaAPI(auth=GlobalAuth())
+# Liste endpointleri büyük cevaplarda `bulk_response` ile pydantic doğrulamasını atlar;
+# tüm cevaplar orjson renderer'ı ile yazılır (bkz. core/api/serialization.py).
+api = NinjaAPI(auth=GlobalAuth(), renderer=renderer)
 
 # 2. Rota gruplaması için Router objesini tanımlıyoruz.
 router = Router() 
@@ -81,49 +103,82 @@ def status(request):
 # 1. MÜŞTERİ İÇİN API ENDPOINTLERİ (Herkese Açık)
 # =======================================================
 
-@router.get("/services/search", response=List[ServiceSchema], tags=["Müşteri Arama"], auth=None)
-def search_services(request: HttpRequest, query: str = None, location: str = None, category: str = None):
-    """Hizmetleri anahtar kelime ve konuma göre arar."""
-    
-    services = Service.objects.select_related('company', 'category').all()
+def _search_cards(query: str = None, location: str = None, category: str = None):
+    cards = ServiceCard.objects.all()
     
     if query:
         try:
             sqs = SearchQuerySet().filter(content=query)
             service_ids = [result.pk for result in sqs]
-            services = services.filter(id__in=service_ids)
+            cards = cards.filter(service_id__in=service_ids)
         except Exception:
             # If search fails, fall back to title/description search
-            services = services.filter(
+            cards = cards.filter(
                 Q(title__icontains=query) | Q(description__icontains=query) | Q(keywords__icontains=query)
             )
 
     if location:
-        services = services.filter(company__location_text__icontains=location)
+        cards = cards.filter(company_location_text__icontains=location)
     
     if category:
-        # Accept either category slug or name, handle null categories gracefully
-        try:
-            services = services.filter(
-                Q(category__slug__iexact=category) | Q(category__name__icontains=category)
-            )
-        except Exception:
-            # If category filter fails, just skip it
-            pass
-        
-    return services
+        # Accept either category slug or name; alt kategoriler de dahil (path aralığı, indeksli)
+        paths = Category.objects.filter(Q(slug__iexact=category) | Q(name__icontains=category)).values_list('path', flat=True)
+        subtree = Q(pk__in=[])
+        for path in paths:
+            subtree |= Category.subtree_q(path)
+        cards = cards.filter(category_id__in=Category.objects.filter(subtree).values('id'))
+    return cards
+
+
+@router.get("/services/search", response=List[ServiceCardSchema], tags=["Müşteri Arama"], auth=None)
+def search_services(request: HttpRequest, query: str = None, location: str = None, category: str = None,
+                    fields: str = None):
+    """Hizmetleri anahtar kelime ve konuma göre arar.
+
+    Yalnızca düzleştirilmiş `ServiceCard` tablosunu okur (join yok); kategori önce
+    küçük Category tablosunda çözülür ve kartlar kategori indeksiyle filtrelenir.
+    `fields=id,title,price_range_min,company.name` gibi bir seçimle yalnızca istenen
+    alanlar okunur ve döndürülür. ETag `services` koleksiyon sayacından üretilir.
+    """
+    version, last_modified = current_version(SERVICES)
+    return conditional_response(request, version, last_modified, lambda: bulk_response(
+        _search_cards(query, location, category), ServiceCardSchema, SERVICE_CARD_SOURCES,
+        fields=parse_fields(fields),
+    ))
 
 
 @router.get("/services/{service_id}", response=ServiceSchema, tags=["Müşteri"], auth=None)
-def get_service_detail(request: HttpRequest, service_id: int):
-    """Hizmetin detay bilgilerini getirir."""
-    service = get_object_or_404(Service, id=service_id)
-    return service
+def get_service_detail(request: HttpRequest, service_id: int, fields: str = None):
+    """Hizmetin detay bilgilerini getirir (`fields` ile alan seçimi yapılabilir).
+
+    ETag hizmet, firma ve kategori satırlarının `updated_at` değerlerinden üretilir;
+    eşleşen `If-None-Match` hizmet yüklenmeden 304 ile cevaplanır.
+    """
+    timestamps = Service.objects.filter(id=service_id).values_list(
+        'updated_at', 'company__updated_at', 'category__updated_at'
+    ).first()
+    if timestamps is None:
+        raise Http404
+
+    def build():
+        try:
+            rows = serialize_rows(Service.objects.filter(id=service_id), ServiceSchema, fields=parse_fields(fields))
+        except FieldSelectionError as error:
+            return invalid_fields_response(error)
+        if not rows:
+            raise Http404
+        return render_response(rows[0])
+
+    return conditional_response(request, *row_version(*timestamps), build)
 
 
 @router.post("/referral/create", response={201: ReferralRequestOut}, tags=["Müşteri Talep"], auth=None)
 def create_referral_request(request: HttpRequest, payload: ReferralRequestIn):
     """Müşteri bir firmadan hizmet talebi oluşturur."""
+
+    # Aynı müşteriden aynı firma/hizmet için tekrar eden talepler hiçbir yazma yapılmadan reddedilir
+    if is_duplicate(payload.customer_email, payload.requested_service_id, payload.target_company_id):
+        return JsonResponse({"detail": "Bu talep kısa süre önce zaten gönderildi."}, status=409)
     
     company = get_object_or_404(Company, id=payload.target_company_id)
     service = get_object_or_404(Service, id=payload.requested_service_id)
@@ -132,25 +187,108 @@ def create_referral_request(request: HttpRequest, payload: ReferralRequestIn):
         target_company=company,
         requested_service=service,
         customer_name=payload.customer_name,
-        customer_email=payload.customer_email,
+        customer_email=normalize_email(payload.customer_email),
     )
+    remember(referral.customer_email, service.id, company.id)
     
     final_referral = ReferralRequest.objects.select_related(
         'requested_service', 
-        'requested_service__company'
+        'requested_service__company',
+        'requested_service__category',
     ).get(id=referral.id)
+
+    # Firma paneline anlık bildirim (SSE) ve olay kaydı
+    notify_referral_created(final_referral)
+    record_referral_event([final_referral.id], 'created')
+    record_created([final_referral])
     
     return 201, final_referral
 
 
+# Tek bir toplu talepte gönderilebilecek en fazla (firma, hizmet) çifti
+REFERRAL_BATCH_MAX_ITEMS = getattr(settings, 'REFERRAL_BATCH_MAX_ITEMS', 10)
+
+
+@router.post("/referral/create-batch", response={201: List[ReferralRequestOut]}, tags=["Müşteri Talep"], auth=None)
+def create_referral_batch(request: HttpRequest, payload: ReferralBatchIn):
+    """Müşteri aynı talebi tek istekte birden fazla firmaya gönderir.
+
+    Tüm firma ve hizmetler iki `IN` sorgusuyla doğrulanır, talepler tek transaction
+    içinde `bulk_create` ile eklenir ve tekrar sorgulanmadan döndürülür.
+    """
+    if not payload.items:
+        return JsonResponse({"detail": "En az bir firma/hizmet seçilmelidir."}, status=400)
+    if len(payload.items) > REFERRAL_BATCH_MAX_ITEMS:
+        return JsonResponse(
+            {"detail": f"Tek seferde en fazla {REFERRAL_BATCH_MAX_ITEMS} talep gönderilebilir."}, status=400
+        )
+
+    # Aynı çift birden fazla gönderildiyse tek talep oluştur (sırayı koruyarak)
+    pairs = list(dict.fromkeys(
+        (item.target_company_id, item.requested_service_id) for item in payload.items
+    ))
+
+    customer_email = normalize_email(payload.customer_email)
+    if any(is_duplicate(customer_email, service_id, company_id) for company_id, service_id in pairs):
+        return JsonResponse({"detail": "Bu talep kısa süre önce zaten gönderildi."}, status=409)
+
+    companies = Company.objects.in_bulk({company_id for company_id, _ in pairs})
+    services = Service.objects.select_related('company', 'category').in_bulk(
+        {service_id for _, service_id in pairs}
+    )
+
+    for company_id, service_id in pairs:
+        if company_id not in companies or service_id not in services:
+            return JsonResponse({"detail": "Firma veya hizmet bulunamadı."}, status=404)
+        if services[service_id].company_id != company_id:
+            return JsonResponse({"detail": "Hizmet seçilen firmaya ait değil."}, status=400)
+
+    referrals = [
+        ReferralRequest(
+            target_company=companies[company_id],
+            requested_service=services[service_id],
+            customer_name=payload.customer_name,
+            customer_email=customer_email,
+        )
+        for company_id, service_id in pairs
+    ]
+
+    with transaction.atomic():
+        created = ReferralRequest.objects.bulk_create(referrals)
+        for referral in created:
+            notify_referral_created(referral)
+        record_referral_event([referral.id for referral in created], 'created')
+        record_created(created)
+
+    for company_id, service_id in pairs:
+        remember(customer_email, service_id, company_id)
+
+    return 201, created
+
+
 # =======================================================
 # 2. FİRMA İÇİN API ENDPOINTLERİ (Yönetim) - JWT KORUMALI
 # =======================================================
 
 # Bu rotalar, varsayılan GlobalAuth ayarını kullanır ve JWT token gerektirir.
 
+def _filter_referrals(queryset, status: Optional[str] = None,
+                      created_after: Optional[datetime] = None,
+                      created_before: Optional[datetime] = None):
+    """Talep listeleme ve dışa aktarma endpointlerinin ortak filtreleri."""
+    if status:
+        queryset = queryset.filter(status=status)
+    if created_after:
+        queryset = queryset.filter(created_at__gte=created_after)
+    if created_before:
+        queryset = queryset.filter(created_at__lt=created_before)
+    return queryset
+
+
 @router.get("/firm/my-referrals", response=List[ReferralRequestOut], tags=["Firma Paneli"])
-def list_my_referrals(request: HttpRequest):
+def list_my_referrals(request: HttpRequest, status: Optional[str] = None,
+                      created_after: Optional[datetime] = None,
+                      created_before: Optional[datetime] = None):
     """Firmaya ait tüm talepleri listeler. JWT yetkilendirme gereklidir."""
     
     # GlobalAuth başarılı olduğu için request.auth artık USER objesidir.
@@ -160,9 +298,10 @@ def list_my_referrals(request: HttpRequest):
     if getattr(user, 'is_superuser', False):
         referrals = ReferralRequest.objects.select_related(
             'requested_service',
-            'requested_service__company'
+            'requested_service__company',
+            'requested_service__category',
         ).order_by('-created_at')
-        return referrals
+        return bulk_response(_filter_referrals(referrals, status, created_after, created_before), ReferralRequestOut)
 
     # Kullanıcının firması üzerinden filtreleme yap (kullanıcı firmaya bağlı değilse erişim yok)
     user_firm = getattr(user, 'firm', None)
@@ -175,57 +314,159 @@ def list_my_referrals(request: HttpRequest):
 
     referrals = ReferralRequest.objects.filter(target_company=company).select_related(
         'requested_service',
-        'requested_service__company'
+        'requested_service__company',
+        'requested_service__category',
     ).order_by('-created_at')
-    
-    return referrals
+    rows = serialize_rows(_filter_referrals(referrals, status, created_after, created_before), ReferralRequestOut)
+
+    # Kullanıcının ilk kez gördüğü bekleyen talepler için 'viewed' olayı (tamponlu, yanıttan sonra yazılır)
+    record_first_views([row['id'] for row in rows if row['status'] == 'pending'], user)
+
+    return render_response(rows)
+
+
+@router.get("/firm/referrals/export", tags=["Firma Paneli"])
+def export_my_referrals(request: HttpRequest, format: Literal['csv', 'ndjson'] = 'csv',
+                        status: Optional[str] = None,
+                        created_after: Optional[datetime] = None,
+                        created_before: Optional[datetime] = None):
+    """Firmaya ait talepleri CSV veya NDJSON olarak akış halinde dışa aktarır."""
+    user = request.auth
+
+    if getattr(user, 'is_superuser', False):
+        referrals = ReferralRequest.objects.all()
+    else:
+        user_firm = getattr(user, 'firm', None)
+        if not user_firm:
+            return JsonResponse({"detail": "Bu işlem için bir firmaya bağlı olmanız gerekir."}, status=403)
+        company = Company.objects.filter(slug=user_firm.slug).first()
+        if not company:
+            return JsonResponse({"detail": "Firmaya ait şirket kaydı bulunamadı."}, status=404)
+        referrals = ReferralRequest.objects.filter(target_company=company)
+
+    referrals = _filter_referrals(referrals.order_by('-created_at'), status, created_after, created_before)
+    return stream_referrals(referrals, format, filename='firm-referrals')
+
+def _user_company_id(user):
+    """Kullanıcının firmasına karşılık gelen Company id'sini tek sorguda çözer."""
+    if not getattr(user, 'firm_id', None):
+        return None
+    firm_slug = Firm.objects.filter(pk=user.firm_id).values('slug')[:1]
+    return Company.objects.filter(slug=Subquery(firm_slug)).values_list('id', flat=True).first()
+
 
 @router.post("/company/request/{request_id}/action", tags=["Firma Paneli"])
 # Artık aksiyonu 'action: str' olarak değil, 'payload: RequestActionIn' olarak alıyoruz:
 def request_action(request: HttpRequest, request_id: int, payload: RequestActionIn):
-    """Firmaya gelen talebi kabul (accept) veya red (reject) eder."""
+    """Firmaya gelen talebi kabul (accept) veya red (reject) eder.
 
-    user = request.auth
+    Geçiş tek bir koşullu UPDATE ile yapılır; eşzamanlı iki istekten yalnızca biri başarılı olur.
+    """
 
-    # Get the referral; raise 404 if not found
-    referral = get_object_or_404(ReferralRequest, id=request_id)
+    user = request.auth
 
-    # Eğer kullanıcı süperuser ise izin ver
+    # Eğer kullanıcı süperuser ise her talep üzerinde işlem yapabilir
     if getattr(user, 'is_superuser', False):
-        allowed = True
+        company_id = None
     else:
         # Kullanıcının firması ile talebin hedef firması eşleşmeli
-        user_firm = getattr(user, 'firm', None)
-        if not user_firm:
+        if not getattr(user, 'firm_id', None):
             return JsonResponse({"detail": "Bu işlem için bir firmaya bağlı olmanız gerekir."}, status=403)
 
-        company = Company.objects.filter(slug=user_firm.slug).first()
-        if not company:
+        company_id = _user_company_id(user)
+        if not company_id:
             return JsonResponse({"detail": "Firmaya ait şirket kaydı bulunamadı."}, status=404)
 
-        allowed = (referral.target_company_id == company.id)
+    if payload.action not in ACTION_STATUS:
+        return JsonResponse({"detail": "Geçersiz aksiyon."}, status=400)
 
-    if not allowed:
-        return JsonResponse({"detail": "Bu talep üzerinde işlem yapma yetkiniz yok."}, status=403)
+    if not transition_referrals([request_id], payload.action, company_id=company_id, actor=user):
+        # Güncelleme olmadıysa nedenini bul: talep yok, başka firmaya ait veya zaten işlenmiş
+        referral = get_object_or_404(ReferralRequest.objects.only('id', 'target_company_id'), id=request_id)
+        if company_id is not None and referral.target_company_id != company_id:
+            return JsonResponse({"detail": "Bu talep üzerinde işlem yapma yetkiniz yok."}, status=403)
+        return JsonResponse({"detail": "Bu talep zaten işlenmiş."}, status=400)
 
-    # Aksiyon değerine artık payload.action ile ulaşıyoruz:
     if payload.action == 'accept':
-        if referral.status != 'pending':
-            return JsonResponse({"detail": "Bu talep zaten işlenmiş."}, status=400)
-        referral.status = 'accepted'
-        referral.is_commission_due = True
         message = "Talep başarıyla kabul edildi."
-    elif payload.action == 'reject':
-        if referral.status != 'pending':
-            return JsonResponse({"detail": "Bu talep zaten işlenmiş."}, status=400)
-        referral.status = 'rejected'
+    else:
         message = "Talep başarıyla reddedildi."
+
+    return {"success": True, "message": message}
+
+
+@router.get("/company/request/{request_id}/timeline", response=List[ReferralEventOut], tags=["Firma Paneli"])
+def referral_timeline(request: HttpRequest, request_id: int):
+    """Talebin olay geçmişini (oluşturuldu, görüntülendi, kabul/red, zaman aşımı) kronolojik döndürür."""
+    user = request.auth
+
+    referral = get_object_or_404(ReferralRequest.objects.only('id', 'target_company_id'), id=request_id)
+    if not getattr(user, 'is_superuser', False):
+        if not getattr(user, 'firm_id', None):
+            return JsonResponse({"detail": "Bu işlem için bir firmaya bağlı olmanız gerekir."}, status=403)
+        if referral.target_company_id != _user_company_id(user):
+            return JsonResponse({"detail": "Bu talep üzerinde işlem yapma yetkiniz yok."}, status=403)
+
+    # Henüz yazılmamış olaylar da görünsün
+    referral_events.flush()
+
+    return list(
+        ReferralEvent.objects.filter(referral_id=referral.id)
+        .order_by('created_at', 'id')
+        .values('event_type', 'actor_id', 'created_at')
+    )
+
+
+@router.get("/firm/stats", response=FirmStatsOut, tags=["Firma Paneli"])
+def firm_stats(request: HttpRequest, period: Literal['day', 'week'] = 'day', buckets: int = 30):
+    """Firma paneli metrikleri: durum sayıları, kabul oranı ve yanıt süresi yüzdelikleri.
+
+    Önceden hesaplanmış günlük/haftalık özet satırlarından okunur; ham talepler taranmaz.
+    """
+    user = request.auth
+    if not getattr(user, 'firm_id', None):
+        return JsonResponse({"detail": "Bu işlem için bir firmaya bağlı olmanız gerekir."}, status=403)
+
+    company_id = _user_company_id(user)
+    if not company_id:
+        return JsonResponse({"detail": "Firmaya ait şirket kaydı bulunamadı."}, status=404)
+
+    return company_stats(company_id, period=period, buckets=max(1, min(buckets, 366)))
+
+
+# Tek seferde işlenebilecek en fazla talep sayısı
+REFERRAL_BULK_ACTION_MAX_ITEMS = getattr(settings, 'REFERRAL_BULK_ACTION_MAX_ITEMS', 500)
+
+
+@router.post("/company/requests/bulk-action", response=BulkRequestActionOut, tags=["Firma Paneli"])
+def bulk_request_action(request: HttpRequest, payload: BulkRequestActionIn):
+    """Birden fazla bekleyen talebi tek istekte ve tek UPDATE ile kabul/red eder.
+
+    Zaten işlenmiş veya firmaya ait olmayan talepler atlanır ve `skipped` içinde döner.
+    """
+    user = request.auth
+
+    if getattr(user, 'is_superuser', False):
+        company_id = None
     else:
-        return JsonResponse({"detail": "Geçersiz aksiyon."}, status=400)
+        if not getattr(user, 'firm_id', None):
+            return JsonResponse({"detail": "Bu işlem için bir firmaya bağlı olmanız gerekir."}, status=403)
+        company_id = _user_company_id(user)
+        if not company_id:
+            return JsonResponse({"detail": "Firmaya ait şirket kaydı bulunamadı."}, status=404)
 
-    referral.save()
+    request_ids = list(dict.fromkeys(payload.ids))
+    if len(request_ids) > REFERRAL_BULK_ACTION_MAX_ITEMS:
+        return JsonResponse(
+            {"detail": f"Tek seferde en fazla {REFERRAL_BULK_ACTION_MAX_ITEMS} talep işlenebilir."}, status=400
+        )
 
-    return {"success": True, "message": message}
+    updated_ids = {referral.id for referral in transition_referrals(request_ids, payload.action, company_id=company_id, actor=user)}
+    return {
+        "success": True,
+        "updated": [request_id for request_id in request_ids if request_id in updated_ids],
+        "skipped": [request_id for request_id in request_ids if request_id not in updated_ids],
+    }
 
 
 # =======================================================
@@ -242,15 +483,53 @@ def get_my_company(request: HttpRequest):
     if not user_firm:
         return JsonResponse({"detail": "Bu işlem için bir firmaya bağlı olmanız gerekir."}, status=403)
 
-    company = Company.objects.filter(slug=user_firm.slug).first()
-    if not company:
+    # Önce yalnızca sürüm okunur; ETag eşleşirse firma yüklenmeden 304 döner
+    row = Company.objects.filter(slug=user_firm.slug).values_list('pk', 'updated_at').first()
+    if not row:
         return JsonResponse({"detail": "Firmaya ait şirket kaydı bulunamadı."}, status=404)
 
-    return company
+    company_id, updated_at = row
+    return conditional_response(request, *row_version(updated_at), lambda: render_response(
+        CompanySchema.from_orm(Company.objects.get(pk=company_id)).model_dump()
+    ))
 
 
-@router.put('/firm/company', response=CompanySchema, tags=['Firma Paneli'])
+def _apply_changes(instance, values):
+    """`values` içindeki alanları örneğe yazar ve gerçekten değişen alanların adlarını döndürür.
+
+    Değerler alanın `to_python` dönüşümünden sonra karşılaştırılır (ör. 150.0 ile
+    Decimal('150.00') eşittir); hiçbir şey değişmediyse örneğe dokunulmaz. NULL kabul
+    etmeyen alana gelen null, boş bırakılabilen metin alanında '' olur; diğerlerinde
+    örneğe dokunmadan `ValidationError` yükseltilir.
+    """
+    cleaned, errors = {}, []
+    for name, value in values.items():
+        field = instance._meta.get_field(name)
+        if value is None and not field.null:
+            if field.blank and isinstance(field, (models.CharField, models.TextField)):
+                value = ''
+            else:
+                errors.append(name)
+                continue
+        cleaned[field] = field.to_python(value) if value is not None else None
+    if errors:
+        raise ValidationError(f"Bu alanlar boş bırakılamaz: {', '.join(errors)}")
+
+    changed = []
+    for field, value in cleaned.items():
+        if getattr(instance, field.attname) != value:
+            setattr(instance, field.attname, value)
+            changed.append(field.name)
+    return changed
+
+
+@router.api_operation(['PUT', 'PATCH'], '/firm/company', response=CompanySchema, tags=['Firma Paneli'])
 def update_my_company(request: HttpRequest, payload: 'CompanyUpdateIn'):
+    """Firma yöneticisi şirket bilgilerini günceller (yalnızca gönderilen alanlar).
+
+    Yalnızca değişen kolonlar yazılır; değişiklik yoksa hiç yazılmaz. Kart ve liste
+    sürümü yalnızca herkese açık alanlar, arama indeksi yalnızca firma adı değişince güncellenir.
+    """
     user = request.auth
 
     # Yalnızca firma yöneticileri veya süperuser izinli
@@ -265,18 +544,18 @@ def update_my_company(request: HttpRequest, payload: 'CompanyUpdateIn'):
     if not company:
         return JsonResponse({"detail": "Firmaya ait şirket kaydı bulunamadı."}, status=404)
 
-    # Güncellenebilir alanlar
-    updatable = [
-        'name', 'description', 'location_text', 'phone', 'email', 'tax_number',
-        'trade_registry_number', 'logo', 'cover_image', 'working_hours', 'special_days',
-        'min_order_amount', 'default_delivery_fee', 'estimated_delivery_time_minutes', 'delivery_areas'
-    ]
-
-    for field in updatable:
-        if hasattr(payload, field):
-            setattr(company, field, getattr(payload, field))
-
-    company.save()
+    try:
+        changed = _apply_changes(company, payload.dict(exclude_unset=True))
+    except ValidationError as error:
+        return JsonResponse({"detail": error.messages[0]}, status=400)
+    if not changed:
+        return company
+
+    with transaction.atomic(), deferred_index_updates() as index_batch:
+        company.save(update_fields=changed + ['updated_at'])
+        if 'name' in changed:
+            # Firma adı hizmet belgelerinde aranır (ServiceIndex.company_name)
+            index_batch.update(Service, Service.objects.filter(company=company).values_list('pk', flat=True))
     return company
 
 
@@ -405,8 +684,8 @@ def list_firm_services(request: HttpRequest):
     if not company:
         return JsonResponse({"detail": "Firmaya ait şirket kaydı bulunamadı."}, status=404)
     
-    services = Service.objects.filter(company=company).select_related('company', 'category')
-    return list(services)
+    services = Service.objects.filter(company=company)
+    return bulk_response(services, ServiceSchema)
 
 
 @router.post('/firm/services', response=ServiceSchema, tags=['Firma Paneli - Hizmetler'])
@@ -438,6 +717,118 @@ def create_firm_service(request: HttpRequest, payload: ServiceCreateIn):
         return JsonResponse({'detail': f'Hizmet oluşturma hatası: {str(e)}'}, status=400)
 
 
+# Tek toplu istekte işlenebilecek en fazla hizmet işlemi
+SERVICE_BATCH_MAX_ITEMS = getattr(settings, 'SERVICE_BATCH_MAX_ITEMS', 200)
+
+
+def _batch_service_error(values, service, categories, creating):
+    """Toplu işlemdeki bir create/update adımını örneğe dokunmadan doğrular; hata mesajı veya None."""
+    if ('title' in values or creating) and not values.get('title'):
+        return 'Başlık zorunludur.'
+    if values.get('category') and values['category'] not in categories:
+        return 'Kategori bulunamadı.'
+    low = values['price_range_min'] if 'price_range_min' in values else getattr(service, 'price_range_min', None)
+    high = values['price_range_max'] if 'price_range_max' in values else getattr(service, 'price_range_max', None)
+    if low is not None and high is not None and low > high:
+        return 'Maksimum fiyat minimum fiyattan küçük olamaz.'
+    return None
+
+
+def _set_service_values(service, values):
+    for field, value in values.items():
+        if field == 'category':
+            service.category_id = value
+        elif field in ('description', 'keywords'):
+            # NOT NULL metin kolonları: null boş metin olarak yazılır
+            setattr(service, field, value or '')
+        else:
+            setattr(service, field, value)
+
+
+# '/firm/services/{service_id}' yollarından önce tanımlanmalı; aksi halde 'batch' id olarak eşleşir
+@router.post('/firm/services/batch', response=ServiceBatchOut, tags=['Firma Paneli - Hizmetler'])
+def batch_firm_services(request: HttpRequest, payload: ServiceBatchIn):
+    """Firma yöneticisi birden fazla hizmeti tek istekte oluşturur/günceller/siler.
+
+    Firma bir kez çözülür; hedef hizmetler ve kategoriler birer `IN` sorgusuyla doğrulanır.
+    Geçerli işlemler tek transaction içinde `bulk_create` / `bulk_update` / tek DELETE ile
+    uygulanır ve arama indeksi commit sonrası tek seferde güncellenir. Geçersiz işlemler
+    atlanır; her işlemin sonucu istekteki sırasıyla döner.
+    """
+    user = request.auth
+    if not getattr(user, 'firm_id', None):
+        return JsonResponse({"detail": "Bu işlem için bir firmaya bağlı olmanız gerekir."}, status=403)
+    if len(payload.operations) > SERVICE_BATCH_MAX_ITEMS:
+        return JsonResponse(
+            {"detail": f"Tek seferde en fazla {SERVICE_BATCH_MAX_ITEMS} işlem gönderilebilir."}, status=400
+        )
+
+    company_id = _user_company_id(user)
+    if not company_id:
+        return JsonResponse({"detail": "Firmaya ait şirket kaydı bulunamadı."}, status=404)
+
+    operations = payload.operations
+    target_ids = {operation.id for operation in operations if operation.op != 'create' and operation.id}
+    services = Service.objects.filter(company_id=company_id).in_bulk(target_ids) if target_ids else {}
+    category_ids = {operation.category for operation in operations if operation.category}
+    categories = set(Category.objects.filter(pk__in=category_ids).values_list('pk', flat=True)) if category_ids else set()
+
+    results = [None] * len(operations)
+    creates, updates, deletes, touched = [], [], [], set()
+    for index, operation in enumerate(operations):
+        values = operation.dict(exclude_unset=True, exclude={'op', 'id'})
+        error = None
+        if operation.op != 'create' and operation.id not in services:
+            error = 'Hizmet bulunamadı.'
+        elif operation.id in touched:
+            error = 'Aynı hizmet için birden fazla işlem gönderilemez.'
+        elif operation.op != 'delete':
+            error = _batch_service_error(values, services.get(operation.id), categories, creating=operation.op == 'create')
+        if error:
+            results[index] = {"index": index, "op": operation.op, "status": "error", "id": operation.id, "detail": error}
+            continue
+
+        # Değerler yalnızca işlem kabul edildikten sonra örneğe yazılır
+        if operation.op == 'create':
+            service = Service(company_id=company_id, description='')
+            _set_service_values(service, values)
+            creates.append((index, service))
+        elif operation.op == 'update':
+            touched.add(operation.id)
+            service = services[operation.id]
+            _set_service_values(service, values)
+            updates.append((index, service, frozenset(values)))
+        else:
+            touched.add(operation.id)
+            deletes.append((index, services[operation.id]))
+
+    with transaction.atomic(), deferred_index_updates() as index_batch:
+        created = Service.objects.bulk_create([service for _, service in creates])
+        if updates:
+            now = timezone.now()
+            # Her hizmet yalnızca kendi gönderilen alanlarıyla yazılır: aynı alan kümesi tek bulk_update
+            groups = {}
+            for _, service, fields in updates:
+                service.updated_at = now
+                groups.setdefault(fields, []).append(service)
+            for fields, group in groups.items():
+                Service.objects.bulk_update(group, sorted(fields) + ['updated_at'])
+        if deletes:
+            # Kartlar CASCADE ile silinir; indeks silmeleri sinyallerden toplanır
+            Service.objects.filter(pk__in=[service.pk for _, service in deletes]).delete()
+        written = [service.pk for service in created] + [service.pk for _, service, _ in updates]
+        if written:
+            refresh_service_cards(written)
+            index_batch.update(Service, written)
+
+    updates = [(index, service) for index, service, _ in updates]
+    for index, service in creates + updates:
+        results[index] = {"index": index, "op": operations[index].op, "status": "ok", "id": service.pk, "detail": None}
+    for index, service in deletes:
+        results[index] = {"index": index, "op": "delete", "status": "ok", "id": operations[index].id, "detail": None}
+    return {"created": len(creates), "updated": len(updates), "deleted": len(deletes), "results": results}
+
+
 @router.get('/firm/services/{service_id}', response=ServiceSchema, tags=['Firma Paneli - Hizmetler'])
 def get_firm_service(request: HttpRequest, service_id: int):
     """Firma yöneticisi kendi hizmetini görüntüler"""
@@ -453,13 +844,17 @@ def get_firm_service(request: HttpRequest, service_id: int):
     if not company:
         return JsonResponse({"detail": "Firmaya ait şirket kaydı bulunamadı."}, status=404)
     
-    service = get_object_or_404(Service, id=service_id, company=company)
+    service = get_object_or_404(Service.objects.select_related('company', 'category'), id=service_id, company=company)
     return service
 
 
-@router.put('/firm/services/{service_id}', response=ServiceSchema, tags=['Firma Paneli - Hizmetler'])
-def update_firm_service(request: HttpRequest, service_id: int, payload: ServiceCreateIn):
-    """Firma yöneticisi kendi hizmetini günceller"""
+@router.api_operation(['PUT', 'PATCH'], '/firm/services/{service_id}', response=ServiceSchema, tags=['Firma Paneli - Hizmetler'])
+def update_firm_service(request: HttpRequest, service_id: int, payload: ServiceUpdateIn):
+    """Firma yöneticisi kendi hizmetini günceller (yalnızca gönderilen alanlar).
+
+    Yalnızca değişen kolonlar yazılır; değişiklik yoksa hiç yazılmaz. Arama indeksi, kart
+    ve liste sürümü yalnızca ilgili alanlar değiştiyse güncellenir (bkz. save sinyalleri).
+    """
     user = request.auth
     if not user:
         return JsonResponse({'detail': 'Yetkilendirme gerekli.'}, status=401)
@@ -472,15 +867,33 @@ def update_firm_service(request: HttpRequest, service_id: int, payload: ServiceC
     if not company:
         return JsonResponse({"detail": "Firmaya ait şirket kaydı bulunamadı."}, status=404)
     
-    service = get_object_or_404(Service, id=service_id, company=company)
-    
-    service.title = payload.title
-    service.description = payload.description
-    service.price_range_min = payload.price_range_min
-    service.price_range_max = payload.price_range_max
-    if payload.category:
-        service.category_id = payload.category
-    service.save()
+    service = get_object_or_404(Service.objects.select_related('company', 'category'), id=service_id, company=company)
+
+    values = payload.dict(exclude_unset=True)
+    if 'title' in values and not values['title']:
+        return JsonResponse({"detail": "Başlık boş olamaz."}, status=400)
+    if 'description' in values:
+        values['description'] = values['description'] or ''
+    category = None
+    if values.get('category') and values['category'] != service.category_id:
+        category = Category.objects.filter(pk=values['category']).first()
+        if category is None:
+            return JsonResponse({"detail": "Kategori bulunamadı."}, status=400)
+
+    try:
+        changed = _apply_changes(service, values)
+    except ValidationError as error:
+        return JsonResponse({"detail": error.messages[0]}, status=400)
+    if not changed:
+        return service
+    if category is not None:
+        # Kart ve yanıt kategoriyi tekrar sorgulamasın
+        service.category = category
+
+    low, high = service.price_range_min, service.price_range_max
+    if low is not None and high is not None and low > high:
+        return JsonResponse({"detail": "Maksimum fiyat minimum fiyattan küçük olamaz."}, status=400)
+    service.save(update_fields=changed + ['updated_at'])
     
     return service
 
@@ -511,14 +924,43 @@ def delete_firm_service(request: HttpRequest, service_id: int):
 # =======================================================
 
 
-@router.get('/admin/referrals', tags=['Admin'])
-def admin_all_referrals(request: HttpRequest):
+@router.get('/admin/referrals', response=List[ReferralRequestOut], tags=['Admin'])
+def admin_all_referrals(request: HttpRequest, status: Optional[str] = None,
+                        created_after: Optional[datetime] = None,
+                        created_before: Optional[datetime] = None):
     user = request.auth
     if not getattr(user, 'is_superuser', False):
         return JsonResponse({'detail': 'Süper kullanıcı yetkisi gereklidir.'}, status=403)
 
-    referrals = ReferralRequest.objects.select_related('requested_service', 'requested_service__company').order_by('-created_at')
-    return referrals
+    referrals = ReferralRequest.objects.select_related(
+        'requested_service', 'requested_service__company', 'requested_service__category'
+    ).order_by('-created_at')
+    return bulk_response(_filter_referrals(referrals, status, created_after, created_before), ReferralRequestOut)
+
+
+@router.get('/admin/referrals/export', tags=['Admin'])
+def admin_export_referrals(request: HttpRequest, format: Literal['csv', 'ndjson'] = 'csv',
+                           status: Optional[str] = None,
+                           created_after: Optional[datetime] = None,
+                           created_before: Optional[datetime] = None):
+    """Tüm talepleri sabit bellekle CSV veya NDJSON olarak akış halinde dışa aktarır."""
+    user = request.auth
+    if not getattr(user, 'is_superuser', False):
+        return JsonResponse({'detail': 'Süper kullanıcı yetkisi gereklidir.'}, status=403)
+
+    referrals = _filter_referrals(
+        ReferralRequest.objects.order_by('-created_at'), status, created_after, created_before
+    )
+    return stream_referrals(referrals, format, filename='referrals')
+
+
+@router.get('/admin/db/replicas', tags=['Admin'])
+def admin_replica_metrics(request: HttpRequest):
+    """Replika gecikmelerini ve okuma/yazma yönlendirme sayaçlarını döndürür."""
+    user = request.auth
+    if not getattr(user, 'is_superuser', False):
+        return JsonResponse({'detail': 'Süper kullanıcı yetkisi gereklidir.'}, status=403)
+    return replica_metrics.snapshot()
 
 
 # =======================================================
@@ -536,7 +978,25 @@ api.add_router("/users", users_management_router)
 
 
 # Kategori listeleme (Herkese açık)
-@router.get('/categories', response=List[CategorySchema], tags=['Katalog'], auth=None)
-def list_categories(request: HttpRequest):
-    from core.models import Category
-    return Category.objects.all().order_by('name')
\ No newline at end of file
+@router.get('/categories', response=List[CategoryNodeSchema], tags=['Katalog'], auth=None)
+def list_categories(request: HttpRequest, fields: str = None):
+    """Tüm kategoriler (ada göre), hiyerarşi bilgisi ve hizmet sayılarıyla.
+
+    Süreç içi önbellekten (core.categories) servis edilir; istek başına yalnızca sürüm okunur.
+    """
+    tree, version, last_modified = category_tree.get()
+
+    def build():
+        try:
+            return render_response(select_fields(tree.flat, CategoryNodeSchema, parse_fields(fields)))
+        except FieldSelectionError as error:
+            return invalid_fields_response(error)
+
+    return conditional_response(request, version, last_modified, build)
+
+
+@router.get('/categories/tree', response=List[CategoryTreeSchema], tags=['Katalog'], auth=None)
+def category_tree_view(request: HttpRequest):
+    """Kategori ağacı (kökler ve iç içe `children`), alt ağaç hizmet sayılarıyla."""
+    tree, version, last_modified = category_tree.get()
+    return conditional_response(request, version, last_modified, lambda: render_response(tree.nested))
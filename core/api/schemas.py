@@ -1,7 +1,7 @@
 # core/api/schemas.py
 from ninja import Schema
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, date
 from typing import Literal
 
 # Genel hata şeması: API hata cevaplarında ortak olarak kullanılır
@@ -38,6 +38,67 @@ class ServiceSchema(Schema):
     category: Optional['CategorySchema'] = None
     
 
+class ServiceCardCompanySchema(Schema):
+    """Hizmet kartında gösterilen firma özeti."""
+    id: int
+    name: str
+    slug: str
+    location_text: str
+    logo: Optional[str] = None
+
+
+class ServiceCardCategorySchema(Schema):
+    id: int
+    name: str
+    slug: str
+
+
+class ServiceCardSchema(Schema):
+    """Herkese açık listeleme/arama kartı (core.models.ServiceCard okuma modelinden)."""
+    id: int
+    title: str
+    description: str
+    price_range_min: Optional[float]
+    price_range_max: Optional[float]
+    company: ServiceCardCompanySchema
+    category: Optional[ServiceCardCategorySchema] = None
+
+    @staticmethod
+    def resolve_id(card):
+        return card.service_id
+
+    @staticmethod
+    def resolve_company(card):
+        return {
+            'id': card.company_id,
+            'name': card.company_name,
+            'slug': card.company_slug,
+            'location_text': card.company_location_text,
+            'logo': card.company_logo,
+        }
+
+    @staticmethod
+    def resolve_category(card):
+        if card.category_id is None:
+            return None
+        return {'id': card.category_id, 'name': card.category_name, 'slug': card.category_slug}
+
+
+# ServiceCardSchema alanlarının ServiceCard kolon karşılıkları (core.api.serialization için)
+SERVICE_CARD_SOURCES = {
+    'id': 'service_id',
+    'company.id': 'company_id',
+    'company.name': 'company_name',
+    'company.slug': 'company_slug',
+    'company.location_text': 'company_location_text',
+    'company.logo': 'company_logo',
+    'category': 'category_id',
+    'category.id': 'category_id',
+    'category.name': 'category_name',
+    'category.slug': 'category_slug',
+}
+
+
 # --- MÜŞTERİ GİRİŞ ŞEMALARI (Veri Alma) ---
 
 class ReferralRequestIn(Schema):
@@ -48,6 +109,18 @@ class ReferralRequestIn(Schema):
     customer_email: str
     description: str # Müşterinin ek notları
 
+class ReferralBatchItemIn(Schema):
+    """Toplu talepte tek bir (firma, hizmet) çifti."""
+    target_company_id: int
+    requested_service_id: int
+
+class ReferralBatchIn(Schema):
+    """Aynı müşterinin birden fazla firmaya tek seferde talep göndermesi için."""
+    customer_name: str
+    customer_email: str
+    description: str = ''
+    items: List[ReferralBatchItemIn]
+
 # --- FİRMA ÇIKIŞ ŞEMALARI (Talep Yönetimi) ---
 
 class ReferralRequestOut(Schema):
@@ -58,13 +131,50 @@ class ReferralRequestOut(Schema):
     status: str
     # BURAYI DÜZELTİYORUZ: str yerine datetime kullanıyoruz
     created_at: datetime # <-- ARTIK DATETIME OBJESİ BEKLİYORUZ
-    requested_service: ServiceSchema
+    requested_service: Optional[ServiceSchema] = None  # Hizmet silinmişse (SET_NULL) None
     commission_amount: float
     
     
 class RequestActionIn(Schema):
     # Aksiyon sadece 'accept' veya 'reject' olabilir
     action: Literal["accept", "reject"]
+
+
+class ReferralEventOut(Schema):
+    """Talep zaman çizelgesindeki tek bir olay."""
+    event_type: str
+    actor_id: Optional[int] = None
+    created_at: datetime
+
+
+class FirmStatsBucketOut(Schema):
+    """Firma panelinde tek bir gün/hafta için talep metrikleri."""
+    bucket_start: Optional[date] = None
+    created: int
+    accepted: int
+    rejected: int
+    timeout: int
+    acceptance_rate: Optional[float] = None  # kabul / (kabul + red + zaman aşımı)
+    response_p50_seconds: Optional[float] = None
+    response_p90_seconds: Optional[float] = None
+
+
+class FirmStatsOut(Schema):
+    period: str
+    buckets: List[FirmStatsBucketOut]
+    totals: FirmStatsBucketOut
+
+
+class BulkRequestActionIn(Schema):
+    """Birden fazla talebi tek seferde kabul/red etmek için."""
+    ids: List[int]
+    action: Literal["accept", "reject"]
+
+
+class BulkRequestActionOut(Schema):
+    success: bool
+    updated: List[int]  # Durumu değiştirilen talepler
+    skipped: List[int]  # Zaten işlenmiş, bulunamayan veya yetkisiz talepler
     
     # users/schemas.py (veya API şemalarınızın bulunduğu dosya)
 
@@ -80,22 +190,54 @@ class TokenSchema(Schema):
     is_superuser: bool
 
 
+class ServiceBatchOperationIn(Schema):
+    """Toplu hizmet işleminde tek adım. `update` yalnızca gönderilen alanları değiştirir."""
+    op: Literal["create", "update", "delete"]
+    id: Optional[int] = None  # update/delete için hizmet ID
+    title: Optional[str] = None
+    description: Optional[str] = None
+    keywords: Optional[str] = None
+    price_range_min: Optional[float] = None
+    price_range_max: Optional[float] = None
+    category: Optional[int] = None  # Category ID
+
+
+class ServiceBatchIn(Schema):
+    operations: List[ServiceBatchOperationIn]
+
+
+class ServiceBatchResultOut(Schema):
+    index: int  # İstekteki sırası (0'dan başlar)
+    op: str
+    status: Literal["ok", "error"]
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class ServiceBatchOut(Schema):
+    created: int
+    updated: int
+    deleted: int
+    results: List[ServiceBatchResultOut]
+
+
 class CompanyUpdateIn(Schema):
-    name: Optional[str]
-    description: Optional[str]
-    location_text: Optional[str]
-    phone: Optional[str]
-    email: Optional[str]
-    tax_number: Optional[str]
-    trade_registry_number: Optional[str]
-    logo: Optional[str]
-    cover_image: Optional[str]
-    working_hours: Optional[dict]
-    special_days: Optional[dict]
-    min_order_amount: Optional[float]
-    default_delivery_fee: Optional[float]
-    estimated_delivery_time_minutes: Optional[int]
-    delivery_areas: Optional[dict]
+    """Şirket güncellemesi: yalnızca gönderilen alanlar değişir (null alanı temizler)."""
+    name: Optional[str] = None
+    description: Optional[str] = None
+    location_text: Optional[str] = None
+    phone: Optional[str] = None
+    email: Optional[str] = None
+    tax_number: Optional[str] = None
+    trade_registry_number: Optional[str] = None
+    logo: Optional[str] = None
+    cover_image: Optional[str] = None
+    working_hours: Optional[dict] = None
+    special_days: Optional[dict] = None
+    min_order_amount: Optional[float] = None
+    default_delivery_fee: Optional[float] = None
+    estimated_delivery_time_minutes: Optional[int] = None
+    delivery_areas: Optional[dict] = None
 
 
 class CategorySchema(Schema):
@@ -105,6 +247,38 @@ class CategorySchema(Schema):
     description: Optional[str] = None
 
 
+class CategoryNodeSchema(Schema):
+    """Kategori listesinde tek kategori: hiyerarşi bilgisi ve hizmet sayılarıyla."""
+    id: int
+    name: str
+    slug: str
+    description: Optional[str] = None
+    parent_id: Optional[int] = None
+    path: str
+    depth: int
+    service_count: int  # Doğrudan bu kategorideki hizmetler
+    subtree_service_count: int  # Alt kategoriler dahil
+
+
+class CategoryTreeSchema(Schema):
+    id: int
+    name: str
+    slug: str
+    service_count: int
+    subtree_service_count: int
+    children: List['CategoryTreeSchema'] = []
+
+
+class ServiceUpdateIn(Schema):
+    """Hizmet güncellemesi: yalnızca gönderilen alanlar değişir."""
+    title: Optional[str] = None
+    description: Optional[str] = None
+    keywords: Optional[str] = None
+    price_range_min: Optional[float] = None
+    price_range_max: Optional[float] = None
+    category: Optional[int] = None  # Category ID, null kategoriyi kaldırır
+
+
 class ServiceCreateIn(Schema):
     """Firma tarafından hizmet oluştururken kullanılır."""
     title: str
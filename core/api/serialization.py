@@ -0,0 +1,165 @@
+# core/api/serialization.py
+"""
+Büyük liste cevapları için hızlı JSON üretimi.
+
+- `ORJSONRenderer`: NinjaAPI'nin `json.dumps` tabanlı varsayılan renderer'ının orjson
+  karşılığı. datetime/date/time, Decimal, UUID vb. değerler NinjaJSONEncoder'a devredilir;
+  böylece tarih biçimi (milisaniye hassasiyeti, UTC için 'Z') değişmez.
+- `serialize_rows(queryset, Schema)`: satırları tek `values_list()` sorgusuyla okur ve
+  çıktıyı şemanın alan sırasıyla doğrudan sözlüklere dönüştürür; satır başına pydantic
+  nesnesi kurulmaz ve doğrulama yapılmaz. Sonuç `Schema.from_orm(obj).model_dump()` ile
+  birebir aynıdır (float alanlar Decimal'den float'a çevrilir, Optional iç içe şemalar
+  kendi FK kolonu NULL ise None olur).
+- `bulk_response(...)`: `serialize_rows` sonucunu API renderer'ı ile HttpResponse'a yazar
+  (`render_response` hazır veriyi aynı biçimde yazar, `select_fields` hazır veriye alan
+  seçimi uygular).
+
+`resolve_<alan>` kullanan şemalarda ORM karşılığı `sources` ile verilmelidir
+(ör. `{'id': 'service_id', 'company.name': 'company_name'}`). Optional iç içe şemanın
+adı da FK kolonuna eşlenmelidir (ör. `{'category': 'category_id'}`).
+
+Seyrek alan seçimi: `fields="id,title,company.name"` yalnızca istenen alanları döndürür ve
+sorguya da yalnızca bu kolonlar eklenir (projeksiyon SQL'e iner). İç içe bir şemanın adı
+(`company`) tüm alt alanlarını seçer. Bilinmeyen alan adı `FieldSelectionError` üretir.
+"""
+
+import types
+from functools import lru_cache
+from typing import Union, get_args, get_origin
+
+import orjson
+from django.http import HttpResponse, JsonResponse
+from ninja import Schema
+from ninja.renderers import BaseRenderer
+from ninja.responses import NinjaJSONEncoder
+
+_ENCODER = NinjaJSONEncoder()
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, request, data, *, response_status):
+        return orjson.dumps(data, default=_ENCODER.default, option=self.options)
+
+
+renderer = ORJSONRenderer()
+
+
+class FieldSelectionError(ValueError):
+    pass
+
+
+def parse_fields(value):
+    """`fields` sorgu parametresini (virgülle ayrılmış) frozenset'e çevirir; boşsa None."""
+    if not value:
+        return None
+    return frozenset(part.strip() for part in value.split(',') if part.strip()) or None
+
+
+def _unwrap_optional(annotation):
+    if get_origin(annotation) in (Union, types.UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0], True
+    return annotation, False
+
+
+def _is_schema(annotation):
+    return isinstance(annotation, type) and issubclass(annotation, Schema)
+
+
+def _plan(schema, sources, path, lookups, fields, known):
+    """Şemayı (alan, values_list indeksi, dönüştürücü, alt plan, nullable) listesine çevirir.
+
+    Optional iç içe şemalarda indeks, varlığı belirleyen FK kolonunu gösterir.
+
+    `fields` None ise tüm alanlar alınır; aksi halde yalnızca seçilen yollar ve altları.
+    """
+    if not schema.__pydantic_complete__:
+        # İleri referanslı alanlar (ör. `Optional['CategorySchema']`) ilk doğrulamadan önce çözülmemiştir
+        schema.model_rebuild()
+    plan = []
+    for name, field in schema.model_fields.items():
+        dotted = f'{path}.{name}' if path else name
+        known.add(dotted)
+        selected = fields is None or dotted in fields
+        annotation, nullable = _unwrap_optional(field.annotation)
+        if _is_schema(annotation):
+            children = _plan(annotation, sources, dotted, lookups, None if selected else fields, known)
+            if children:
+                index = None
+                if nullable:
+                    lookups.append(sources.get(dotted, dotted.replace('.', '__')))
+                    index = len(lookups) - 1
+                plan.append((name, index, None, children, nullable))
+            continue
+        if selected:
+            lookups.append(sources.get(dotted, dotted.replace('.', '__')))
+            plan.append((name, len(lookups) - 1, float if annotation is float else None, None, nullable))
+    return plan
+
+
+# `fields` istemciden gelir; önbellek sınırsız olursa farklı alan kombinasyonları belleği doldurur
+PROJECTION_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=PROJECTION_CACHE_SIZE)
+def compile_projection(schema, sources=(), fields=None):
+    """Şema (ve alan seçimi) için (ORM lookup listesi, plan) üretir; bir kez hesaplanır."""
+    lookups, known = [], set()
+    plan = _plan(schema, dict(sources), '', lookups, fields, known)
+    if fields is not None and not fields <= known:
+        raise FieldSelectionError(', '.join(sorted(fields - known)))
+    return tuple(lookups), plan
+
+
+def _build(plan, row):
+    out = {}
+    for name, index, convert, children, nullable in plan:
+        if children is None:
+            value = row[index]
+            out[name] = convert(value) if convert is not None and value is not None else value
+        else:
+            out[name] = None if nullable and row[index] is None else _build(children, row)
+    return out
+
+
+def serialize_rows(queryset, schema, sources=None, fields=None):
+    """Sorguyu tek geçişte şemanın `model_dump()` çıktısıyla aynı sözlük listesine dönüştürür."""
+    lookups, plan = compile_projection(schema, tuple(sorted((sources or {}).items())), fields)
+    return [_build(plan, row) for row in queryset.values_list(*lookups)]
+
+
+def _trim(plan, item):
+    out = {}
+    for name, _, _, children, _ in plan:
+        value = item[name]
+        out[name] = value if children is None or value is None else _trim(children, value)
+    return out
+
+
+def select_fields(items, schema, fields):
+    """Hazır (ör. önbellekten gelen) sözlüklere aynı `fields` seçimini uygular."""
+    if fields is None:
+        return items
+    _, plan = compile_projection(schema, (), fields)
+    return [_trim(plan, item) for item in items]
+
+
+def render_response(data, status=200):
+    content = renderer.render(None, data, response_status=status)
+    return HttpResponse(content, status=status, content_type=f"{renderer.media_type}; charset={renderer.charset}")
+
+
+def invalid_fields_response(error):
+    return JsonResponse({'detail': f'Geçersiz alan seçimi: {error}'}, status=400)
+
+
+def bulk_response(queryset, schema, sources=None, status=200, fields=None):
+    try:
+        rows = serialize_rows(queryset, schema, sources, fields)
+    except FieldSelectionError as error:
+        return invalid_fields_response(error)
+    return render_response(rows, status=status)
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Hizmet kartı okuma modelini güncel tutan sinyaller
+        from core import cards  # noqa: F401
+        # Liste ETag'leri için koleksiyon sürüm sayaçları
+        from core import versions  # noqa: F401
+        # Çok süreçli kurulumda bildirim köprüsü (Redis) eksikse uyar
+        from django.core import checks
+        from core.notifications import check_notification_broker
+        checks.register(check_notification_broker)
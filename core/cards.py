@@ -0,0 +1,146 @@
+# core/cards.py
+"""
+Hizmet kartı okuma modelinin (`ServiceCard`) bakımı.
+
+Kart, herkese açık listelemede gösterilen Service + Company + Category alanlarının
+düzleştirilmiş kopyasıdır. Güncellemeler sinyallerle aynı transaction içinde yapılır:
+- Service kaydedildiğinde yalnızca o hizmetin kartı yeniden yazılır.
+- Company veya Category kaydedildiğinde ilgili kartlar tek UPDATE ile güncellenir.
+- Service/Company silindiğinde kart CASCADE ile silinir; Category silindiğinde kartların
+  kategori alanları boşaltılır (Service.category SET_NULL sinyal üretmez).
+
+`bulk_create` / `QuerySet.update` sinyal üretmez; bu yollarla hizmet yazan kod
+`refresh_service_cards(ids)`, firma yazan kod `refresh_company_cards(ids)`, kategori yazan
+kod `refresh_category_cards(ids)` çağırmalıdır.
+Tüm tablo `rebuild_service_cards()` ile (veya `manage.py rebuild_service_cards`) yeniden
+kurulabilir.
+"""
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Category, Company, Service, ServiceCard
+from core.versions import SERVICES, bump_version, fields_touched
+
+
+def _card_for(service):
+    company, category = service.company, service.category
+    return ServiceCard(
+        service_id=service.pk,
+        title=service.title,
+        description=service.description,
+        keywords=service.keywords,
+        price_range_min=service.price_range_min,
+        price_range_max=service.price_range_max,
+        company_id=company.pk,
+        company_name=company.name,
+        company_slug=company.slug,
+        company_location_text=company.location_text,
+        company_logo=company.logo,
+        category_id=category.pk if category else None,
+        category_name=category.name if category else None,
+        category_slug=category.slug if category else None,
+    )
+
+
+def _company_fields(company):
+    return {
+        'company_name': company.name,
+        'company_slug': company.slug,
+        'company_location_text': company.location_text,
+        'company_logo': company.logo,
+        'updated_at': timezone.now(),
+    }
+
+
+def refresh_service_cards(service_ids, batch_size=500):
+    """Verilen hizmetlerin kartlarını yeniden yazar (silinmiş hizmetlerin kartları kaldırılır)."""
+    service_ids = list(service_ids)
+    with transaction.atomic():
+        ServiceCard.objects.filter(service_id__in=service_ids).delete()
+        services = Service.objects.filter(pk__in=service_ids).select_related('company', 'category')
+        ServiceCard.objects.bulk_create([_card_for(service) for service in services], batch_size=batch_size)
+        bump_version(SERVICES)
+
+
+def refresh_company_cards(company_ids):
+    """Sinyalsiz (bulk) yazılmış firmaların alanlarını kartlarına tek UPDATE ile kopyalar."""
+    company = Company.objects.filter(pk=OuterRef('company_id'))
+    updated = ServiceCard.objects.filter(company_id__in=list(company_ids)).update(
+        company_name=Subquery(company.values('name')[:1]),
+        company_slug=Subquery(company.values('slug')[:1]),
+        company_location_text=Subquery(company.values('location_text')[:1]),
+        company_logo=Subquery(company.values('logo')[:1]),
+        updated_at=timezone.now(),
+    )
+    if updated:
+        bump_version(SERVICES)
+    return updated
+
+
+def refresh_category_cards(category_ids):
+    """Sinyalsiz (bulk) güncellenmiş kategorilerin ad/slug'ını kartlarına tek UPDATE ile kopyalar."""
+    category = Category.objects.filter(pk=OuterRef('category_id'))
+    updated = ServiceCard.objects.filter(category_id__in=list(category_ids)).update(
+        category_name=Subquery(category.values('name')[:1]),
+        category_slug=Subquery(category.values('slug')[:1]),
+        updated_at=timezone.now(),
+    )
+    if updated:
+        bump_version(SERVICES)
+    return updated
+
+
+def rebuild_service_cards(chunk_size=1000):
+    """Tüm kart tablosunu hizmetlerden parça parça yeniden kurar. Yazılan kart sayısını döndürür."""
+    total, last_id = 0, 0
+    with transaction.atomic():
+        ServiceCard.objects.all().delete()
+        while True:
+            services = list(
+                Service.objects.filter(pk__gt=last_id).select_related('company', 'category').order_by('pk')[:chunk_size]
+            )
+            if not services:
+                break
+            ServiceCard.objects.bulk_create([_card_for(service) for service in services])
+            total += len(services)
+            last_id = services[-1].pk
+        bump_version(SERVICES)
+    return total
+
+
+@receiver(post_save, sender=Service, dispatch_uid='core.cards.service_saved')
+def _service_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not fields_touched(update_fields, ServiceCard.SERVICE_SOURCE_FIELDS):
+        return
+    card = _card_for(instance)
+    fields = {field.attname: getattr(card, field.attname)
+              for field in ServiceCard._meta.concrete_fields if not field.primary_key and field.name != 'updated_at'}
+    if not ServiceCard.objects.filter(service_id=instance.pk).update(**fields, updated_at=timezone.now()):
+        card.save(force_insert=True)
+
+
+@receiver(post_save, sender=Company, dispatch_uid='core.cards.company_saved')
+def _company_saved(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if raw or created or not fields_touched(update_fields, ServiceCard.COMPANY_SOURCE_FIELDS):
+        return
+    ServiceCard.objects.filter(company_id=instance.pk).update(**_company_fields(instance))
+
+
+@receiver(post_save, sender=Category, dispatch_uid='core.cards.category_saved')
+def _category_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    ServiceCard.objects.filter(category_id=instance.pk).update(
+        category_name=instance.name, category_slug=instance.slug, updated_at=timezone.now()
+    )
+
+
+@receiver(post_delete, sender=Category, dispatch_uid='core.cards.category_deleted')
+def _category_deleted(sender, instance, **kwargs):
+    ServiceCard.objects.filter(category_id=instance.pk).update(
+        category_id=None, category_name=None, category_slug=None, updated_at=timezone.now()
+    )
@@ -0,0 +1,260 @@
+# core/catalog_import.py
+"""
+Firma ve hizmet kataloğunun toplu içe aktarımı (bkz. `manage.py import_catalog`).
+
+CSV veya JSONL dosyası satır satır okunur, `batch_size` satırlık parçalar halinde
+model alanlarının kendi doğrulayıcılarıyla (`Field.clean`) doğrulanır ve her parça tek
+transaction içinde `bulk_create(update_conflicts=True)` ile yazılır:
+- Firmalar `slug` ile, hizmetler (firma, `external_id`) ile eşleşir. `external_id`
+  zorunludur: başlıktan türetmek aynı başlıklı farklı hizmetleri tek satırda
+  birleştirirdi. Yalnızca satırda bulunan kolonlar güncellenir: parça, kolon kümesi
+  aynı olan satır gruplarına ayrılır ve her grup kendi `update_fields` listesiyle yazılır.
+- `bulk_create` sinyal üretmediği için kartlar ve koleksiyon sürümü parça içinde
+  `refresh_company_cards` / `refresh_service_cards` ile güncellenir.
+- Haystack gerçek zamanlı sinyalleri işlem boyunca kapatılır; sonunda yalnızca bu
+  işlemde değişen hizmetler tek seferde yeniden indekslenir (`reindex_services`).
+
+Geçersiz satırlar işlemi durdurmaz; satır numarası ve hata mesajlarıyla `rejects`
+dosyasına JSONL olarak yazılır.
+"""
+
+import csv
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+
+from core.cards import refresh_company_cards, refresh_service_cards
+from core.db import retry_on_lock
+from core.models import Category, Company, Service
+
+COMPANY_FIELDS = (
+    'name', 'slug', 'description', 'location_text', 'phone', 'email', 'tax_number', 'trade_registry_number',
+    'logo', 'cover_image', 'min_order_amount', 'default_delivery_fee', 'estimated_delivery_time_minutes',
+)
+SERVICE_FIELDS = ('title', 'description', 'keywords', 'price_range_min', 'price_range_max', 'external_id')
+
+# Kaynakta boş gelebilen, modelde boş bırakılamayan metin alanları
+_BLANK_DEFAULTS = {'description': ''}
+
+
+@dataclass
+class ImportStats:
+    kind: str
+    imported: int = 0
+    rejected: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def processed(self):
+        return self.imported + self.rejected
+
+    @property
+    def rows_per_second(self):
+        elapsed = time.monotonic() - self.started
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+
+class RejectLog:
+    """Reddedilen satırları JSONL olarak yazar."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def write(self, kind, line, errors, row):
+        if self._file is None:
+            self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write(json.dumps({'kind': kind, 'line': line, 'errors': errors, 'row': row}, ensure_ascii=False) + '\n')
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def read_rows(path):
+    """Dosyayı (satır no, satır sözlüğü, okuma hatası) üçlüleri olarak akış halinde okur."""
+    with open(path, encoding='utf-8', newline='') as handle:
+        if path.endswith(('.jsonl', '.ndjson')):
+            for line_no, line in enumerate(handle, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as error:
+                    yield line_no, {'raw': line.rstrip('\n')}, {'__all__': [f'Geçersiz JSON: {error}']}
+                    continue
+                if isinstance(row, dict):
+                    yield line_no, row, None
+                else:
+                    yield line_no, {'raw': row}, {'__all__': ['Satır bir JSON nesnesi olmalıdır.']}
+        else:
+            reader = csv.DictReader(handle)
+            for row in reader:
+                yield reader.line_num, row, None
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _clean(model, row, names):
+    """Satırdaki kolonları model alanlarının doğrulayıcılarıyla temizler; (değerler, hatalar)."""
+    values, errors = {}, {}
+    for name in names:
+        if name not in row:
+            continue
+        model_field = model._meta.get_field(name)
+        raw = row[name]
+        if isinstance(raw, str):
+            raw = raw.strip()
+        if raw in (None, ''):
+            if name in _BLANK_DEFAULTS:
+                values[name] = _BLANK_DEFAULTS[name]
+                continue
+            raw = None if model_field.null else ''
+        try:
+            values[name] = model_field.clean(raw, None)
+        except ValidationError as error:
+            errors[name] = error.messages
+    return values, errors
+
+
+def _require(values, errors, names):
+    for name in names:
+        if name not in values and name not in errors:
+            errors[name] = ['Bu alan zorunludur.']
+
+
+@contextmanager
+def search_signals_suspended():
+    """Haystack gerçek zamanlı indeks sinyallerini geçici olarak kapatır."""
+    processor = apps.get_app_config('haystack').signal_processor
+    processor.teardown()
+    try:
+        yield
+    finally:
+        processor.setup()
+
+
+def _group_by_columns(rows):
+    """{anahtar: (kolonlar, nesne)} sözlüğünü {kolonlar: [nesne, ...]} gruplarına ayırır."""
+    groups = {}
+    for columns, instance in rows.values():
+        groups.setdefault(columns, []).append(instance)
+    return groups
+
+
+@retry_on_lock
+def _write_companies(groups):
+    with transaction.atomic():
+        for columns, companies in groups.items():
+            written = Company.objects.bulk_create(
+                companies, update_conflicts=True, unique_fields=['slug'],
+                update_fields=sorted(columns - {'slug'}) + ['updated_at'],
+            )
+            refresh_company_cards([company.pk for company in written])
+
+
+def import_companies(path, rejects, batch_size=2000, on_progress=None):
+    stats = ImportStats('companies')
+    for chunk in _chunks(read_rows(path), batch_size):
+        companies = {}
+        for line_no, row, errors in chunk:
+            if not errors:
+                values, errors = _clean(Company, row, COMPANY_FIELDS)
+                _require(values, errors, ('name', 'slug', 'location_text'))
+            if errors:
+                rejects.write(stats.kind, line_no, errors, row)
+                stats.rejected += 1
+                continue
+            # Parça içinde tekrar: son satır geçerli
+            companies[values['slug']] = (frozenset(values), Company(**values))
+            stats.imported += 1
+
+        if companies:
+            _write_companies(_group_by_columns(companies))
+        if on_progress:
+            on_progress(stats)
+    return stats
+
+
+@retry_on_lock
+def _write_services(groups):
+    with transaction.atomic():
+        for columns, services in groups.items():
+            written = Service.objects.bulk_create(
+                services, update_conflicts=True, unique_fields=['company', 'external_id'],
+                update_fields=sorted(columns - {'external_id'}) + ['updated_at'],
+            )
+            refresh_service_cards([service.pk for service in written])
+
+
+def import_services(path, rejects, batch_size=2000, on_progress=None):
+    stats = ImportStats('services')
+    for chunk in _chunks(read_rows(path), batch_size):
+        # Parçadaki firma/kategori slug'ları tek sorguda çözülür
+        companies = dict(Company.objects.filter(
+            slug__in={row.get('company_slug') for _, row, _ in chunk}
+        ).values_list('slug', 'pk'))
+        categories = dict(Category.objects.filter(
+            slug__in={row.get('category_slug') for _, row, _ in chunk if row.get('category_slug')}
+        ).values_list('slug', 'pk'))
+
+        services = {}
+        for line_no, row, errors in chunk:
+            if not errors:
+                values, errors = _clean(Service, row, SERVICE_FIELDS)
+                _require(values, errors, ('title', 'external_id'))
+                company_id = companies.get(row.get('company_slug'))
+                if company_id is None:
+                    errors['company_slug'] = ['Firma bulunamadı.']
+                category_slug = row.get('category_slug') or None
+                if category_slug and category_slug not in categories:
+                    errors['category_slug'] = ['Kategori bulunamadı.']
+                low, high = values.get('price_range_min'), values.get('price_range_max')
+                if low is not None and high is not None and low > high:
+                    errors['price_range_max'] = ['Maksimum fiyat minimum fiyattan küçük olamaz.']
+            if errors:
+                rejects.write(stats.kind, line_no, errors, row)
+                stats.rejected += 1
+                continue
+
+            # Kategori yalnızca satırda `category_slug` kolonu varsa güncellenir
+            columns = frozenset(values) | ({'category'} if 'category_slug' in row else set())
+            services[company_id, values['external_id']] = (columns, Service(
+                company_id=company_id, category_id=categories.get(category_slug), **values
+            ))
+            stats.imported += 1
+
+        if services:
+            _write_services(_group_by_columns(services))
+        if on_progress:
+            on_progress(stats)
+    return stats
+
+
+def reindex_services(changed_since, batch_size=1000):
+    """`changed_since` sonrasında kendisi veya firması yazılmış hizmetleri arama indeksine yazar."""
+    from haystack import connections
+
+    unified = connections['default'].get_unified_index()
+    index, backend = unified.get_index(Service), connections['default'].get_backend()
+    queryset = Service.objects.filter(
+        Q(updated_at__gte=changed_since) | Q(company__updated_at__gte=changed_since)
+    ).select_related('company').order_by('pk')
+
+    total, last_pk = 0, 0
+    while batch := list(queryset.filter(pk__gt=last_pk)[:batch_size]):
+        backend.update(index, batch)
+        total += len(batch)
+        last_pk = batch[-1].pk
+    return total
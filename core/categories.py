@@ -0,0 +1,99 @@
+# core/categories.py
+"""
+Kategori ağacı ve hizmet sayılarının süreç içi önbelleği.
+
+Ağaç (materialized path sırasıyla) ve kategori başına hizmet sayıları iki sorguyla
+kurulur ve `categories` + `services` koleksiyon sürümleriyle (core.versions) anahtarlanır.
+Her istek yalnızca sürüm satırlarını okur; Category veya Service değiştiğinde sürüm
+arttığı için bir sonraki istek ağacı yeniden kurar. Anahtar son değişiklik zamanını da
+içerdiğinden geri alınan (rollback) bir transaction'ın sürümü yeniden kullanılsa bile
+eski ağaç dönmez.
+"""
+
+import threading
+
+from django.db.models import Count
+
+from core.models import Category, Service
+from core.versions import CATEGORIES, SERVICES, current_version
+
+
+class CategoryTree:
+
+    def __init__(self, categories, counts):
+        self.nodes = []
+        self.by_id = {}
+        for category in categories:  # path sırasıyla: ebeveyn her zaman çocuktan önce gelir
+            node = {
+                'id': category.id,
+                'name': category.name,
+                'slug': category.slug,
+                'description': category.description,
+                'parent_id': category.parent_id,
+                'path': category.path,
+                'depth': category.path.count('/') - 1,
+                'service_count': counts.get(category.id, 0),
+                'subtree_service_count': 0,
+                'children': [],
+            }
+            self.nodes.append(node)
+            self.by_id[node['id']] = node
+
+        self.roots = []
+        for node in reversed(self.nodes):  # yapraklardan köke: alt ağaç toplamları
+            node['subtree_service_count'] += node['service_count']
+            parent = self.by_id.get(node['parent_id'])
+            if parent is None:
+                self.roots.append(node)
+            else:
+                parent['subtree_service_count'] += node['subtree_service_count']
+                parent['children'].append(node)
+        self.roots.reverse()
+        for node in self.nodes:
+            node['children'].reverse()
+
+        # Endpointlerin doğrudan yazdığı hazır gösterimler
+        self.flat = sorted(
+            ({key: value for key, value in node.items() if key != 'children'} for node in self.nodes),
+            key=lambda node: node['name'],
+        )
+        self.nested = [self._nested(root) for root in self.roots]
+
+    def _nested(self, node):
+        return {
+            'id': node['id'],
+            'name': node['name'],
+            'slug': node['slug'],
+            'service_count': node['service_count'],
+            'subtree_service_count': node['subtree_service_count'],
+            'children': [self._nested(child) for child in node['children']],
+        }
+
+
+class CategoryTreeCache:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._tree = None
+
+    def get(self):
+        """(ağaç, sürüm, son değişiklik zamanı) döndürür; ağaç yalnızca sürüm değiştiğinde kurulur."""
+        version, last_modified = current_version(CATEGORIES, SERVICES)
+        key = (version, last_modified)
+        with self._lock:
+            if self._key != key:
+                counts = dict(
+                    Service.objects.filter(category__isnull=False)
+                    .values_list('category_id').annotate(total=Count('id')).order_by()
+                )
+                self._tree = CategoryTree(Category.objects.order_by('path'), counts)
+                self._key = key
+            return self._tree, version, last_modified
+
+    def clear(self):
+        with self._lock:
+            self._key = self._tree = None
+
+
+category_tree = CategoryTreeCache()
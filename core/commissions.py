@@ -0,0 +1,178 @@
+# core/commissions.py
+"""
+Komisyon defteri ve haftalık özetler.
+
+Talep kabul edildiğinde deftere bir kayıt eklenir ve aynı transaction içinde ilgili
+firmanın haftalık özet satırı artırılır. Böylece haftalık rapor ham talep tablosunu
+taramadan, yalnızca özet satırlarından üretilebilir.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from core.models import CommissionLedgerEntry, ReferralRequest, WeeklyCommissionRollup
+from core.stats import increment_counters
+
+
+def week_start_for(moment=None):
+    """Verilen anın (yerel saat) ait olduğu haftanın pazartesi gününü döndürür."""
+    day = timezone.localdate(moment) if moment else timezone.localdate()
+    return day - timedelta(days=day.weekday())
+
+
+def record_commissions(referrals):
+    """Kabul edilen talepler için defter kayıtlarını ekler ve haftalık özetleri artırır.
+
+    Çağıran tarafın transaction'ı içinde çalışır; özet satırları firma başına tek
+    UPDATE ile güncellenir.
+    """
+    referrals = list(referrals)
+    if not referrals:
+        return []
+
+    week_start = week_start_for()
+    entries = [
+        CommissionLedgerEntry(
+            referral_id=referral.id,
+            company_id=referral.target_company_id,
+            amount=referral.commission_amount,
+            week_start=week_start,
+        )
+        for referral in referrals
+    ]
+
+    with transaction.atomic():
+        CommissionLedgerEntry.objects.bulk_create(entries)
+        per_company = defaultdict(lambda: [0, Decimal('0')])
+        for entry in entries:
+            per_company[entry.company_id][0] += 1
+            per_company[entry.company_id][1] += Decimal(entry.amount)
+        for company_id, (count, amount) in per_company.items():
+            increment_counters(
+                WeeklyCommissionRollup,
+                {'company_id': company_id, 'week_start': week_start},
+                referral_count=count, total_amount=amount,
+            )
+
+    return entries
+
+
+def record_commission(referral):
+    return record_commissions([referral])
+
+
+def weekly_report(week_start):
+    """Verilen haftanın firma bazlı komisyon özetini (yalnızca özet tablosundan) döndürür."""
+    return list(
+        WeeklyCommissionRollup.objects.filter(week_start=week_start)
+        .select_related('company')
+        .order_by('-total_amount')
+    )
+
+
+def _key_after(key):
+    """(hafta, firma) anahtar sırasında `key`'den sonraki satırlar."""
+    if key is None:
+        return Q()
+    week_start, company_id = key
+    return Q(week_start__gt=week_start) | Q(week_start=week_start, company_id__gt=company_id)
+
+
+def _key_up_to(key):
+    week_start, company_id = key
+    return Q(week_start__lt=week_start) | Q(week_start=week_start, company_id__lte=company_id)
+
+
+def reconcile(chunk_size=1000):
+    """Defteri ham talepler ve haftalık özetlerle karşılaştırır.
+
+    1. Komisyonu kesilmiş talepler birincil anahtar sırasıyla `chunk_size` boyutunda
+       parçalar halinde okunur ve her parça için defter toplamları tek sorguda alınır.
+    2. Komisyonu artık kesilmeyen taleplere ait defter kayıtları talep sırasıyla
+       parça parça aranır.
+    3. Defterin (hafta, firma) toplamları özet satırlarıyla anahtar sırasında parça parça
+       karşılaştırılır; her parçada yalnızca o anahtar aralığındaki özetler okunur.
+
+    Bulunan tutarsızlıkların listesini döndürür.
+    """
+    mismatches = []
+
+    last_id = 0
+    while True:
+        chunk = list(
+            ReferralRequest.objects.filter(is_commission_due=True, id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'commission_amount')[:chunk_size]
+        )
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+
+        ledger_totals = dict(
+            CommissionLedgerEntry.objects.filter(referral_id__in=[referral_id for referral_id, _ in chunk])
+            .values('referral_id')
+            .annotate(total=Sum('amount'))
+            .values_list('referral_id', 'total')
+        )
+        for referral_id, amount in chunk:
+            recorded = ledger_totals.get(referral_id)
+            if recorded != amount:
+                mismatches.append({'type': 'referral', 'referral_id': referral_id,
+                                   'expected': amount, 'recorded': recorded})
+
+    last_id = 0
+    while True:
+        chunk = list(
+            CommissionLedgerEntry.objects.filter(referral__is_commission_due=False, referral_id__gt=last_id)
+            .values('referral_id')
+            .annotate(total=Sum('amount'))
+            .order_by('referral_id')
+            .values_list('referral_id', 'total')[:chunk_size]
+        )
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+        for referral_id, recorded in chunk:
+            mismatches.append({'type': 'referral', 'referral_id': referral_id,
+                               'expected': None, 'recorded': recorded})
+
+    ledger_groups = (
+        CommissionLedgerEntry.objects.values('week_start', 'company_id')
+        .annotate(count=Count('id'), total=Sum('amount'))
+        .order_by('week_start', 'company_id')
+    )
+    stored = WeeklyCommissionRollup.objects.order_by('week_start', 'company_id')
+    cursor = None
+    while True:
+        ledger_rollups = {
+            (row['week_start'], row['company_id']): (row['count'], row['total'])
+            for row in ledger_groups.filter(_key_after(cursor))[:chunk_size]
+        }
+        if ledger_rollups:
+            # Bu parçanın anahtar aralığındaki (defterde karşılığı olmayanlar dahil) özetler
+            upper = max(ledger_rollups)
+            rows = stored.filter(_key_after(cursor), _key_up_to(upper))
+        else:
+            # Defter bitti; kalan özetlerin hiçbirinin defterde karşılığı yok
+            rows = stored.filter(_key_after(cursor))[:chunk_size]
+        stored_rollups = {
+            (week_start, company_id): (count, total)
+            for week_start, company_id, count, total in rows.values_list(
+                'week_start', 'company_id', 'referral_count', 'total_amount'
+            )
+        }
+        if not ledger_rollups and not stored_rollups:
+            break
+        cursor = upper if ledger_rollups else max(stored_rollups)
+
+        for key in sorted(ledger_rollups.keys() | stored_rollups.keys()):
+            if ledger_rollups.get(key) != stored_rollups.get(key):
+                mismatches.append({'type': 'rollup', 'company_id': key[1], 'week_start': key[0],
+                                   'expected': ledger_rollups.get(key), 'recorded': stored_rollups.get(key)})
+
+    return mismatches
@@ -0,0 +1,85 @@
+# core/db.py
+"""
+Veritabanı yardımcıları.
+"""
+
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection, connections
+
+logger = logging.getLogger(__name__)
+
+_TRANSIENT_LOCK_MESSAGES = ('database is locked', 'database table is locked', 'database is busy')
+
+
+def is_transient_lock_error(error):
+    return isinstance(error, OperationalError) and any(
+        message in str(error).lower() for message in _TRANSIENT_LOCK_MESSAGES
+    )
+
+
+def retry_on_lock(func=None, *, retries=None, backoff=None):
+    """Geçici SQLite kilit hatalarında fonksiyonu üstel bekleme (jitter'lı) ile tekrar çalıştırır.
+
+    Yalnızca kendi transaction'ını açan iş birimlerine uygulanmalıdır: dış bir `atomic`
+    bloğunun içindeyken hata olduğu gibi yükseltilir, çünkü tekrar denemek dış
+    transaction'ın yarım kalmış işini geri getiremez.
+    """
+    if func is None:
+        return functools.partial(retry_on_lock, retries=retries, backoff=backoff)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        attempts = settings.DB_LOCK_RETRIES if retries is None else retries
+        delay = settings.DB_LOCK_RETRY_BACKOFF if backoff is None else backoff
+        for attempt in range(attempts + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as error:
+                if attempt == attempts or connection.in_atomic_block or not is_transient_lock_error(error):
+                    raise
+                logger.warning("%s: veritabanı kilitli, %s. deneme %.2f sn sonra.", func.__name__, attempt + 1, delay)
+                time.sleep(delay * (1 + random.random()))
+                delay *= 2
+
+    return wrapper
+
+
+def estimate_count(queryset, cap=1000):
+    """Büyük tablolarda `COUNT(*)` yerine ucuz bir satır sayısı döndürür: (sayı, tahmini mi).
+
+    Filtresiz sorguda tablo istatistiği kullanılır (PostgreSQL `reltuples`, SQLite
+    `sqlite_stat1` veya yoksa en büyük birincil anahtar). Filtreli sorgu en fazla `cap`
+    satır sayar; sınıra ulaşılırsa sonuç "en az `cap`" anlamında tahminidir.
+    """
+    if queryset.query.where:
+        count = queryset.order_by()[:cap].count()
+        return count, count >= cap
+
+    meta = queryset.model._meta
+    db_connection = connections[queryset.db]
+    quote = db_connection.ops.quote_name
+    with db_connection.cursor() as cursor:
+        if db_connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [meta.db_table])
+            row = cursor.fetchone()
+        elif db_connection.vendor == 'sqlite':
+            row = None
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                # stat sütununun ilk sayısı, son ANALYZE anında tablodaki satır sayısıdır
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [meta.db_table])
+                stat = cursor.fetchone()
+                row = (int(stat[0].split()[0]),) if stat and stat[0] else None
+            if row is None:
+                cursor.execute(f"SELECT MAX({quote(meta.pk.column)}) FROM {quote(meta.db_table)}")
+                row = cursor.fetchone()
+        else:
+            row = None
+    if row and row[0] is not None and row[0] >= 0:
+        return int(row[0]), True
+    return queryset.count(), False
@@ -0,0 +1,118 @@
+# core/dedup.py
+"""
+Tekrarlanan / spam talep tespiti.
+
+Anahtar: normalize edilmiş e-posta + hizmet + firma. Son `REFERRAL_DUPLICATE_WINDOW_MINUTES`
+dakika içinde görülen anahtarlar süreç içindeki dönen (rotating) Bloom filtresinde tutulur:
+- Filtre "görülmedi" derse talep doğrudan kabul edilir (ek sorgu yok).
+- Filtre "belki görüldü" derse indeksli bir veritabanı sorgusuyla doğrulanır; gerçekten
+  tekrar ise hiçbir yazma yapılmadan reddedilir.
+
+Filtre her worker'da ayrıdır; bu yüzden aynı anahtar her worker'dan en fazla bir kez
+geçebilir, yüzlerce tekrar ise ucuz şekilde reddedilir.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.models import ReferralRequest
+
+DUPLICATE_WINDOW = timedelta(minutes=getattr(settings, 'REFERRAL_DUPLICATE_WINDOW_MINUTES', 60))
+# Pencere başına beklenen farklı anahtar sayısı ve hedef yanlış pozitif oranı
+BLOOM_CAPACITY = getattr(settings, 'REFERRAL_DUPLICATE_BLOOM_CAPACITY', 100000)
+BLOOM_ERROR_RATE = 0.01
+BLOOM_GENERATIONS = 4
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+def duplicate_key(email, service_id, company_id):
+    return f'{normalize_email(email)}|{service_id}|{company_id}'
+
+
+class BloomFilter:
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # Çift hash yöntemi: k konum iki 64 bitlik hash'ten türetilir
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RotatingBloomFilter:
+    """Kayan pencere: pencere `generations` dilime bölünür, en eski dilim düşürülür."""
+
+    def __init__(self, window_seconds, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE,
+                 generations=BLOOM_GENERATIONS, clock=time.monotonic):
+        self.slice_seconds = window_seconds / generations
+        self.capacity = max(1, capacity // generations)
+        self.error_rate = error_rate
+        self.clock = clock
+        self._lock = threading.Lock()
+        # Pencerenin tamamını kapsamak için bir dilim fazlası tutulur
+        self._generations = deque(maxlen=generations + 1)
+        self._started = None
+
+    def _rotate(self):
+        now = self.clock()
+        if self._started is None:
+            elapsed_slices = 1
+        else:
+            elapsed_slices = int((now - self._started) // self.slice_seconds)
+        if elapsed_slices <= 0:
+            return
+        # Uzun süre boşta kalındıysa geçen dilim sayısı kadar (en fazla tamamı) eski dilim düşer
+        for _ in range(min(elapsed_slices, self._generations.maxlen)):
+            self._generations.append(BloomFilter(self.capacity, self.error_rate))
+        self._started = now if self._started is None else self._started + elapsed_slices * self.slice_seconds
+
+    def add(self, key):
+        with self._lock:
+            self._rotate()
+            self._generations[-1].add(key)
+
+    def __contains__(self, key):
+        with self._lock:
+            self._rotate()
+            return any(key in generation for generation in self._generations)
+
+
+recent_referrals = RotatingBloomFilter(DUPLICATE_WINDOW.total_seconds())
+
+
+def is_duplicate(email, service_id, company_id):
+    """Aynı müşteri aynı firmaya aynı hizmet için pencere içinde talep gönderdi mi?"""
+    if duplicate_key(email, service_id, company_id) not in recent_referrals:
+        return False
+    return ReferralRequest.objects.filter(
+        target_company_id=company_id,
+        requested_service_id=service_id,
+        customer_email=normalize_email(email),
+        created_at__gte=timezone.now() - DUPLICATE_WINDOW,
+    ).exists()
+
+
+def remember(email, service_id, company_id):
+    recent_referrals.add(duplicate_key(email, service_id, company_id))
@@ -0,0 +1,111 @@
+# core/events.py
+"""
+Talep olay kaydı için tamponlu yazıcı.
+
+Olaylar istek sırasında yalnızca bellekteki tampona eklenir (transaction commit
+edildikten sonra). Tampon, yanıt istemciye gönderildikten sonra (`request_finished`)
+yeterince dolmuşsa veya en eski olay `REFERRAL_EVENTS_MAX_DELAY` saniyeden eskiyse
+tek bir `bulk_create` ile boşaltılır. Böylece olay yazımı isteğin kritik yolunda değildir.
+Arka plan görevleri ve süreç kapanışı tamponu doğrudan `flush()` ile boşaltır.
+"""
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import transaction
+from django.utils import timezone
+
+from core.db import retry_on_lock
+from core.models import ReferralEvent
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, 'REFERRAL_EVENTS_BATCH_SIZE', 200)
+MAX_DELAY_SECONDS = getattr(settings, 'REFERRAL_EVENTS_MAX_DELAY', 2)
+
+
+class ReferralEventBuffer:
+
+    def __init__(self, batch_size=BATCH_SIZE, max_delay=MAX_DELAY_SECONDS):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._pending = []
+        self._oldest = None
+
+    def _append(self, events):
+        with self._lock:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.extend(events)
+
+    def record(self, referral_ids, event_type, actor_id=None):
+        """Olayları tampona ekler; açık bir transaction varsa commit sonrasına ertelenir."""
+        now = timezone.now()
+        events = [
+            ReferralEvent(referral_id=referral_id, event_type=event_type, actor_id=actor_id, created_at=now)
+            for referral_id in referral_ids
+        ]
+        if events:
+            transaction.on_commit(lambda: self._append(events))
+
+    def due(self):
+        with self._lock:
+            if not self._pending:
+                return False
+            return len(self._pending) >= self.batch_size or time.monotonic() - self._oldest >= self.max_delay
+
+    def flush(self):
+        """Tampondaki tüm olayları tek bir bulk_create ile yazar. Yazılan olay sayısını döndürür."""
+        with self._lock:
+            events, self._pending, self._oldest = self._pending, [], None
+        if not events:
+            return 0
+        try:
+            # Aynı kullanıcının ikinci 'viewed' olayı benzersizlik kısıtına takılır ve atlanır
+            retry_on_lock(ReferralEvent.objects.bulk_create)(events, batch_size=self.batch_size, ignore_conflicts=True)
+        except Exception:
+            logger.exception("%s talep olayı yazılamadı.", len(events))
+            return 0
+        return len(events)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+
+referral_events = ReferralEventBuffer()
+
+
+def record_referral_event(referral_ids, event_type, actor=None):
+    actor_id = getattr(actor, 'pk', None) if actor is not None else None
+    referral_events.record(referral_ids, event_type, actor_id=actor_id)
+
+
+def record_first_views(referral_ids, actor):
+    """Kullanıcının talepleri ilk görüntülemesini kaydeder; daha önce görülenler atlanır.
+
+    Firma paneli listeyi periyodik olarak yeniler; her yenilemede olay yazılmaması için
+    mevcut 'viewed' olayları tek indeksli sorguyla elenir. Henüz tampondaki kopyaları
+    `referral_event_first_view_uniq` kısıtı yazım sırasında eler.
+    """
+    referral_ids = list(referral_ids)
+    if not referral_ids:
+        return
+    seen = set(ReferralEvent.objects.filter(
+        referral_id__in=referral_ids, actor_id=actor.pk, event_type='viewed',
+    ).values_list('referral_id', flat=True))
+    record_referral_event([referral_id for referral_id in referral_ids if referral_id not in seen], 'viewed', actor=actor)
+
+
+def _flush_after_request(sender, **kwargs):
+    if referral_events.due():
+        referral_events.flush()
+
+
+request_finished.connect(_flush_after_request, dispatch_uid='core.events.flush_after_request')
+atexit.register(referral_events.flush)
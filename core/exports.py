@@ -0,0 +1,105 @@
+# core/exports.py
+"""
+Yönlendirme taleplerinin (ReferralRequest) CSV / NDJSON olarak akış halinde dışa aktarımı.
+
+Satırlar `values()` projeksiyonu ve `.iterator(chunk_size=...)` ile parça parça okunur,
+böylece tablo ne kadar büyük olursa olsun bellek kullanımı sabit kalır.
+"""
+
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+# Veritabanından okunacak kolonlar (JOIN'ler values() tarafından tek sorguda yapılır)
+EXPORT_FIELDS = [
+    'id',
+    'customer_name',
+    'customer_email',
+    'status',
+    'created_at',
+    'updated_at',
+    'target_company_id',
+    'target_company__name',
+    'requested_service_id',
+    'requested_service__title',
+    'is_commission_due',
+    'commission_amount',
+]
+
+# Dışa aktarılan dosyadaki kolon başlıkları (EXPORT_FIELDS ile aynı sırada)
+EXPORT_HEADERS = [
+    'id',
+    'customer_name',
+    'customer_email',
+    'status',
+    'created_at',
+    'updated_at',
+    'company_id',
+    'company_name',
+    'service_id',
+    'service_title',
+    'is_commission_due',
+    'commission_amount',
+]
+
+# Hesap tablosunda formül olarak yorumlanan başlangıç karakterleri (CSV/formula injection)
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+DEFAULT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """csv.writer için tamponsuz 'dosya': yazılan satırı olduğu gibi geri döndürür."""
+
+    def write(self, value):
+        return value
+
+
+def _iter_rows(queryset, chunk_size):
+    return queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def _csv_cell(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    # Kullanıcı girdisi metinler formül olarak çalışmasın diye ' ile başlatılır
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_referrals_csv(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Talepleri CSV satırları olarak üretir (ilk satır başlıktır).
+
+    Metin hücreleri `=`, `+`, `-`, `@` gibi formül karakterleriyle başlıyorsa başına `'`
+    eklenir; NDJSON çıktısı değiştirilmez.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_HEADERS)
+    for row in _iter_rows(queryset, chunk_size):
+        yield writer.writerow(_csv_cell(value) for value in row)
+
+
+def iter_referrals_ndjson(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Talepleri her satırda bir JSON objesi olacak şekilde üretir."""
+    encoder = DjangoJSONEncoder()
+    for row in _iter_rows(queryset, chunk_size):
+        yield encoder.encode(dict(zip(EXPORT_HEADERS, row))) + '\n'
+
+
+def stream_referrals(queryset, export_format='csv', filename='referrals', chunk_size=DEFAULT_CHUNK_SIZE):
+    """Verilen queryset'i istenen formatta StreamingHttpResponse olarak döndürür."""
+    if export_format == 'ndjson':
+        response = StreamingHttpResponse(
+            iter_referrals_ndjson(queryset, chunk_size),
+            content_type='application/x-ndjson',
+        )
+    else:
+        response = StreamingHttpResponse(
+            iter_referrals_csv(queryset, chunk_size),
+            content_type='text/csv; charset=utf-8',
+        )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
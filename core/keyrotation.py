@@ -0,0 +1,85 @@
+# core/keyrotation.py
+"""
+Fernet anahtar rotasyonu.
+
+`Company.encrypted_sensitive_data` kayıtları birincil anahtar sırasıyla `chunk_size`
+boyutunda parçalar halinde okunur, eski anahtarla şifrelenmiş olanlar `MultiFernet.rotate`
+ile ilk (en yeni) anahtara taşınır ve parça tek `bulk_update` ile yazılır. Her parça
+kendi transaction'ında kilitlenerek işlenir; böylece işlem uzun süre tek bir kilit tutmaz.
+
+İşlem kaldığı yerden sürdürülebilir: zaten yeni anahtarla şifreli kayıtlar atlanır ve
+ilerleme bildirimindeki `last_pk` değeri `start_after` olarak verilebilir.
+"""
+
+import time
+from dataclasses import dataclass, field
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from django.conf import settings
+from django.db import transaction
+
+from core.models import Company
+
+
+@dataclass
+class RotationProgress:
+    rotated: int = 0
+    skipped: int = 0   # Zaten en yeni anahtarla şifreli
+    failed: int = 0    # Hiçbir anahtarla çözülemedi, olduğu gibi bırakıldı
+    last_pk: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def processed(self):
+        return self.rotated + self.skipped + self.failed
+
+    @property
+    def rows_per_second(self):
+        elapsed = time.monotonic() - self.started
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+
+def _is_current(current, token):
+    try:
+        current.decrypt(token)
+    except InvalidToken:
+        return False
+    return True
+
+
+def rotate_sensitive_data(chunk_size=500, start_after=0, on_progress=None, keys=None):
+    """Tüm firmaların hassas verisini en yeni anahtara taşır; `RotationProgress` döndürür."""
+    fernets = [Fernet(key.encode('utf-8')) for key in (keys or settings.FERNET_KEYS)]
+    current, multi = fernets[0], MultiFernet(fernets)
+    progress = RotationProgress(last_pk=start_after)
+    base = Company.objects.exclude(encrypted_sensitive_data__isnull=True).exclude(encrypted_sensitive_data='')
+
+    while True:
+        with transaction.atomic():
+            chunk = list(
+                base.select_for_update().filter(pk__gt=progress.last_pk)
+                .order_by('pk').only('pk', 'encrypted_sensitive_data')[:chunk_size]
+            )
+            if not chunk:
+                break
+
+            changed = []
+            for company in chunk:
+                token = company.encrypted_sensitive_data.encode('utf-8')
+                if _is_current(current, token):
+                    progress.skipped += 1
+                    continue
+                try:
+                    company.encrypted_sensitive_data = multi.rotate(token).decode('utf-8')
+                except InvalidToken:
+                    progress.failed += 1
+                    continue
+                changed.append(company)
+            Company.objects.bulk_update(changed, ['encrypted_sensitive_data'])
+
+        progress.rotated += len(changed)
+        progress.last_pk = chunk[-1].pk
+        if on_progress:
+            on_progress(progress)
+
+    return progress
@@ -0,0 +1,64 @@
+"""
+Management command to bulk import companies and services from CSV or JSONL.
+Usage: python manage.py import_catalog --companies firms.csv --services services.jsonl --batch-size 2000
+
+Companies are matched by slug, services by (company_slug, external_id); service rows
+without an external_id are rejected (titles are not unique per company). Only the
+columns present in the file are updated. Invalid rows are skipped and written to
+--rejects with their line number and errors. Realtime search index signals are
+suspended during the run; changed services are reindexed once at the end.
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.catalog_import import (
+    RejectLog, import_companies, import_services, reindex_services, search_signals_suspended,
+)
+
+
+class Command(BaseCommand):
+    help = 'Bulk upsert companies and services from CSV/JSONL files in batched transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--companies', type=str, help='CSV/JSONL file with company rows')
+        parser.add_argument('--services', type=str, help='CSV/JSONL file with service rows (company_slug, external_id, title, ...); '
+                                 'rows without external_id are rejected')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows validated and written per transaction')
+        parser.add_argument('--rejects', type=str, default='import_rejects.jsonl', help='Where to write rejected rows')
+        parser.add_argument('--skip-index', action='store_true', help='Do not reindex changed services at the end')
+
+    def handle(self, *args, **options):
+        started_at = timezone.now()
+        rejects = RejectLog(options['rejects'])
+        results = []
+
+        def report(stats):
+            self.stdout.write(
+                f"  {stats.kind}: {stats.processed} rows (imported {stats.imported}, rejected {stats.rejected}), "
+                f"{stats.rows_per_second:.0f} rows/s"
+            )
+
+        try:
+            with search_signals_suspended():
+                if options['companies']:
+                    self.stdout.write(f"Importing companies from {options['companies']}...")
+                    results.append(import_companies(options['companies'], rejects, options['batch_size'], report))
+                if options['services']:
+                    self.stdout.write(f"Importing services from {options['services']}...")
+                    results.append(import_services(options['services'], rejects, options['batch_size'], report))
+        finally:
+            rejects.close()
+
+        for stats in results:
+            style = self.style.WARNING if stats.rejected else self.style.SUCCESS
+            self.stdout.write(style(
+                f"✓ {stats.kind}: {stats.imported} imported, {stats.rejected} rejected "
+                f"({stats.rows_per_second:.0f} rows/s)"
+            ))
+        if any(stats.rejected for stats in results):
+            self.stdout.write(self.style.WARNING(f"Rejected rows written to {options['rejects']}"))
+
+        if not options['skip_index']:
+            self.stdout.write('Reindexing changed services...')
+            self.stdout.write(self.style.SUCCESS(f"✓ Reindexed {reindex_services(started_at)} services"))
@@ -1,12 +1,26 @@
 """
 Management command to load categories from JSON fixture.
-Usage: python manage.py load_categories
+Usage: python manage.py load_categories [--file path] [--delete-missing] [--dry-run]
+
+The fixture and the existing categories are each read once; the diff is computed in
+memory and applied with one bulk INSERT and one bulk UPDATE. Unchanged categories cost
+nothing beyond the initial SELECT. With --delete-missing, categories whose slug is not
+in the file are deleted (services keep a NULL category), deepest first since
+Category.parent is PROTECT. The command refuses to run when a category missing from the
+file still has a subcategory that is in the file.
 """
 
 import json
+
 from django.core.management.base import BaseCommand
-from django.core.files.base import ContentFile
-from core.models import Category
+from django.db import transaction
+from django.db.models import CharField, Max, Value
+from django.db.models.functions import Cast, Concat, LPad
+from django.utils import timezone
+
+from core.cards import refresh_category_cards
+from core.models import CATEGORY_PATH_STEP, Category, category_path_segment
+from core.versions import CATEGORIES, bump_version
 
 
 class Command(BaseCommand):
@@ -19,10 +33,20 @@ class Command(BaseCommand):
             default='core/fixtures/categories.json',
             help='Path to categories JSON file',
         )
+        parser.add_argument(
+            '--delete-missing',
+            action='store_true',
+            help='Delete categories whose slug is not in the file (refused if a kept subcategory would go with them)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only print the diff, do not write anything',
+        )
 
     def handle(self, *args, **options):
         file_path = options['file']
-        
+
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 categories_data = json.load(f)
@@ -33,31 +57,75 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR(f'Invalid JSON in file: {file_path}'))
             return
 
-        created_count = 0
-        updated_count = 0
-
+        wanted = {}
         for category_data in categories_data:
             name = category_data.get('name')
             slug = category_data.get('slug')
-            description = category_data.get('description', '')
 
             if not name or not slug:
                 self.stdout.write(self.style.WARNING(f'Skipping category with missing name or slug: {category_data}'))
                 continue
+            wanted[slug] = {'name': name, 'description': category_data.get('description', '')}
+
+        existing = {category.slug: category for category in Category.objects.only('id', 'name', 'slug', 'description', 'path')}
+
+        now = timezone.now()
+        to_create, to_update, renamed = [], [], []
+        for slug, values in wanted.items():
+            category = existing.get(slug)
+            if category is None:
+                to_create.append(Category(slug=slug, **values))
+            elif (category.name, category.description) != (values['name'], values['description']):
+                if category.name != values['name']:
+                    renamed.append(category.pk)
+                category.name, category.description, category.updated_at = values['name'], values['description'], now
+                to_update.append(category)
+        to_delete = [category for slug, category in existing.items() if slug not in wanted] if options['delete_missing'] else []
+        unchanged = len(wanted) - len(to_create) - len(to_update)
+
+        kept_paths = [category.path for slug, category in existing.items() if slug in wanted and category.path]
+        blocked = [
+            category.slug for category in to_delete
+            if category.path and any(path != category.path and path.startswith(category.path) for path in kept_paths)
+        ]
+        if blocked:
+            self.stdout.write(self.style.ERROR(
+                f"Refusing to delete categories with subcategories kept in the file: {', '.join(sorted(blocked))}. "
+                'Add them to the file or move their subcategories first.'
+            ))
+            return
+
+        if options['verbosity'] > 1:
+            for label, categories in (('Create', to_create), ('Update', to_update), ('Delete', to_delete)):
+                for category in categories:
+                    self.stdout.write(f'{label}: {category.slug} ({category.name})')
+
+        if not options['dry_run'] and (to_create or to_update or to_delete):
+            with transaction.atomic():
+                # Sinyaller kartları ve sürümleri günceller; silme yeni adlara yer açmak için önce yapılır.
+                # parent PROTECT olduğu için alt kategoriler üst kategorilerinden önce, derinlik sırasıyla silinir
+                for depth in sorted({category.path.count('/') for category in to_delete}, reverse=True):
+                    Category.objects.filter(
+                        pk__in=[category.pk for category in to_delete if category.path.count('/') == depth]
+                    ).delete()
+                if to_update:
+                    Category.objects.bulk_update(to_update, ['name', 'description', 'updated_at'])
+                if to_create:
+                    Category.objects.bulk_create(to_create)
+                    # bulk_create save() çağırmaz; yeni kök kategorilerin path'i tek UPDATE ile yazılır.
+                    # LPad uzun id'yi sessizce keseceği için genişlik önce kontrol edilir (hata tümünü geri alır)
+                    created = Category.objects.filter(slug__in=[category.slug for category in to_create], path='')
+                    category_path_segment(created.aggregate(newest=Max('id'))['newest'])
+                    created.update(
+                        path=Concat(LPad(Cast('id', CharField()), CATEGORY_PATH_STEP, Value('0')), Value('/'))
+                    )
+                if to_create or to_update:
+                    bump_version(CATEGORIES)
+                if renamed:
+                    refresh_category_cards(renamed)
 
-            category, created = Category.objects.update_or_create(
-                slug=slug,
-                defaults={
-                    'name': name,
-                    'description': description,
-                }
-            )
-
-            if created:
-                created_count += 1
-                self.stdout.write(self.style.SUCCESS(f'Created category: {name}'))
-            else:
-                updated_count += 1
-                self.stdout.write(self.style.SUCCESS(f'Updated category: {name}'))
-
-        self.stdout.write(self.style.SUCCESS(f'\n✓ Loaded {created_count} new categories and updated {updated_count}'))
+        prefix = 'Would load' if options['dry_run'] else 'Loaded'
+        summary = f'{len(to_create)} new, {len(to_update)} updated, {unchanged} unchanged'
+        if options['delete_missing']:
+            summary += f', {len(to_delete)} deleted'
+        self.stdout.write(self.style.SUCCESS(f'\n✓ {prefix} categories: {summary}'))
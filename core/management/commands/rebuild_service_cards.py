@@ -0,0 +1,25 @@
+"""
+Management command to rebuild the ServiceCard read model from Service/Company/Category.
+Usage: python manage.py rebuild_service_cards
+
+Only needed after writes that bypass model signals (raw SQL, QuerySet.update, bulk_create
+without refresh_service_cards) or to verify the read model; normal saves keep it in sync.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.cards import rebuild_service_cards
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the flattened ServiceCard table used by public listings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Services read per batch')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = rebuild_service_cards(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"✓ {total} service cards rebuilt in {time.perf_counter() - started:.2f}s"))
@@ -0,0 +1,37 @@
+"""
+Management command to re-encrypt Company sensitive data with the newest Fernet key.
+Usage: FERNET_KEYS="<new key>,<old key>" python manage.py rotate_fernet_keys --chunk-size 500
+
+Safe to interrupt: rows already on the newest key are skipped, and the printed
+`last pk` can be passed back with --start-after to resume exactly where it stopped.
+Remove the old key from FERNET_KEYS only after a run reports 0 failed rows.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.keyrotation import rotate_sensitive_data
+
+
+class Command(BaseCommand):
+    help = 'Re-encrypt Company.encrypted_sensitive_data with the first key in FERNET_KEYS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Rows locked and updated per batch')
+        parser.add_argument('--start-after', type=int, default=0, help='Resume after this Company pk')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Rotating to newest of {len(settings.FERNET_KEYS)} configured key(s)...")
+        progress = rotate_sensitive_data(
+            chunk_size=options['chunk_size'],
+            start_after=options['start_after'],
+            on_progress=lambda p: self.stdout.write(
+                f"  {p.processed} rows (rotated {p.rotated}, skipped {p.skipped}, failed {p.failed}), "
+                f"last pk {p.last_pk}, {p.rows_per_second:.0f} rows/s"
+            ),
+        )
+        style = self.style.WARNING if progress.failed else self.style.SUCCESS
+        self.stdout.write(style(
+            f"\n✓ {progress.rotated} rotated, {progress.skipped} already current, {progress.failed} failed "
+            f"({progress.rows_per_second:.0f} rows/s)"
+        ))
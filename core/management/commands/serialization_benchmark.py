@@ -0,0 +1,87 @@
+"""
+Management command to compare list serialization paths across response sizes.
+Usage: python manage.py serialization_benchmark --sizes 10 100 500 2000 --repeat 20
+
+Runs on a throwaway test database (the project database is never touched) with
+ReferralRequestOut rows, the deepest list schema (referral -> service -> company/category):
+  - schema + json:   Schema.from_orm per row, ninja's default json.dumps renderer (before)
+  - schema + orjson: Schema.from_orm per row, ORJSONRenderer
+  - bulk + orjson:   one values_list() projection, ORJSONRenderer (list endpoints now)
+"""
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from ninja.renderers import JSONRenderer
+
+from core.api.schemas import ReferralRequestOut
+from core.api.serialization import renderer, serialize_rows
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-object schema serialization against the bulk values() path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500, 2000], help='Rows per response')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per variant and size')
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self._populate(max(options['sizes']))
+            self._run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _populate(self, count):
+        from core.models import Category, Company, ReferralRequest, Service
+
+        category = Category.objects.create(name='Tesisat', slug='tesisat', description='')
+        company = Company.objects.create(
+            name='Firma', slug='firma', description='Açıklama ' * 20, location_text='Izmir, Konak',
+            phone='0232 000 00 00', email='info@example.com', min_order_amount=100, default_delivery_fee=10,
+        )
+        services = Service.objects.bulk_create([
+            Service(company=company, category=category, title=f'Hizmet {i}', description='Detay ' * 10,
+                    price_range_min=100, price_range_max=500)
+            for i in range(50)
+        ])
+        ReferralRequest.objects.bulk_create([
+            ReferralRequest(customer_name=f'Müşteri {i}', customer_email=f'm{i}@example.com',
+                            target_company=company, requested_service=services[i % len(services)])
+            for i in range(count)
+        ], batch_size=1000)
+
+    def _run(self, options):
+        from core.models import ReferralRequest
+
+        legacy = JSONRenderer()
+        base = ReferralRequest.objects.select_related(
+            'requested_service__company', 'requested_service__category').order_by('-created_at')
+
+        def per_object(rend, size):
+            data = [ReferralRequestOut.from_orm(obj).model_dump() for obj in base[:size]]
+            return rend.render(None, data, response_status=200)
+
+        variants = {
+            'schema + json': lambda size: per_object(legacy, size),
+            'schema + orjson': lambda size: per_object(renderer, size),
+            'bulk + orjson': lambda size: renderer.render(
+                None, serialize_rows(base[:size], ReferralRequestOut), response_status=200),
+        }
+        self.stdout.write(f"ReferralRequestOut, median of {options['repeat']} runs (ms):")
+        self.stdout.write(f"  {'rows':>6} " + ''.join(f"{name:>18}" for name in variants) + f"{'speedup':>10}")
+        for size in options['sizes']:
+            medians = []
+            for build in variants.values():
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    build(size)
+                    timings.append((time.perf_counter() - started) * 1000)
+                medians.append(statistics.median(timings))
+            self.stdout.write(f"  {size:>6} " + ''.join(f"{m:>18.2f}" for m in medians)
+                              + f"{medians[0] / medians[-1]:>9.1f}x")
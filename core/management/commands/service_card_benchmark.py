@@ -0,0 +1,90 @@
+"""
+Management command to compare public service listing via joins vs the ServiceCard read model.
+Usage: python manage.py service_card_benchmark --services 5000 --repeat 20
+
+Runs on a throwaway test database (the project database is never touched). For each
+variant it measures query + serialization + JSON rendering, like the search endpoint.
+"""
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.api.router import api
+from core.api.schemas import ServiceCardSchema, ServiceSchema
+
+
+class Command(BaseCommand):
+    help = 'Benchmark join-and-serialize listing against the flattened ServiceCard table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=5000, help='Number of services to generate')
+        parser.add_argument('--companies', type=int, default=500, help='Number of companies to generate')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per variant')
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self._populate(options)
+            self._run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _populate(self, options):
+        from core.cards import rebuild_service_cards
+        from core.models import Category, Company, Service
+
+        categories = Category.objects.bulk_create([
+            Category(name=f'Kategori {i}', slug=f'kategori-{i}', description='') for i in range(20)
+        ])
+        companies = Company.objects.bulk_create([
+            Company(
+                name=f'Firma {i}', slug=f'firma-{i}', description='Açıklama ' * 20, location_text='Izmir, Konak',
+                phone='0232 000 00 00', email=f'info{i}@example.com', tax_number='1234567890',
+                trade_registry_number='123456', logo='https://example.com/logo.png',
+                cover_image='https://example.com/cover.png', min_order_amount=100, default_delivery_fee=10,
+                estimated_delivery_time_minutes=45,
+            )
+            for i in range(options['companies'])
+        ])
+        Service.objects.bulk_create([
+            Service(
+                company=companies[i % len(companies)], category=categories[i % len(categories)],
+                title=f'Hizmet {i}', description='Hizmet detayı ' * 10, keywords='kombi, bakım',
+                price_range_min=100, price_range_max=500,
+            )
+            for i in range(options['services'])
+        ], batch_size=1000)
+        rebuild_service_cards()
+
+    def _measure(self, build, repeat):
+        timings, size = [], 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            size = len(build())
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), size
+
+    def _run(self, options):
+        from core.models import Category, Service, ServiceCard
+
+        def render(schema, rows):
+            return api.renderer.render(None, [schema.from_orm(row).model_dump() for row in rows], response_status=200)
+
+        variants = {
+            'join (Service+Company+Category)': lambda: render(
+                ServiceSchema, Service.objects.select_related('company', 'category')),
+            'read model (ServiceCard)': lambda: render(ServiceCardSchema, ServiceCard.objects.all()),
+            'join, category filter': lambda: render(
+                ServiceSchema, Service.objects.select_related('company', 'category').filter(category__slug='kategori-3')),
+            'read model, category filter': lambda: render(
+                ServiceCardSchema, ServiceCard.objects.filter(category_id__in=Category.objects.filter(slug='kategori-3').values('id'))),
+        }
+        self.stdout.write(f"{options['services']} services, {options['companies']} companies, "
+                          f"median of {options['repeat']} runs:")
+        for name, build in variants.items():
+            median, size = self._measure(build, options['repeat'])
+            self.stdout.write(f"  {name:<34} {median:8.1f} ms  {size / 1024:8.0f} KB")
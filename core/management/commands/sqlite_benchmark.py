@@ -0,0 +1,134 @@
+"""
+Management command to benchmark concurrent SQLite reads/writes with default vs tuned settings.
+Usage: python manage.py sqlite_benchmark --writers 4 --readers 4 --duration 10
+
+Each worker is a separate process (like Q-Cluster and web workers) working on a scratch
+database file, so the project database is never touched.
+"""
+
+import multiprocessing
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+PROFILES = ('default', 'tuned')
+
+
+def _connect(path, profile):
+    if profile == 'tuned':
+        conn = sqlite3.connect(path, timeout=20, isolation_level=None)
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            conn.execute(f'PRAGMA {name}={value}')
+    else:
+        # Django varsayılanı: rollback journal, synchronous=FULL, 5 sn timeout, DEFERRED transaction
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=DELETE')
+    return conn
+
+
+def _setup(path):
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE company (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE referral (
+            id INTEGER PRIMARY KEY, company_id INTEGER, email TEXT, status TEXT, created_at REAL
+        );
+        CREATE INDEX referral_company ON referral (company_id, status);
+    ''')
+    conn.executemany('INSERT INTO company (id, name) VALUES (?, ?)', [(i, f'Firma {i}') for i in range(1, 101)])
+    conn.executemany(
+        'INSERT INTO referral (company_id, email, status, created_at) VALUES (?, ?, ?, ?)',
+        [(i % 100 + 1, f'c{i}@example.com', 'pending', time.time()) for i in range(20000)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _worker(path, profile, role, duration, results):
+    conn = _connect(path, profile)
+    begin = 'BEGIN IMMEDIATE' if profile == 'tuned' else 'BEGIN'
+    retries = settings.DB_LOCK_RETRIES if profile == 'tuned' else 0
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    n = os.getpid()
+
+    while time.monotonic() < deadline:
+        n += 1
+        started = time.perf_counter()
+        delay = settings.DB_LOCK_RETRY_BACKOFF
+        for attempt in range(retries + 1):
+            try:
+                if role == 'write':
+                    # Talep oluşturma + başka bir talebin durum değişikliği (okuma sonra yazma)
+                    conn.execute(begin)
+                    conn.execute('SELECT id FROM referral WHERE company_id = ? AND status = ? LIMIT 1',
+                                 (n % 100 + 1, 'pending')).fetchone()
+                    conn.execute('INSERT INTO referral (company_id, email, status, created_at) VALUES (?, ?, ?, ?)',
+                                 (n % 100 + 1, f'w{n}@example.com', 'pending', time.time()))
+                    conn.execute('UPDATE referral SET status = ? WHERE id = ?', ('accepted', n % 20000 + 1))
+                    conn.execute('COMMIT')
+                else:
+                    conn.execute(
+                        'SELECT r.id, r.email, c.name FROM referral r JOIN company c ON c.id = r.company_id '
+                        'WHERE r.company_id = ? ORDER BY r.id DESC LIMIT 50', (n % 100 + 1,)
+                    ).fetchall()
+                latencies.append(time.perf_counter() - started)
+                break
+            except sqlite3.OperationalError:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                if attempt == retries:
+                    errors += 1
+                else:
+                    time.sleep(delay)
+                    delay *= 2
+    conn.close()
+    results.put((role, latencies, errors))
+
+
+class Command(BaseCommand):
+    help = 'Benchmark mixed concurrent SQLite reads and writes with default and tuned settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help='Number of writer processes')
+        parser.add_argument('--readers', type=int, default=4, help='Number of reader processes')
+        parser.add_argument('--duration', type=int, default=10, help='Seconds per profile')
+        parser.add_argument('--profile', choices=PROFILES, action='append', help='Profiles to run (default: both)')
+
+    def handle(self, *args, **options):
+        for profile in options['profile'] or PROFILES:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'bench.sqlite3')
+                _setup(path)
+                self._run(path, profile, options)
+
+    def _run(self, path, profile, options):
+        results = multiprocessing.Queue()
+        roles = ['write'] * options['writers'] + ['read'] * options['readers']
+        processes = [
+            multiprocessing.Process(target=_worker, args=(path, profile, role, options['duration'], results))
+            for role in roles
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        self.stdout.write(self.style.SUCCESS(f'\n{profile}:'))
+        for role in ('write', 'read'):
+            latencies = [value for r, values, _ in collected if r == role for value in values]
+            errors = sum(e for r, _, e in collected if r == role)
+            if not latencies:
+                self.stdout.write(f'  {role}: 0 ops, {errors} lock errors')
+                continue
+            p95 = statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) > 1 else latencies[0] * 1000
+            self.stdout.write(
+                f'  {role}: {len(latencies) / options["duration"]:.0f} ops/s, '
+                f'p95 {p95:.1f} ms, {errors} lock errors'
+            )
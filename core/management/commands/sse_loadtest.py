@@ -0,0 +1,88 @@
+"""
+Management command to load test the SSE notification stream with idle connections.
+Usage: python manage.py sse_loadtest --url "http://127.0.0.1:8000/api/core/events/stream?token=..." --connections 10000
+
+The server must be running under an ASGI server (e.g. `uvicorn ServiceRadar.asgi:application`).
+Both sides need a file descriptor limit above the connection count (`ulimit -n 20000`).
+"""
+
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Open many idle SSE connections and report how many the server keeps alive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', type=str, required=True, help='Full stream URL including ?token=')
+        parser.add_argument('--connections', type=int, default=10000, help='Number of idle connections')
+        parser.add_argument('--duration', type=int, default=60, help='Seconds to hold connections open')
+        parser.add_argument('--ramp', type=int, default=500, help='Connections opened concurrently per step')
+
+    def handle(self, *args, **options):
+        result = asyncio.run(self._run(options))
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✓ {result['connected']}/{options['connections']} connected in {result['connect_seconds']:.1f}s, "
+            f"{result['alive']} still alive after {options['duration']}s, "
+            f"{result['failed']} failed, {result['events']} events/heartbeats received"
+        ))
+
+    async def _run(self, options):
+        url = urlsplit(options['url'])
+        host, port = url.hostname, url.port or 80
+        path = url.path + (f'?{url.query}' if url.query else '')
+        request = (
+            f'GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n'
+        ).encode('latin-1')
+
+        stats = {'connected': 0, 'failed': 0, 'events': 0, 'alive': 0}
+        stop = asyncio.Event()
+
+        async def client():
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+                writer.write(request)
+                await writer.drain()
+                status_line = await reader.readline()
+                if b' 200 ' not in status_line:
+                    stats['failed'] += 1
+                    writer.close()
+                    return
+                stats['connected'] += 1
+            except OSError:
+                stats['failed'] += 1
+                return
+
+            alive = True
+            while not stop.is_set():
+                try:
+                    chunk = await asyncio.wait_for(reader.read(4096), timeout=1)
+                except asyncio.TimeoutError:
+                    continue
+                except OSError:
+                    chunk = b''
+                if not chunk:
+                    alive = False
+                    break
+                stats['events'] += chunk.count(b'\n\n')
+            if alive:
+                stats['alive'] += 1
+            writer.close()
+
+        started = time.monotonic()
+        tasks = []
+        for offset in range(0, options['connections'], options['ramp']):
+            step = min(options['ramp'], options['connections'] - offset)
+            tasks.extend(asyncio.ensure_future(client()) for _ in range(step))
+            await asyncio.sleep(0.2)
+            self.stdout.write(f"Opened {offset + step} connections ({stats['connected']} accepted)")
+        connect_seconds = time.monotonic() - started
+
+        await asyncio.sleep(options['duration'])
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        return {**stats, 'connect_seconds': connect_seconds}
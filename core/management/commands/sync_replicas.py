@@ -0,0 +1,42 @@
+"""
+Management command to refresh local SQLite read replicas from the primary database.
+Usage: DB_REPLICAS=/tmp/replica1.sqlite3 python manage.py sync_replicas
+
+Writes a heartbeat on the primary first, then copies it with SQLite's online backup API,
+so the copied heartbeat marks the moment the replica was taken (used for lag metrics).
+
+Replicas are only as fresh as the last run. When DB_REPLICAS is set, settings add a
+`core.tasks.sync_replicas` entry to the Q-Cluster schedule (every DB_REPLICA_SYNC_MINUTES);
+without a running cluster, run this command from cron at an interval below DB_REPLICA_MAX_LAG.
+"""
+
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.tasks import replica_heartbeat
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database onto each configured file replica'
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        if not settings.DB_REPLICA_ALIASES:
+            raise CommandError('No replicas configured (set DB_REPLICAS).')
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('File replicas require a SQLite primary; other backends replicate themselves.')
+
+        replica_heartbeat()
+        source = sqlite3.connect(primary['NAME'])
+        try:
+            for alias in settings.DB_REPLICA_ALIASES:
+                target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(self.style.SUCCESS(f"✓ {alias} <- {primary['NAME']}"))
+        finally:
+            source.close()
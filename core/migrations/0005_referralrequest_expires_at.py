@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:01
+
+import core.models
+from datetime import timedelta
+from django.db import migrations, models
+
+
+def backfill_expires_at(apps, schema_editor):
+    # Mevcut talepler için son yanıt zamanını oluşturulma anından hesapla
+    ReferralRequest = apps.get_model('core', 'ReferralRequest')
+    ReferralRequest.objects.update(expires_at=models.F('created_at') + timedelta(hours=36))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_category_company_cover_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='referralrequest',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, default=core.models.default_referral_expiry, null=True, verbose_name='Son Yanıt Zamanı'),
+        ),
+        migrations.RunPython(backfill_expires_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='referralrequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['expires_at'], name='referral_pending_expiry_idx'),
+        ),
+    ]
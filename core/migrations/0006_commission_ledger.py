@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_referralrequest_expires_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommissionLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Komisyon Tutarı')),
+                ('week_start', models.DateField(verbose_name='Hafta Başlangıcı')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='commission_entries', to='core.company')),
+                ('referral', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='commission_entries', to='core.referralrequest')),
+            ],
+            options={
+                'verbose_name': 'Komisyon Kaydı',
+                'verbose_name_plural': 'Komisyon Defteri',
+            },
+        ),
+        migrations.CreateModel(
+            name='WeeklyCommissionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField(verbose_name='Hafta Başlangıcı')),
+                ('referral_count', models.PositiveIntegerField(default=0, verbose_name='Kabul Edilen Talep Sayısı')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Toplam Komisyon')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_commissions', to='core.company')),
+            ],
+            options={
+                'verbose_name': 'Haftalık Komisyon Özeti',
+                'verbose_name_plural': 'Haftalık Komisyon Özetleri',
+                'constraints': [models.UniqueConstraint(fields=('company', 'week_start'), name='unique_company_week_rollup')],
+            },
+        ),
+    ]
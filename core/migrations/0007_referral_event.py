@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_commission_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferralEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('created', 'Oluşturuldu'), ('viewed', 'Görüntülendi'), ('accepted', 'Kabul Edildi'), ('rejected', 'Reddedildi'), ('timeout', 'Zaman Aşımı')], max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('referral', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='events', to='core.referralrequest')),
+            ],
+            options={
+                'verbose_name': 'Talep Olayı',
+                'verbose_name_plural': 'Talep Olayları',
+                'indexes': [models.Index(fields=['referral', 'created_at'], name='referral_event_timeline_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_referral_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyReferralStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Günlük'), ('week', 'Haftalık')], max_length=4)),
+                ('bucket_start', models.DateField()),
+                ('created_count', models.PositiveIntegerField(default=0)),
+                ('accepted_count', models.PositiveIntegerField(default=0)),
+                ('rejected_count', models.PositiveIntegerField(default=0)),
+                ('timeout_count', models.PositiveIntegerField(default=0)),
+                ('response_sketch', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='referral_stats', to='core.company')),
+            ],
+            options={
+                'verbose_name': 'Firma Talep İstatistiği',
+                'verbose_name_plural': 'Firma Talep İstatistikleri',
+                'constraints': [models.UniqueConstraint(fields=('company', 'period', 'bucket_start'), name='unique_company_stats_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_company_referral_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='referralrequest',
+            index=models.Index(fields=['target_company', 'requested_service', 'customer_email', 'created_at'], name='referral_duplicate_idx'),
+        ),
+    ]
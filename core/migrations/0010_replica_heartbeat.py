@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_referral_duplicate_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReplicaHeartbeat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('beat_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Replika Heartbeat',
+                'verbose_name_plural': 'Replika Heartbeat',
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_replica_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='referralrequest',
+            index=models.Index(fields=['target_company', 'status', 'created_at'], name='referral_company_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='referralrequest',
+            index=models.Index(fields=['target_company', 'created_at'], name='referral_company_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='referralrequest',
+            index=models.Index(fields=['status', 'created_at'], name='referral_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='referralrequest',
+            index=models.Index(fields=['created_at'], name='referral_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['company', 'category'], name='service_company_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weeklycommissionrollup',
+            index=models.Index(fields=['week_start', 'total_amount'], name='weekly_rollup_week_idx'),
+        ),
+        # FK indeksleri, yerlerini tutan bileşik indeksler oluşturulduktan sonra kaldırılır
+        migrations.AlterField(
+            model_name='referralrequest',
+            name='target_company',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='received_requests', to='core.company'),
+        ),
+        migrations.AlterField(
+            model_name='service',
+            name='company',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='services', to='core.company'),
+        ),
+    ]
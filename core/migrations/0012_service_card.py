@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+CHUNK_SIZE = 1000
+
+
+def build_service_cards(apps, schema_editor):
+    Service = apps.get_model('core', 'Service')
+    ServiceCard = apps.get_model('core', 'ServiceCard')
+    cards = []
+    for service in Service.objects.select_related('company', 'category').iterator(chunk_size=CHUNK_SIZE):
+        company, category = service.company, service.category
+        cards.append(ServiceCard(
+            service_id=service.pk, title=service.title, description=service.description,
+            keywords=service.keywords, price_range_min=service.price_range_min,
+            price_range_max=service.price_range_max, company_id=company.pk, company_name=company.name,
+            company_slug=company.slug, company_location_text=company.location_text, company_logo=company.logo,
+            category_id=category.pk if category else None, category_name=category.name if category else None,
+            category_slug=category.slug if category else None,
+        ))
+        # Kartlar parça parça yazılır; tüm tablo bellekte tek listede tutulmaz
+        if len(cards) >= CHUNK_SIZE:
+            ServiceCard.objects.bulk_create(cards)
+            cards = []
+    if cards:
+        ServiceCard.objects.bulk_create(cards)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceCard',
+            fields=[
+                ('service', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='core.service')),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('keywords', models.CharField(blank=True, max_length=500)),
+                ('price_range_min', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('price_range_max', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('company_id', models.BigIntegerField()),
+                ('company_name', models.CharField(max_length=255)),
+                ('company_slug', models.SlugField()),
+                ('company_location_text', models.CharField(max_length=255)),
+                ('company_logo', models.CharField(blank=True, max_length=1024, null=True)),
+                ('category_id', models.BigIntegerField(blank=True, null=True)),
+                ('category_name', models.CharField(blank=True, max_length=128, null=True)),
+                ('category_slug', models.SlugField(blank=True, max_length=128, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Hizmet Kartı',
+                'verbose_name_plural': 'Hizmet Kartları',
+                'indexes': [models.Index(fields=['category_id', 'service'], name='service_card_category_idx'), models.Index(fields=['company_id'], name='service_card_company_idx')],
+            },
+        ),
+        migrations.RunPython(build_service_cards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_paths(apps, schema_editor):
+    # Mevcut kategorilerin hepsi köktür
+    Category = apps.get_model('core', 'Category')
+    for category in Category.objects.only('pk'):
+        Category.objects.filter(pk=category.pk).update(path=f"{category.pk:06d}/")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_catalog_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='core.category'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_category_tree'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=100, null=True, verbose_name='Dış Kaynak Kimliği'),
+        ),
+        migrations.AddConstraint(
+            model_name='service',
+            constraint=models.UniqueConstraint(fields=('company', 'external_id'), name='service_company_external_id_uniq'),
+        ),
+    ]
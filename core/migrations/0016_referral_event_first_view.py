@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:41
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def drop_repeated_views(apps, schema_editor):
+    """Her (talep, kullanıcı) için yalnızca ilk 'viewed' olayını bırakır."""
+    ReferralEvent = apps.get_model('core', 'ReferralEvent')
+    views = ReferralEvent.objects.filter(event_type='viewed')
+    first_ids = views.values('referral_id', 'actor_id').annotate(first_id=Min('id')).values('first_id')
+    views.exclude(id__in=first_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_service_external_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_repeated_views, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='referralevent',
+            constraint=models.UniqueConstraint(condition=models.Q(('event_type', 'viewed')), fields=('referral', 'actor'), name='referral_event_first_view_uniq'),
+        ),
+    ]
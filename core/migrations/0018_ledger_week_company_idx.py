@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_category_parent_protect'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='commissionledgerentry',
+            index=models.Index(fields=['week_start', 'company'], name='ledger_week_company_idx'),
+        ),
+    ]
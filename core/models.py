@@ -1,12 +1,18 @@
 # core/models.py
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Concat, Substr
 from django.conf import settings
-from cryptography.fernet import Fernet
+from django.utils import timezone
+from datetime import timedelta
+from cryptography.fernet import Fernet, MultiFernet
+import logging
 import os
 
-# Ayarlardan Fernet Anahtarını çekin
-# DİKKAT: settings.py dosyasında FERNET_KEY tanımladığınızdan emin olun!
-FERNET = Fernet(settings.FERNET_KEY.encode('utf-8'))
+logger = logging.getLogger(__name__)
+
+# Ayarlardan Fernet anahtarlarını çekin (en yenisi başta, bkz. settings.FERNET_KEYS)
+# DİKKAT: settings.py dosyasında FERNET_KEY / FERNET_KEYS tanımladığınızdan emin olun!
+FERNET = MultiFernet([Fernet(key.encode('utf-8')) for key in settings.FERNET_KEYS])
 
 # Rol Tabanlı Kullanıcı Modeli (Gelecekteki Yetkilendirme için)
 class UserProfile(models.Model):
@@ -61,6 +67,7 @@ class Company(models.Model):
     estimated_delivery_time_minutes = models.IntegerField(blank=True, null=True, verbose_name="Tahmini Teslimat Süresi (dk)")
     # Teslimat bölgeleri / harita veri yapısını JSON olarak saklayabilirsiniz (GeoJSON gibi)
     delivery_areas = models.JSONField(blank=True, null=True, verbose_name="Teslimat Bölgeleri (GeoJSON)")
+    updated_at = models.DateTimeField(auto_now=True)  # ETag / Last-Modified için satır sürümü
 
     # Hassas Veri Alanı (Şifreli tutulacak)
     # Örn: Ödeme entegrasyon anahtarları, banka hesap bilgileri
@@ -75,18 +82,29 @@ class Company(models.Model):
         if raw_data:
             encoded_data = raw_data.encode('utf-8')
             self.encrypted_sensitive_data = FERNET.encrypt(encoded_data).decode('utf-8')
+            self._sensitive_cache = (self.encrypted_sensitive_data, raw_data)
         else:
             self.encrypted_sensitive_data = None
 
     def get_sensitive_data(self):
-        """Şifreli veriyi çözüp döndürür."""
+        """Şifreli veriyi çözüp döndürür.
+
+        Çözülmüş değer nesne üzerinde şifreli metinle birlikte saklanır; aynı istekte
+        tekrar okunduğunda şifre çözme tekrarlanmaz, alan değişirse önbellek geçersizdir.
+        """
         if self.encrypted_sensitive_data:
+            cached = getattr(self, '_sensitive_cache', None)
+            if cached and cached[0] == self.encrypted_sensitive_data:
+                return cached[1]
             try:
                 decoded_data = self.encrypted_sensitive_data.encode('utf-8')
-                return FERNET.decrypt(decoded_data).decode('utf-8')
+                value = FERNET.decrypt(decoded_data).decode('utf-8')
             except Exception as e:
-                # Şifre çözme hatası (Örn: anahtar değişti)
+                # Şifre çözme hatası (Örn: anahtar FERNET_KEYS listesinden çıkarıldı)
+                logger.warning("Firma %s hassas verisi çözülemedi: %r", self.pk, e)
                 return f"[DECRYPT_ERROR: {e}]"
+            self._sensitive_cache = (self.encrypted_sensitive_data, value)
+            return value
         return None
     
     # Python Property olarak tanımlama
@@ -102,7 +120,8 @@ class Company(models.Model):
 
 # 2. Hizmet Modeli (Firma'nın sunduğu hizmetler)
 class Service(models.Model):
-    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='services')
+    # (company, category) bileşik indeksi FK indeksinin yerini tutar
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='services', db_index=False)
     # Kategori bilgisi: her hizmet bir kategoriye ait olabilir
     category = models.ForeignKey('Category', on_delete=models.SET_NULL, null=True, blank=True, related_name='services')
     title = models.CharField(max_length=255, verbose_name="Hizmet Başlığı")
@@ -113,6 +132,9 @@ class Service(models.Model):
 
     price_range_min = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, verbose_name="Min. Fiyat")
     price_range_max = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, verbose_name="Max. Fiyat")
+    # Toplu içe aktarmada (import_catalog) kaynak sistemdeki kimlik; firma içinde tekildir
+    external_id = models.CharField(max_length=100, blank=True, null=True, verbose_name="Dış Kaynak Kimliği")
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.company.name} - {self.title}"
@@ -120,13 +142,64 @@ class Service(models.Model):
     class Meta:
         verbose_name = "Hizmet"
         verbose_name_plural = "Hizmetler"
+        indexes = [
+            # Firma hizmet listesi ve firma + kategori filtresi
+            models.Index(fields=['company', 'category'], name='service_company_category_idx'),
+        ]
+        constraints = [
+            # import_catalog upsert anahtarı (NULL değerler çakışmaz)
+            models.UniqueConstraint(fields=['company', 'external_id'], name='service_company_external_id_uniq'),
+        ]
 
 
 # Kategori Modeli: Hizmetlerin sınıflandırılması için
+# Hiyerarşi materialized path ile tutulur: `path` kökten itibaren 6 haneli id'lerin
+# birleşimidir (ör. "000003/000017/"). Bir alt ağaç tek indeksli aralık sorgusudur
+# (bkz. `subtree_q`); `path` save() tarafından yönetilir, elle yazılmamalıdır.
+# Sabit genişlik sıralamayı korur; 999999'u aşan id yolu bozacağı için reddedilir
+# (`category_path_segment`). Alt kategorisi olan kategori silinemez (PROTECT): önce alt
+# kategoriler taşınmalı veya silinmelidir, aksi halde yolları ve hizmetleri sessizce giderdi.
+CATEGORY_PATH_STEP = 6
+
+
+def category_path_segment(pk):
+    """Kategori id'sinin yol parçası ("000017/"); sığmayan id için ValueError."""
+    if pk >= 10 ** CATEGORY_PATH_STEP:
+        raise ValueError(f"Kategori id'si {pk} yol genişliğini ({CATEGORY_PATH_STEP} hane) aşıyor.")
+    return f"{pk:0{CATEGORY_PATH_STEP}d}/"
+
+
 class Category(models.Model):
     name = models.CharField(max_length=128, unique=True)
     slug = models.SlugField(max_length=128, unique=True)
     description = models.TextField(blank=True, null=True)
+    parent = models.ForeignKey('self', on_delete=models.PROTECT, null=True, blank=True, related_name='children')
+    path = models.CharField(max_length=255, blank=True, default='', db_index=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @staticmethod
+    def subtree_q(path):
+        """`path` ile başlayan (kendisi dahil) tüm kategoriler; '/'den sonraki karakter '0'dır."""
+        return models.Q(path__gte=path, path__lt=path[:-1] + '0')
+
+    def save(self, *args, **kwargs):
+        parent_path = self.parent.path if self.parent_id else ''
+        if self.path and parent_path.startswith(self.path):
+            raise ValueError("Kategori kendi alt kategorisinin altına taşınamaz.")
+        # Yeni satırın id'si yola sığmazsa INSERT de geri alınır
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+            path = parent_path + category_path_segment(self.pk)
+            if path == self.path:
+                return
+            old_path, self.path = self.path, path
+            Category.objects.filter(pk=self.pk).update(path=path)
+            if old_path:
+                # Taşınan kategorinin alt ağacındaki yolların ön ekini değiştir
+                Category.objects.filter(Category.subtree_q(old_path)).exclude(pk=self.pk).update(
+                    path=Concat(models.Value(path), Substr('path', len(old_path) + 1))
+                )
 
     def __str__(self):
         return self.name
@@ -135,6 +208,15 @@ class Category(models.Model):
         verbose_name = "Kategori"
         verbose_name_plural = "Kategoriler"
 
+# 36 Saat Kuralı: Firma bu süre içinde yanıt vermezse talep zaman aşımına uğrar
+REFERRAL_TIMEOUT = timedelta(hours=getattr(settings, 'REFERRAL_TIMEOUT_HOURS', 36))
+
+
+def default_referral_expiry():
+    """Yeni talebin son yanıt zamanı (oluşturulma anı + 36 saat)."""
+    return timezone.now() + REFERRAL_TIMEOUT
+
+
 # 3. Yönlendirme Talebi Modeli (Komisyon ve Talep Takibi)
 class ReferralRequest(models.Model):
     # İstemci tarafı (Müşteri)
@@ -142,7 +224,8 @@ class ReferralRequest(models.Model):
     customer_name = models.CharField(max_length=100, verbose_name="Müşteri Adı")
     
     # Hizmet sağlayıcı tarafı (Firma)
-    target_company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='received_requests')
+    # Firma ile başlayan bileşik indeksler FK indeksinin yerini tutar
+    target_company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='received_requests', db_index=False)
     requested_service = models.ForeignKey(Service, on_delete=models.SET_NULL, null=True, verbose_name="Talep Edilen Hizmet")
 
     # Talep Durumu (36 Saat Kuralı)
@@ -156,6 +239,8 @@ class ReferralRequest(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Talebin zaman aşımına uğrayacağı an (oluşturulurken belirlenir, sweeper bu kolona bakar)
+    expires_at = models.DateTimeField(default=default_referral_expiry, null=True, blank=True, verbose_name="Son Yanıt Zamanı")
     
     # Komisyon Takibi
     is_commission_due = models.BooleanField(default=False, verbose_name="Komisyon Kaydı Oluşturuldu mu?")
@@ -166,4 +251,201 @@ class ReferralRequest(models.Model):
 
     class Meta:
         verbose_name = "Yönlendirme Talebi"
-        verbose_name_plural = "Yönlendirme Talepleri"
\ No newline at end of file
+        verbose_name_plural = "Yönlendirme Talepleri"
+        indexes = [
+            # Sadece bekleyen talepleri kapsayan kısmi indeks: sweeper yalnızca süresi dolanları okur
+            models.Index(
+                fields=['expires_at'],
+                name='referral_pending_expiry_idx',
+                condition=models.Q(status='pending'),
+            ),
+            # Tekrarlanan talep kontrolü (core.dedup): firma + hizmet + e-posta + zaman penceresi
+            models.Index(
+                fields=['target_company', 'requested_service', 'customer_email', 'created_at'],
+                name='referral_duplicate_idx',
+            ),
+            # Firma paneli: firmanın talepleri (durum filtresiyle/filtresiz), en yeni önce
+            models.Index(fields=['target_company', 'status', 'created_at'], name='referral_company_status_idx'),
+            models.Index(fields=['target_company', 'created_at'], name='referral_company_created_idx'),
+            # Admin listesi ve dışa aktarma: durum ve/veya tarih aralığı, en yeni önce
+            models.Index(fields=['status', 'created_at'], name='referral_status_created_idx'),
+            models.Index(fields=['created_at'], name='referral_created_idx'),
+        ]
+
+# 4. Komisyon Defteri (Append-only: kayıtlar güncellenmez/silinmez, düzeltme yeni kayıtla yapılır)
+class CommissionLedgerEntry(models.Model):
+    referral = models.ForeignKey(ReferralRequest, on_delete=models.PROTECT, related_name='commission_entries')
+    company = models.ForeignKey(Company, on_delete=models.PROTECT, related_name='commission_entries')
+    amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Komisyon Tutarı")
+    # Kaydın ait olduğu haftanın pazartesi günü (rapor haftası)
+    week_start = models.DateField(verbose_name="Hafta Başlangıcı")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.company_id} / {self.referral_id}: {self.amount}"
+
+    class Meta:
+        verbose_name = "Komisyon Kaydı"
+        verbose_name_plural = "Komisyon Defteri"
+        indexes = [
+            # Mutabakat defteri (hafta, firma) sırasında parça parça gruplar
+            models.Index(fields=['week_start', 'company'], name='ledger_week_company_idx'),
+        ]
+
+
+# Firma başına haftalık komisyon özeti (defter kayıtlarıyla artımlı olarak güncellenir)
+class WeeklyCommissionRollup(models.Model):
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='weekly_commissions')
+    week_start = models.DateField(verbose_name="Hafta Başlangıcı")
+    referral_count = models.PositiveIntegerField(default=0, verbose_name="Kabul Edilen Talep Sayısı")
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Toplam Komisyon")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.company_id} @ {self.week_start}: {self.total_amount}"
+
+    class Meta:
+        verbose_name = "Haftalık Komisyon Özeti"
+        verbose_name_plural = "Haftalık Komisyon Özetleri"
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'week_start'], name='unique_company_week_rollup'),
+        ]
+        indexes = [
+            # Haftalık rapor: bir haftanın tüm firmaları, tutara göre sıralı
+            models.Index(fields=['week_start', 'total_amount'], name='weekly_rollup_week_idx'),
+        ]
+
+
+# 5. Talep Olay Kaydı (Append-only zaman çizelgesi: oluşturuldu, görüntülendi, kabul/red, zaman aşımı)
+class ReferralEvent(models.Model):
+    EVENT_CHOICES = [
+        ('created', 'Oluşturuldu'),
+        ('viewed', 'Görüntülendi'),
+        ('accepted', 'Kabul Edildi'),
+        ('rejected', 'Reddedildi'),
+        ('timeout', 'Zaman Aşımı'),
+    ]
+    # (referral, created_at) bileşik indeksi FK indeksinin yerini tutar
+    referral = models.ForeignKey(ReferralRequest, on_delete=models.CASCADE, related_name='events', db_index=False)
+    event_type = models.CharField(max_length=10, choices=EVENT_CHOICES)
+    # İşlemi yapan kullanıcı (müşteri talepleri ve otomatik görevler için boş)
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    # Olayın gerçekleştiği an (yazma anı değil; kayıtlar toplu olarak sonradan yazılır)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.referral_id}: {self.event_type} @ {self.created_at}"
+
+    class Meta:
+        verbose_name = "Talep Olayı"
+        verbose_name_plural = "Talep Olayları"
+        indexes = [
+            models.Index(fields=['referral', 'created_at'], name='referral_event_timeline_idx'),
+        ]
+        constraints = [
+            # Bir kullanıcının bir talebi görüntülemesi yalnızca ilk kez kaydedilir
+            models.UniqueConstraint(
+                fields=['referral', 'actor'], condition=models.Q(event_type='viewed'), name='referral_event_first_view_uniq',
+            ),
+        ]
+
+
+# 6. Firma Paneli İstatistikleri (firma başına günlük/haftalık özet, talep akışıyla artımlı güncellenir)
+class CompanyReferralStats(models.Model):
+    PERIOD_CHOICES = [
+        ('day', 'Günlük'),
+        ('week', 'Haftalık'),
+    ]
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='referral_stats')
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    # Günün kendisi veya haftanın pazartesi günü
+    bucket_start = models.DateField()
+
+    created_count = models.PositiveIntegerField(default=0)
+    accepted_count = models.PositiveIntegerField(default=0)
+    rejected_count = models.PositiveIntegerField(default=0)
+    timeout_count = models.PositiveIntegerField(default=0)
+    # Yanıt sürelerinin (saniye) birleştirilebilir histogramı, bkz. core.sketches.LogHistogram
+    response_sketch = models.JSONField(default=dict, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.company_id} {self.period} {self.bucket_start}"
+
+    class Meta:
+        verbose_name = "Firma Talep İstatistiği"
+        verbose_name_plural = "Firma Talep İstatistikleri"
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'period', 'bucket_start'], name='unique_company_stats_bucket'),
+        ]
+
+
+# 7. Replika Gecikme Ölçümü (primary'de periyodik güncellenir, replikadan okunarak gecikme hesaplanır)
+class ReplicaHeartbeat(models.Model):
+    beat_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"heartbeat @ {self.beat_at}"
+
+    class Meta:
+        verbose_name = "Replika Heartbeat"
+        verbose_name_plural = "Replika Heartbeat"
+
+
+# 8. Hizmet Kartı Okuma Modeli (Service + Company + Category düzleştirilmiş; bkz. core.cards)
+# Herkese açık listeleme/arama yalnızca bu tabloyu okur. Satırlar Service/Company/Category
+# değiştiğinde aynı transaction içinde güncellenir; elle değiştirilmemelidir.
+class ServiceCard(models.Model):
+    service = models.OneToOneField(Service, on_delete=models.CASCADE, primary_key=True, related_name='card')
+    title = models.CharField(max_length=255)
+    description = models.TextField()
+    keywords = models.CharField(max_length=500, blank=True)
+    price_range_min = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    price_range_max = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+
+    company_id = models.BigIntegerField()
+    company_name = models.CharField(max_length=255)
+    company_slug = models.SlugField()
+    company_location_text = models.CharField(max_length=255)
+    company_logo = models.CharField(max_length=1024, blank=True, null=True)
+
+    category_id = models.BigIntegerField(blank=True, null=True)
+    category_name = models.CharField(max_length=128, blank=True, null=True)
+    category_slug = models.SlugField(max_length=128, blank=True, null=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Kartta kopyası tutulan kaynak alanlar: `save(update_fields=...)` bunlardan birini
+    # içermiyorsa kart ve 'services' koleksiyon sürümü güncellenmez
+    SERVICE_SOURCE_FIELDS = frozenset({
+        'title', 'description', 'keywords', 'price_range_min', 'price_range_max', 'category', 'company',
+    })
+    COMPANY_SOURCE_FIELDS = frozenset({'name', 'slug', 'location_text', 'logo'})
+
+    def __str__(self):
+        return f"{self.company_name} - {self.title}"
+
+    class Meta:
+        verbose_name = "Hizmet Kartı"
+        verbose_name_plural = "Hizmet Kartları"
+        indexes = [
+            # Kategori filtresi (kategori id'si alt sorguyla çözülür) ve firma değişikliklerinde toplu güncelleme
+            models.Index(fields=['category_id', 'service'], name='service_card_category_idx'),
+            models.Index(fields=['company_id'], name='service_card_company_idx'),
+        ]
+
+
+# 9. Koleksiyon Sürüm Sayacı (liste endpointlerinin ETag'i için; bkz. core.versions)
+# Koleksiyondaki her yazma sürümü aynı transaction içinde bir artırır.
+class CollectionVersion(models.Model):
+    name = models.CharField(max_length=64, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+    class Meta:
+        verbose_name = "Koleksiyon Sürümü"
+        verbose_name_plural = "Koleksiyon Sürümleri"
@@ -0,0 +1,354 @@
+# core/notifications.py
+"""
+Anlık bildirimler (Server-Sent Events).
+
+Firma paneli `/firm/my-referrals` endpoint'ini yoklamak yerine bu kanala abone olur:
+- Yeni talep oluşturulduğunda firmaya (`company:<id>`) haber verilir.
+- Talebin durumu değiştiğinde müşteriye (`customer:<email>`) haber verilir.
+
+Olaylar süreç içindeki `EventHub` üzerinden dağıtılır. Birden fazla worker çalışıyorsa
+`NOTIFICATIONS_REDIS_URL` ayarlanarak olaylar Redis pub/sub ile tüm süreçlere yayılır.
+Ayar yoksa diğer süreçlerde (ör. django-q cluster'ındaki `check_referral_timeout`)
+yayınlanan olaylar SSE bağlantılarına ulaşmaz; `core.W001` sistem kontrolü bunu uyarır.
+İstemci bağlantı koptuğunda `Last-Event-ID` ile kaldığı yerden devam edebilir
+(son `NOTIFICATIONS_HISTORY_SIZE` olay konu başına bellekte tutulur).
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import checks
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+STREAM_PATH = '/api/core/events/stream'
+HEARTBEAT_SECONDS = getattr(settings, 'NOTIFICATIONS_HEARTBEAT_SECONDS', 15)
+HISTORY_SIZE = getattr(settings, 'NOTIFICATIONS_HISTORY_SIZE', 100)
+SUBSCRIBER_QUEUE_SIZE = getattr(settings, 'NOTIFICATIONS_QUEUE_SIZE', 100)
+REDIS_URL = getattr(settings, 'NOTIFICATIONS_REDIS_URL', None)
+REDIS_CHANNEL = 'serviceradar:events'
+
+
+def company_topic(company_id):
+    return f'company:{company_id}'
+
+
+def customer_topic(email):
+    return f'customer:{(email or "").strip().lower()}'
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    topic: str
+    type: str
+    data: dict
+
+    def encode(self):
+        """Olayı SSE satır formatına çevirir."""
+        payload = json.dumps(self.data, cls=DjangoJSONEncoder)
+        return f'id: {self.id}\nevent: {self.type}\ndata: {payload}\n\n'.encode('utf-8')
+
+
+class Subscription:
+    """Tek bir SSE bağlantısının kuyruğu. Olaylar bağlantının event loop'una aktarılır."""
+
+    def __init__(self, topics, loop):
+        self.topics = frozenset(topics)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def offer(self, event):
+        # Yavaş istemci kuyruğu doldurduysa olay düşürülür; istemci Last-Event-ID ile telafi eder
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("Bildirim kuyruğu dolu, olay %s düşürüldü.", event.id)
+
+
+class EventHub:
+    """Süreç içi pub/sub: konu -> abone listesi ve konu başına son olayların geçmişi."""
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._history = defaultdict(lambda: deque(maxlen=history_size))
+        self._ids = itertools.count(1)
+
+    def next_id(self):
+        return next(self._ids)
+
+    def subscribe(self, topics, loop, last_event_id=None):
+        """Abone olur ve `last_event_id` sonrasında kaçırılan olayları döndürür."""
+        subscription = Subscription(topics, loop)
+        missed = []
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscribers[topic].add(subscription)
+                if last_event_id is not None:
+                    missed.extend(e for e in self._history.get(topic, ()) if e.id > last_event_id)
+        missed.sort(key=lambda e: e.id)
+        return subscription, missed
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    def dispatch(self, event):
+        """Olayı geçmişe ekler ve konunun tüm abonelerine iletir (thread-safe)."""
+        with self._lock:
+            self._history[event.topic].append(event)
+            subscribers = list(self._subscribers.get(event.topic, ()))
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(subscription.offer, event)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+
+hub = EventHub()
+
+
+# =======================================================
+# REDIS KÖPRÜSÜ (Opsiyonel, çoklu worker için)
+# =======================================================
+
+_redis_client = None
+_redis_listener_started = False
+_redis_lock = threading.Lock()
+
+
+def _get_redis():
+    global _redis_client
+    if _redis_client is None:
+        import redis
+        _redis_client = redis.Redis.from_url(REDIS_URL)
+    return _redis_client
+
+
+# Bağlantı koparsa dinleyici bu aralıklarla (üstel artan) yeniden bağlanır
+REDIS_RECONNECT_MIN_SECONDS = 1
+REDIS_RECONNECT_MAX_SECONDS = 30
+
+
+def _redis_listen():
+    """Redis kanalını dinler; bağlantı koparsa bekleyip yeniden abone olur (thread hiç bitmez)."""
+    delay = REDIS_RECONNECT_MIN_SECONDS
+    while True:
+        try:
+            pubsub = _get_redis().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(REDIS_CHANNEL)
+            delay = REDIS_RECONNECT_MIN_SECONDS
+            for message in pubsub.listen():
+                try:
+                    raw = json.loads(message['data'])
+                    hub.dispatch(Event(id=raw['id'], topic=raw['topic'], type=raw['type'], data=raw['data']))
+                except Exception:
+                    logger.exception("Redis bildirim mesajı işlenemedi.")
+            logger.warning("Redis bildirim aboneliği kapandı, %s sn sonra yeniden bağlanılacak.", delay)
+        except Exception:
+            logger.exception("Redis bildirim bağlantısı koptu, %s sn sonra yeniden bağlanılacak.", delay)
+        # Kopukluk sırasında kaçan olayları istemciler Last-Event-ID ile telafi eder
+        time.sleep(delay)
+        delay = min(delay * 2, REDIS_RECONNECT_MAX_SECONDS)
+
+
+def _ensure_redis_listener():
+    global _redis_listener_started
+    if not REDIS_URL or _redis_listener_started:
+        return
+    with _redis_lock:
+        if not _redis_listener_started:
+            threading.Thread(target=_redis_listen, name='notifications-redis', daemon=True).start()
+            _redis_listener_started = True
+
+
+# =======================================================
+# YAYINLAMA (Django view'ları ve görevlerden çağrılır)
+# =======================================================
+
+def _publish_now(topic, event_type, data):
+    if REDIS_URL:
+        client = _get_redis()
+        event_id = client.incr(f'{REDIS_CHANNEL}:seq')
+        client.publish(REDIS_CHANNEL, json.dumps(
+            {'id': event_id, 'topic': topic, 'type': event_type, 'data': data}, cls=DjangoJSONEncoder
+        ))
+    else:
+        hub.dispatch(Event(id=hub.next_id(), topic=topic, type=event_type, data=data))
+
+
+def check_notification_broker(app_configs, **kwargs):
+    """Redis köprüsü yokken görev cluster'ı tanımlıysa uyarır (olaylar yalnızca aynı süreçte kalır).
+
+    `NOTIFICATIONS_REDIS_URL` ayarlı olup `redis` paketi kurulu değilse hata verir.
+    """
+    if REDIS_URL:
+        try:
+            import redis  # noqa: F401
+        except ImportError:
+            return [checks.Error(
+                "NOTIFICATIONS_REDIS_URL ayarlı ama 'redis' paketi kurulu değil.",
+                hint="pip install redis (requirements.txt)",
+                id='core.E001',
+            )]
+        return []
+    if not getattr(settings, 'Q_CLUSTER', None):
+        return []
+    return [checks.Warning(
+        "NOTIFICATIONS_REDIS_URL ayarlı değil; django-q görevlerinden ve diğer worker'lardan "
+        "yayınlanan bildirimler SSE bağlantılarına ulaşmaz.",
+        hint="Tek süreçli geliştirme ortamı dışında NOTIFICATIONS_REDIS_URL ayarlayın.",
+        id='core.W001',
+    )]
+
+
+def publish(topic, event_type, data):
+    """Olayı transaction commit edildikten sonra yayınlar; hata isteği bozmaz."""
+    def _send():
+        try:
+            _publish_now(topic, event_type, data)
+        except Exception:
+            logger.exception("Bildirim yayınlanamadı: %s %s", topic, event_type)
+    transaction.on_commit(_send)
+
+
+def referral_payload(referral):
+    return {
+        'id': referral.id,
+        'status': referral.status,
+        'customer_name': referral.customer_name,
+        'target_company_id': referral.target_company_id,
+        'requested_service_id': referral.requested_service_id,
+        'created_at': referral.created_at,
+    }
+
+
+def notify_referral_created(referral):
+    publish(company_topic(referral.target_company_id), 'referral.created', referral_payload(referral))
+
+
+def notify_referral_status(referral):
+    payload = referral_payload(referral)
+    publish(customer_topic(referral.customer_email), 'referral.status', payload)
+    publish(company_topic(referral.target_company_id), 'referral.status', payload)
+
+
+# =======================================================
+# SSE ASGI UYGULAMASI
+# =======================================================
+
+def _resolve_topics(token):
+    """JWT token'dan kullanıcının abone olabileceği konuları çözer (senkron, DB erişir)."""
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from core.models import Company
+
+    try:
+        authenticator = JWTAuthentication()
+        user = authenticator.get_user(authenticator.get_validated_token(token))
+    except Exception:
+        return None
+    if not user or not user.is_active:
+        return None
+
+    topics = []
+    if user.email:
+        topics.append(customer_topic(user.email))
+    user_firm = getattr(user, 'firm', None)
+    if user_firm:
+        company_id = Company.objects.filter(slug=user_firm.slug).values_list('id', flat=True).first()
+        if company_id:
+            topics.append(company_topic(company_id))
+    return topics
+
+
+async def _send_error(send, status, detail):
+    body = json.dumps({'detail': detail}).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _last_event_id(scope, query):
+    raw = query.get('last_event_id', [None])[0]
+    for name, value in scope.get('headers', []):
+        if name == b'last-event-id':
+            raw = value.decode('latin-1')
+    try:
+        return int(raw) if raw else None
+    except ValueError:
+        return None
+
+
+async def sse_application(scope, receive, send):
+    """`STREAM_PATH` için ASGI uygulaması. EventSource header gönderemediği için token query'den alınır."""
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    token = query.get('token', [None])[0]
+    if not token:
+        for name, value in scope.get('headers', []):
+            if name == b'authorization' and value.lower().startswith(b'bearer '):
+                token = value[7:].decode('latin-1')
+    if not token:
+        await _send_error(send, 401, 'Yetkilendirme gerekli.')
+        return
+
+    topics = await sync_to_async(_resolve_topics, thread_sensitive=True)(token)
+    if not topics:
+        await _send_error(send, 401 if topics is None else 403, 'Bildirim kanalına erişim yetkiniz yok.')
+        return
+
+    _ensure_redis_listener()
+    subscription, missed = hub.subscribe(topics, asyncio.get_running_loop(), _last_event_id(scope, query))
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                disconnected.set()
+                subscription.offer(None)
+                return
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+        await send({'type': 'http.response.body', 'body': b'retry: 3000\n\n', 'more_body': True})
+        for event in missed:
+            await send({'type': 'http.response.body', 'body': event.encode(), 'more_body': True})
+
+        while not disconnected.is_set():
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                await send({'type': 'http.response.body', 'body': b': ping\n\n', 'more_body': True})
+                continue
+            if event is None:
+                break
+            await send({'type': 'http.response.body', 'body': event.encode(), 'more_body': True})
+    except OSError:
+        pass
+    finally:
+        hub.unsubscribe(subscription)
+        watcher.cancel()
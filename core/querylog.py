@@ -0,0 +1,71 @@
+# core/querylog.py
+"""
+Geliştirme ortamı için N+1 sorgu dedektörü.
+
+`RepeatedQueryMiddleware` bir istek boyunca çalışan her SQL'i sayar. Aynı SQL metni
+(parametreler farklı olsa da) `QUERY_DEBUG_REPEAT_THRESHOLD` kez veya aynı parametrelerle
+iki kez çalıştıysa sorgu, tekrar sayısı ve ilk tekrarın proje içi çağrı yığını
+`core.querylog` logger'ına uyarı olarak yazılır. Yalnızca `QUERY_DEBUG` açıkken
+MIDDLEWARE'e eklenir.
+"""
+
+import logging
+import traceback
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+def _project_stack():
+    """Çağrı yığınının yalnızca proje dosyalarındaki (site-packages dışı) satırları."""
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()[:-3]
+        if frame.filename.startswith(base_dir) and 'site-packages' not in frame.filename
+        and not frame.filename.endswith('querylog.py')
+    ]
+    return ''.join(traceback.format_list(frames))
+
+
+class QueryRecorder:
+    """`connection.execute_wrapper` olarak takılır; SQL sayar ve ilk tekrarın yığınını saklar."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.exact = Counter()
+        self.stacks = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        self.counts[sql] += 1
+        self.exact[sql, repr(params)] += 1
+        if sql not in self.stacks and (self.counts[sql] >= self.threshold or self.exact[sql, repr(params)] >= 2):
+            self.stacks[sql] = _project_stack()
+        return execute(sql, params, many, context)
+
+    def repeated(self):
+        return [(sql, self.counts[sql], trace) for sql, trace in self.stacks.items()]
+
+
+class RepeatedQueryMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder(getattr(settings, 'QUERY_DEBUG_REPEAT_THRESHOLD', 2))
+        with ExitStack() as stack:
+            for connection in connections.all(initialized_only=False):
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        for sql, count, trace in recorder.repeated():
+            logger.warning(
+                "%s %s: aynı sorgu %s kez çalıştı (olası N+1):\n  %s\nİlk tekrarın çağrı yığını:\n%s",
+                request.method, request.path, count, sql, trace,
+            )
+        return response
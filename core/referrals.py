@@ -0,0 +1,97 @@
+# core/referrals.py
+"""
+Talep durum geçişleri (pending -> accepted / rejected).
+
+Geçiş tek bir koşullu UPDATE ile yapılır:
+    UPDATE ... SET status=... WHERE id IN (...) AND status='pending' [AND target_company_id=...]
+Böylece aynı talebe gelen eşzamanlı iki tıklamadan yalnızca biri başarılı olur ve
+satırın tüm kolonları yeniden yazılmaz.
+"""
+
+from django.db import connections, transaction
+from django.db.models import sql
+from django.utils import timezone
+
+from core.commissions import record_commissions
+from core.db import retry_on_lock
+from core.events import record_referral_event
+from core.stats import record_transition
+from core.models import ReferralRequest
+from core.notifications import notify_referral_status
+
+ACTION_STATUS = {
+    'accept': 'accepted',
+    'reject': 'rejected',
+}
+
+# Bildirim ve komisyon kaydı için gereken kolonlar
+_TRANSITION_FIELDS = (
+    'id', 'status', 'customer_name', 'customer_email', 'target_company_id',
+    'requested_service_id', 'created_at', 'commission_amount',
+)
+
+
+def _supports_update_returning(connection):
+    if connection.vendor == 'postgresql':
+        return True
+    return connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 35)
+
+
+def _update_returning_ids(queryset, **values):
+    """`queryset.update(**values)` çalıştırır ve etkilenen satırların id'lerini döndürür.
+
+    `UPDATE ... RETURNING` yalnızca SQLite 3.35+ ve PostgreSQL'de tek ifadede yapılır
+    (`can_return_columns_from_insert` UPDATE desteğini göstermez: MariaDB INSERT için
+    RETURNING destekler, UPDATE için desteklemez). Diğer veritabanlarında satırlar önce
+    kilitlenip seçilir, sonra güncellenir.
+    """
+    connection = connections[queryset.db]
+    if not _supports_update_returning(connection):
+        ids = list(queryset.select_for_update().values_list('id', flat=True))
+        queryset.model.objects.filter(id__in=ids).update(**values)
+        return ids
+
+    query = queryset.query.chain(sql.UpdateQuery)
+    query.add_update_values(values)
+    compiler = query.get_compiler(queryset.db)
+    compiler.pre_sql_setup()
+    update_sql, params = compiler.as_sql()
+    pk_column = connection.ops.quote_name(queryset.model._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f'{update_sql} RETURNING {pk_column}', params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+@retry_on_lock
+def transition_referrals(referral_ids, action, company_id=None, actor=None):
+    """Bekleyen talepleri tek UPDATE ile kabul/red eder.
+
+    `company_id` verilirse yalnızca o firmaya ait talepler güncellenir. Kabul edilen
+    talepler için komisyon defterine yazılır ve müşteriye/firmaya bildirim gönderilir.
+    Güncellenen talepleri döndürür; zaten işlenmiş veya yetkisiz talepler atlanır.
+    """
+    status = ACTION_STATUS[action]
+    values = {'status': status, 'updated_at': timezone.now()}
+    if action == 'accept':
+        values['is_commission_due'] = True
+
+    queryset = ReferralRequest.objects.filter(id__in=list(referral_ids), status='pending')
+    if company_id is not None:
+        queryset = queryset.filter(target_company_id=company_id)
+
+    with transaction.atomic():
+        updated_ids = _update_returning_ids(queryset, **values)
+        if not updated_ids:
+            return []
+
+        referrals = list(
+            ReferralRequest.objects.filter(id__in=updated_ids).only(*_TRANSITION_FIELDS).order_by('id')
+        )
+        if action == 'accept':
+            record_commissions(referrals)
+        record_referral_event(updated_ids, status, actor=actor)
+        record_transition(referrals, status)
+
+    for referral in referrals:
+        notify_referral_status(referral)
+    return referrals
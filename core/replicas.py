@@ -0,0 +1,201 @@
+# core/replicas.py
+"""
+Primary + okuma replikası yönlendirmesi.
+
+- `ReplicaRoutingMiddleware` her istek için bir yönlendirme durumu açar. Yalnızca
+  `DB_REPLICA_READ_PATHS` altındaki GET/HEAD istekleri (herkese açık katalog) replikaya gider.
+- Yazma yapan bir isteğin cevabına `DB_REPLICA_WRITE_HEADER` başlığıyla yazma zamanı
+  (Unix sn) eklenir; istemci bu değeri sonraki isteklerinde aynı başlıkla geri gönderir ve
+  `DB_REPLICA_STICKY_SECONDS` boyunca okumalar primary'den yapılır (read-your-writes).
+  SPA API'yi başka origin'den çağırdığı için çereze güvenilmez (CORS ile başlık açılır);
+  aynı origin istemciler için `DB_REPLICA_PIN_COOKIE` çerezi de verilir.
+  Aynı istek içinde bir yazma olursa, isteğin kalan okumaları da primary'e döner.
+- Replika gecikmesi primary'de periyodik güncellenen `ReplicaHeartbeat` satırının replikadaki
+  değeriyle ölçülür; `DB_REPLICA_MAX_LAG` saniyeden geride kalan replika kullanılmaz.
+- İstek dışındaki kod (Q-Cluster görevleri, shell) her zaman primary'i kullanır.
+
+Yönlendirme kararları ve gecikmeler `replica_metrics.snapshot()` ile okunur.
+"""
+
+import contextvars
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DB_REPLICA_ALIASES', []))
+
+
+@dataclass
+class RoutingState:
+    alias: Optional[str] = None   # Bu isteğin okumaları için seçilen replika (yoksa primary)
+    wrote: bool = False
+
+
+_state = contextvars.ContextVar('replica_routing_state', default=None)
+
+
+class ReplicaMetrics:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.decisions = Counter()
+        self.queries = Counter()
+
+    def decision(self, name):
+        with self._lock:
+            self.decisions[name] += 1
+
+    def query(self, kind, alias):
+        with self._lock:
+            self.queries[f'{kind}:{alias}'] += 1
+
+    def reset(self):
+        with self._lock:
+            self.decisions.clear()
+            self.queries.clear()
+
+    def snapshot(self):
+        with self._lock:
+            decisions, queries = dict(self.decisions), dict(self.queries)
+        return {
+            'replicas': {
+                alias: {'lag_seconds': lag, 'healthy': lag is not None and lag <= settings.DB_REPLICA_MAX_LAG}
+                for alias, lag in ((alias, replica_lag(alias)) for alias in replica_aliases())
+            },
+            'decisions': decisions,
+            'queries': queries,
+        }
+
+
+replica_metrics = ReplicaMetrics()
+
+_lag_lock = threading.Lock()
+_lag_cache = {}  # alias -> (ölçüm zamanı, gecikme sn veya None)
+
+
+def _measure_lag(alias):
+    from core.models import ReplicaHeartbeat
+    beat_at = ReplicaHeartbeat.objects.using(alias).order_by('-beat_at').values_list('beat_at', flat=True).first()
+    if beat_at is None:
+        return None
+    return max(0.0, (timezone.now() - beat_at).total_seconds())
+
+
+def replica_lag(alias):
+    """Replikanın gecikmesini (sn) döndürür; ölçülemiyorsa None. Sonuç kısa süre önbelleklenir."""
+    now = time.monotonic()
+    with _lag_lock:
+        cached = _lag_cache.get(alias)
+    if cached and now - cached[0] < settings.DB_REPLICA_LAG_CHECK_INTERVAL:
+        return cached[1]
+    try:
+        lag = _measure_lag(alias)
+    except Exception:
+        lag = None
+    with _lag_lock:
+        _lag_cache[alias] = (now, lag)
+    return lag
+
+
+def healthy_replicas():
+    return [
+        alias for alias in replica_aliases()
+        if (lag := replica_lag(alias)) is not None and lag <= settings.DB_REPLICA_MAX_LAG
+    ]
+
+
+def _recent_write(request):
+    """İstemcinin geri gönderdiği son yazma zamanı yapışkanlık süresi içinde mi?"""
+    try:
+        written_at = float(request.headers.get(settings.DB_REPLICA_WRITE_HEADER, ''))
+    except ValueError:
+        return False
+    # Gelecekteki değerler yok sayılır; istemci kendini kalıcı olarak primary'e bağlayamaz
+    return 0 <= time.time() - written_at < settings.DB_REPLICA_STICKY_SECONDS
+
+
+def choose_read_alias(request):
+    """İsteğin okumalarının gideceği replikayı seçer ve kararı metriklere yazar; primary için None."""
+    if request.method not in SAFE_METHODS or not request.path.startswith(tuple(settings.DB_REPLICA_READ_PATHS)):
+        replica_metrics.decision('primary:not_eligible')
+        return None
+    if request.COOKIES.get(settings.DB_REPLICA_PIN_COOKIE) or _recent_write(request):
+        replica_metrics.decision('primary:sticky')
+        return None
+    candidates = healthy_replicas()
+    if not candidates:
+        replica_metrics.decision('primary:replica_unavailable')
+        return None
+    alias = random.choice(candidates)
+    replica_metrics.decision(f'replica:{alias}')
+    return alias
+
+
+class PrimaryReplicaRouter:
+    """Yazmalar her zaman primary'e; okumalar istek durumu izin veriyorsa seçilen replikaya."""
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        state = _state.get()
+        alias = state.alias if state is not None and not state.wrote else None
+        alias = alias or DEFAULT_DB_ALIAS
+        replica_metrics.query('read', alias)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        replica_metrics.query('write', DEFAULT_DB_ALIAS)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replikalar primary'nin kopyasıdır, şema onlara primary'den gelir
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+
+        state = RoutingState(alias=choose_read_alias(request))
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        wrote = state.wrote or (request.method not in SAFE_METHODS and response.status_code < 400)
+        if wrote:
+            response[settings.DB_REPLICA_WRITE_HEADER] = f'{time.time():.3f}'
+            response.set_cookie(
+                settings.DB_REPLICA_PIN_COOKIE, '1',
+                max_age=settings.DB_REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
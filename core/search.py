@@ -0,0 +1,129 @@
+# core/search.py
+"""
+Arama indeksi (Haystack) güncellemelerinin toplu yapılması.
+
+`HAYSTACK_SIGNAL_PROCESSOR` olarak `BatchingSignalProcessor` kullanılır. Blok dışında
+davranışı `RealtimeSignalProcessor` ile aynıdır: her kayıt/silme indekse hemen yazılır.
+`deferred_index_updates()` bloğu içinde ise sinyaller yalnızca (model, pk) kaydeder;
+blok bittiğinde ve transaction commit edildiğinde model başına tek `backend.update`
+ve tek yazıcıyla silme yapılır. Rollback olursa hiçbir şey yazılmaz.
+
+`bulk_create` / `bulk_update` sinyal üretmez; bu yollarla yazan kod değişen kayıtları
+`batch.update(model, pks)` ile bloğa eklemelidir. Blok durumu bir contextvar'dadır,
+aynı süreçteki diğer istekleri etkilemez.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from haystack import connection_router, connections
+from haystack.constants import ID
+from haystack.exceptions import NotHandled
+from haystack.signals import RealtimeSignalProcessor
+from haystack.utils import get_identifier
+
+_pending = ContextVar('core_search_pending', default=None)
+
+
+class IndexBatch:
+    """Blok boyunca indekse yazılacak (model -> pk) ve silinecek (model -> kimlik) kayıtları."""
+
+    def __init__(self):
+        self.updated = defaultdict(set)
+        self.removed = defaultdict(set)
+
+    def update(self, model, pks):
+        self.updated[model].update(pks)
+
+    def remove(self, model, instances):
+        for instance in instances:
+            self.updated[model].discard(instance.pk)
+            self.removed[model].add(get_identifier(instance))
+
+    def flush(self):
+        for using in connection_router.for_write():
+            unified = connections[using].get_unified_index()
+            backend = connections[using].get_backend()
+            for model in set(self.updated) | set(self.removed):
+                try:
+                    index = unified.get_index(model)
+                except NotHandled:
+                    continue
+                if self.removed[model]:
+                    _remove_documents(backend, self.removed[model])
+                if self.updated[model]:
+                    objects = list(index.index_queryset(using=using).filter(pk__in=self.updated[model]))
+                    if objects:
+                        backend.update(index, objects)
+
+
+def _remove_documents(backend, identifiers):
+    """Belgeleri siler; Whoosh'ta hepsi tek yazıcı ve tek commit ile silinir."""
+    if not hasattr(backend, 'index'):
+        for identifier in identifiers:
+            backend.remove(identifier)
+        return
+    from whoosh.writing import AsyncWriter
+
+    if not backend.setup_complete:
+        backend.setup()
+    writer = AsyncWriter(backend.index.refresh())
+    for identifier in identifiers:
+        writer.delete_by_term(ID, identifier)
+    writer.commit()
+
+
+@contextmanager
+def deferred_index_updates():
+    """Blok içindeki indeks güncellemelerini toplayıp commit sonrası tek seferde yazar.
+
+    Bir `transaction.atomic` bloğunun içinde açılmalıdır; iç içe bloklar dıştakine katılır.
+    """
+    batch = _pending.get()
+    if batch is not None:
+        yield batch
+        return
+
+    batch = IndexBatch()
+    token = _pending.set(batch)
+    try:
+        yield batch
+    finally:
+        _pending.reset(token)
+        # Hata rollback'e yol açtıysa on_commit geri çağrısı da atılır
+        transaction.on_commit(batch.flush)
+
+
+class BatchingSignalProcessor(RealtimeSignalProcessor):
+    """`deferred_index_updates()` bloğundaysa sinyali kaydeder, değilse hemen indeksler.
+
+    `save(update_fields=...)` indeksin `source_fields` alanlarından hiçbirini içermiyorsa
+    kayıt yeniden indekslenmez.
+    """
+
+    def handle_save(self, sender, instance, update_fields=None, **kwargs):
+        if update_fields is not None and not self._indexes_any(sender, update_fields):
+            return
+        batch = _pending.get()
+        if batch is None:
+            return super().handle_save(sender, instance, update_fields=update_fields, **kwargs)
+        batch.update(sender, [instance.pk])
+
+    def _indexes_any(self, model, update_fields):
+        for using in self.connection_router.for_write():
+            try:
+                index = self.connections[using].get_unified_index().get_index(model)
+            except NotHandled:
+                continue
+            source_fields = getattr(index, 'source_fields', None)
+            if source_fields is None or not source_fields.isdisjoint(update_fields):
+                return True
+        return False
+
+    def handle_delete(self, sender, instance, **kwargs):
+        batch = _pending.get()
+        if batch is None:
+            return super().handle_delete(sender, instance, **kwargs)
+        batch.remove(sender, [instance])
@@ -17,6 +17,10 @@ class ServiceIndex(indexes.SearchIndex, indexes.Indexable):
     # Hizmetin ait olduğu firmanın adı ile arama yapılmasını sağlar
     company_name = indexes.CharField(model_attr='company__name', indexed=True)
 
+    # İndekse giren model alanları; `save(update_fields=...)` bunlardan birini içermiyorsa
+    # kayıt yeniden indekslenmez (bkz. core.search.BatchingSignalProcessor)
+    source_fields = frozenset({'title', 'description', 'keywords', 'company'})
+
     # Coğrafi Arama için bu aşamada yer tutucu bırakıyoruz. (Şimdilik gerekmiyor.)
     # location_text = indexes.CharField(model_attr='company__location_text', indexed=False)
 
@@ -25,5 +29,5 @@ class ServiceIndex(indexes.SearchIndex, indexes.Indexable):
         return Service
 
     def index_queryset(self, using=None):
-        """İndekslenecek tüm nesneleri döndürür."""
-        return self.get_model().objects.all()
\ No newline at end of file
+        """İndekslenecek tüm nesneleri döndürür (firma adı için firma aynı sorguda yüklenir)."""
+        return self.get_model().objects.select_related('company')
\ No newline at end of file
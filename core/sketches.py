@@ -0,0 +1,68 @@
+# core/sketches.py
+"""
+Birleştirilebilir (mergeable) yüzdelik hesaplama yapısı.
+
+Logaritmik kovalı histogram (DDSketch yaklaşımı): her pozitif değer
+`ceil(log(x) / log(gamma))` numaralı kovaya sayılır. Göreli hata `RELATIVE_ACCURACY`
+ile sınırlıdır, boyut değer sayısından bağımsızdır ve iki sketch kova sayıları
+toplanarak birleştirilir. Bu sayede günlük özetlerden haftalık veya tüm zamanlar
+için yüzdelikler ham veriye dönmeden hesaplanabilir.
+"""
+
+import math
+
+RELATIVE_ACCURACY = 0.02
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+
+class LogHistogram:
+
+    def __init__(self, bins=None, zero_count=0):
+        self.bins = dict(bins or {})
+        self.zero_count = zero_count
+
+    @property
+    def count(self):
+        return self.zero_count + sum(self.bins.values())
+
+    def add(self, value, count=1):
+        if value <= 0:
+            self.zero_count += count
+            return
+        index = math.ceil(math.log(value) / _LOG_GAMMA)
+        self.bins[index] = self.bins.get(index, 0) + count
+
+    def merge(self, other):
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        return self
+
+    def quantile(self, q):
+        """`q` (0..1) yüzdeliğine karşılık gelen yaklaşık değeri döndürür; boşsa None."""
+        total = self.count
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                # Kovanın temsil değeri: göreli hatayı her iki yönde eşitler
+                return 2 * _GAMMA ** index / (_GAMMA + 1)
+        return 2 * _GAMMA ** max(self.bins) / (_GAMMA + 1)
+
+    def to_dict(self):
+        # JSON anahtarları metin olmak zorunda
+        return {'bins': {str(index): count for index, count in self.bins.items()}, 'zero': self.zero_count}
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls(
+            bins={int(index): count for index, count in data.get('bins', {}).items()},
+            zero_count=data.get('zero', 0),
+        )
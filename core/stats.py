@@ -0,0 +1,157 @@
+# core/stats.py
+"""
+Firma paneli istatistikleri.
+
+Her firma için günlük ve haftalık özet satırları talep oluşturma, kabul/red ve zaman
+aşımı anında artırılır. `/firm/stats` yalnızca bu satırları okur; bu yüzden bir
+firmanın geçmişi büyüdükçe panelin maliyeti artmaz.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models import CompanyReferralStats
+from core.sketches import LogHistogram
+
+STATUS_COUNTERS = {
+    'accepted': 'accepted_count',
+    'rejected': 'rejected_count',
+    'timeout': 'timeout_count',
+}
+
+
+def increment_counters(model, lookup, **increments):
+    """`lookup` ile bulunan satırın sayaçlarını F() ile artırır; satır yoksa oluşturur."""
+    updates = {field: F(field) + value for field, value in increments.items()}
+    if model.objects.filter(**lookup).update(**updates, updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **increments)
+    except IntegrityError:
+        # Aynı anda başka bir istek satırı oluşturduysa artırmayı tekrar dene
+        model.objects.filter(**lookup).update(**updates, updated_at=timezone.now())
+
+
+def bucket_starts(moment=None):
+    """Anın ait olduğu (period, bucket_start) çiftlerini döndürür."""
+    day = timezone.localdate(moment) if moment else timezone.localdate()
+    return [('day', day), ('week', day - timedelta(days=day.weekday()))]
+
+
+def _bump(company_counts, field, moment=None):
+    """Firmaların günlük ve haftalık satırlarını artırır.
+
+    Eksik satırlar tek bir `INSERT ... ON CONFLICT DO NOTHING` ile oluşturulur, ardından
+    aynı miktarda artacak tüm satırlar tek UPDATE ile güncellenir. Böylece bir toplu
+    talep kaç firmaya giderse gitsin maliyet genellikle iki sorgudur.
+    """
+    if not company_counts:
+        return
+    now = timezone.now()
+    buckets = bucket_starts(moment)
+    CompanyReferralStats.objects.bulk_create(
+        [
+            CompanyReferralStats(company_id=company_id, period=period, bucket_start=bucket_start)
+            for company_id in company_counts
+            for period, bucket_start in buckets
+        ],
+        ignore_conflicts=True,
+    )
+
+    bucket_filter = Q()
+    for period, bucket_start in buckets:
+        bucket_filter |= Q(period=period, bucket_start=bucket_start)
+
+    companies_by_count = defaultdict(list)
+    for company_id, count in company_counts.items():
+        companies_by_count[count].append(company_id)
+    for count, company_ids in companies_by_count.items():
+        CompanyReferralStats.objects.filter(bucket_filter, company_id__in=company_ids).update(
+            **{field: F(field) + count}, updated_at=now
+        )
+
+
+def record_created(referrals):
+    counts = defaultdict(int)
+    for referral in referrals:
+        counts[referral.target_company_id] += 1
+    _bump(counts, 'created_count')
+
+
+def record_transition(referrals, status):
+    """Kabul/red/zaman aşımı sayaçlarını artırır; kabul ve red için yanıt süresini sketch'e ekler."""
+    referrals = list(referrals)
+    now = timezone.now()
+    counts = defaultdict(int)
+    for referral in referrals:
+        counts[referral.target_company_id] += 1
+    _bump(counts, STATUS_COUNTERS[status], now)
+
+    if status == 'timeout':
+        return
+
+    sketches = defaultdict(LogHistogram)
+    for referral in referrals:
+        sketches[referral.target_company_id].add((now - referral.created_at).total_seconds())
+
+    bucket_filter = Q()
+    for period, bucket_start in bucket_starts(now):
+        bucket_filter |= Q(period=period, bucket_start=bucket_start)
+
+    with transaction.atomic():
+        # Satırlar _bump tarafından oluşturuldu; tüm firmaların satırlarını tek sorguda kilitleyip
+        # sketch'leri birleştir ve tek bulk_update ile yaz (oku-birleştir-yaz)
+        rows = list(
+            CompanyReferralStats.objects.select_for_update()
+            .filter(bucket_filter, company_id__in=list(sketches))
+            .only('id', 'company_id', 'response_sketch')
+        )
+        for row in rows:
+            row.response_sketch = LogHistogram.from_dict(row.response_sketch).merge(sketches[row.company_id]).to_dict()
+        CompanyReferralStats.objects.bulk_update(rows, ['response_sketch'])
+
+
+def _summarize(bucket_start, created, accepted, rejected, timeout, sketch):
+    decided = accepted + rejected + timeout
+    return {
+        'bucket_start': bucket_start,
+        'created': created,
+        'accepted': accepted,
+        'rejected': rejected,
+        'timeout': timeout,
+        'acceptance_rate': round(accepted / decided, 4) if decided else None,
+        'response_p50_seconds': sketch.quantile(0.5),
+        'response_p90_seconds': sketch.quantile(0.9),
+    }
+
+
+def company_stats(company_id, period='day', buckets=30):
+    """Son `buckets` kovanın özetini ve bu aralığın toplamını döndürür (tek sorgu)."""
+    rows = list(
+        CompanyReferralStats.objects.filter(company_id=company_id, period=period)
+        .order_by('-bucket_start')[:buckets]
+    )
+
+    total_sketch = LogHistogram()
+    totals = defaultdict(int)
+    result = []
+    for row in reversed(rows):
+        sketch = LogHistogram.from_dict(row.response_sketch)
+        total_sketch.merge(sketch)
+        for field in ('created_count', 'accepted_count', 'rejected_count', 'timeout_count'):
+            totals[field] += getattr(row, field)
+        result.append(_summarize(row.bucket_start, row.created_count, row.accepted_count,
+                                 row.rejected_count, row.timeout_count, sketch))
+
+    return {
+        'period': period,
+        'buckets': result,
+        'totals': _summarize(rows[-1].bucket_start if rows else None, totals['created_count'],
+                             totals['accepted_count'], totals['rejected_count'], totals['timeout_count'],
+                             total_sketch),
+    }
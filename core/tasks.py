@@ -1,43 +1,162 @@
 # core/tasks.py
 from datetime import timedelta
+from django.db import transaction
 from django.utils import timezone
-from core.models import ReferralRequest
+from core.models import ReferralRequest, ReplicaHeartbeat
+from core.notifications import notify_referral_status
+from core.events import referral_events, record_referral_event
+from core.stats import record_transition
+from core.db import retry_on_lock
+from core.commissions import week_start_for, weekly_report, reconcile
+from core.keyrotation import rotate_sensitive_data
+from core.cards import rebuild_service_cards
+from decimal import Decimal
 from django.db.models import Q # Karmaşık sorgular için
+import logging
 
-def check_referral_timeout():
+logger = logging.getLogger(__name__)
+
+# Tek seferde zaman aşımına uğratılacak en fazla talep sayısı ve bir çalıştırmadaki parti sınırı
+TIMEOUT_BATCH_SIZE = 500
+TIMEOUT_MAX_BATCHES = 20
+
+
+@retry_on_lock
+def _timeout_batch(now, batch_size):
+    """Süresi dolmuş bir partiyi kendi transaction'ında zaman aşımına uğratır.
+
+    Kilit hatasında yalnızca bu parti tekrar denenir. (seçilen, güncellenen) sayısını döndürür.
+    """
+    with transaction.atomic():
+        expired_ids = list(
+            ReferralRequest.objects.filter(status='pending', expires_at__lte=now)
+            .order_by('expires_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not expired_ids:
+            return 0, 0
+
+        # status='pending' koşulu tekrar edilir: bu arada kabul/red edilen talepler ezilmez
+        expired = ReferralRequest.objects.filter(id__in=expired_ids, status='pending').update(
+            status='timeout', updated_at=now
+        )
+
+        # Müşterilere ve firmalara durum değişikliği bildirimi (SSE, commit sonrası) ve olay kaydı
+        timed_out = list(ReferralRequest.objects.filter(id__in=expired_ids, status='timeout').only(
+            'id', 'status', 'customer_name', 'customer_email', 'target_company_id',
+            'requested_service_id', 'created_at'
+        ))
+        for referral in timed_out:
+            notify_referral_status(referral)
+        record_referral_event([referral.id for referral in timed_out], 'timeout')
+        record_transition(timed_out, 'timeout')
+    return len(expired_ids), expired
+
+
+def check_referral_timeout(batch_size=TIMEOUT_BATCH_SIZE, max_batches=TIMEOUT_MAX_BATCHES):
     """
-    36 saatten fazla beklemede olan talepleri zaman aşımına uğratır (Timeout).
+    Son yanıt zamanı (expires_at) geçmiş ve hala 'pending' durumundaki talepleri
+    zaman aşımına uğratır (Timeout).
+
+    Sorgular `status='pending'` kısmi indeksini kullanır ve yalnızca süresi dolmuş
+    satırlara dokunur; işlem `batch_size` boyutunda parçalara bölünür, böylece görev
+    sık çalıştırılsa bile her çalıştırmanın maliyeti sınırlı kalır. Her parti kendi
+    transaction'ında çalışır ve kilit hatasında yalnızca o parti tekrar denenir.
     Bu fonksiyon, Q-Cluster tarafından periyodik olarak çağrılacaktır.
     """
-    thirty_six_hours_ago = timezone.now() - timedelta(hours=36)
-    
-    # 36 saati geçmiş ve hala 'pending' (beklemede) durumundaki talepleri bul
-    requests_to_timeout = ReferralRequest.objects.filter(
-        status='pending',
-        created_at__lt=thirty_six_hours_ago # created_at, 36 saat öncesinden küçük (yani daha eski)
-    )
-
-    count = requests_to_timeout.count()
-    
-    if count > 0:
-        # Durumu 'timeout' olarak güncelle
-        requests_to_timeout.update(status='timeout', updated_at=timezone.now())
-        print(f"[{timezone.now().isoformat()}] {count} adet talep 36 saat kuralından dolayı zaman aşımına uğratıldı.")
+    now = timezone.now()
+    total = 0
+
+    for batch_number in range(1, max_batches + 1):
+        selected, expired = _timeout_batch(now, batch_size)
+        if not selected:
+            break
+        total += expired
+
+        logger.info("Timeout partisi %s: %s talep zaman aşımına uğratıldı.", batch_number, expired)
+
+        if selected < batch_size:
+            break
+
+    # Görev sürecinde istek döngüsü olmadığı için olay tamponu burada boşaltılır
+    referral_events.flush()
+
+    if total > 0:
+        print(f"[{now.isoformat()}] {total} adet talep 36 saat kuralından dolayı zaman aşımına uğratıldı.")
     else:
-        print(f"[{timezone.now().isoformat()}] Zaman aşımına uğrayan talep bulunamadı.")
-        
-    # Geriye dönük komisyon kayıtlarını da kontrol edebiliriz (İsteğe bağlı ek özellik)
-    # create_commission_records() 
+        print(f"[{now.isoformat()}] Zaman aşımına uğrayan talep bulunamadı.")
 
     # Django-Q ile başarılı görev dönüşü
-    return f"Timeout kontrolü tamamlandı. {count} talep güncellendi."
+    return f"Timeout kontrolü tamamlandı. {total} talep güncellendi."
 
 
-# Örn: Haftalık Komisyon Raporu oluşturma taslağı
-def generate_weekly_commission_report():
+# Haftalık Komisyon Raporu: yalnızca özet (rollup) satırlarını okur
+def generate_weekly_commission_report(week_start=None):
     """
     Haftalık komisyon raporunu oluşturur ve ilgili firmalara e-posta gönderir (şimdilik sadece loglar).
+    Varsayılan olarak bir önceki (tamamlanmış) haftayı raporlar.
+    """
+    if week_start is None:
+        week_start = week_start_for() - timedelta(days=7)
+
+    rollups = weekly_report(week_start)
+    for rollup in rollups:
+        print(f"  {rollup.company.name}: {rollup.referral_count} talep, {rollup.total_amount} TL komisyon")
+
+    total = sum((rollup.total_amount for rollup in rollups), Decimal('0'))
+    print(f"[{timezone.now().isoformat()}] {week_start} haftası komisyon raporu: {len(rollups)} firma, toplam {total} TL.")
+    return f"Haftalık raporlama tamamlandı. {len(rollups)} firma, toplam {total} TL."
+
+
+def reconcile_commission_ledger(chunk_size=1000):
+    """
+    Komisyon defterini ham talepler ve haftalık özetlerle parça parça karşılaştırır.
+    """
+    mismatches = reconcile(chunk_size=chunk_size)
+    for mismatch in mismatches:
+        logger.warning("Komisyon tutarsızlığı: %s", mismatch)
+    return f"Komisyon mutabakatı tamamlandı. {len(mismatches)} tutarsızlık bulundu."
+
+
+def replica_heartbeat():
+    """
+    Primary'deki heartbeat satırını günceller; replikalar bu değeri okuyarak gecikmelerini ölçer.
+    """
+    beat_at = timezone.now()
+    ReplicaHeartbeat.objects.update_or_create(pk=1, defaults={'beat_at': beat_at})
+    return f"Replika heartbeat: {beat_at.isoformat()}"
+
+
+def sync_replicas():
+    """
+    SQLite dosya replikalarını primary'den tazeler (`manage.py sync_replicas`).
+    DB_REPLICAS ayarlıysa Q-Cluster takvimine eklenir (bkz. settings.DB_REPLICA_SYNC_MINUTES).
+    """
+    from django.core.management import call_command
+
+    call_command('sync_replicas')
+    return "Replikalar tazelendi."
+
+
+def rotate_fernet_keys(chunk_size=500, start_after=0):
+    """
+    Hassas firma verisini FERNET_KEYS listesindeki en yeni anahtara taşır (parça parça).
+    Anahtar listesi değiştirildikten sonra bir kez kuyruğa alınır: async_task('core.tasks.rotate_fernet_keys')
+    """
+    def log_progress(progress):
+        logger.info("Anahtar rotasyonu: %s kayıt işlendi (son pk=%s), %.0f kayıt/sn.",
+                    progress.processed, progress.last_pk, progress.rows_per_second)
+
+    progress = rotate_sensitive_data(chunk_size=chunk_size, start_after=start_after, on_progress=log_progress)
+    if progress.failed:
+        logger.warning("Anahtar rotasyonu: %s kayıt hiçbir anahtarla çözülemedi.", progress.failed)
+    return (f"Anahtar rotasyonu tamamlandı. {progress.rotated} kayıt taşındı, {progress.skipped} zaten güncel, "
+            f"{progress.failed} çözülemedi.")
+
+
+def rebuild_service_cards_task(chunk_size=1000):
+    """
+    Hizmet kartı okuma modelini yeniden kurar (sinyal üretmeyen toplu yazmalardan sonra kuyruğa alınır).
     """
-    # ... Bu kısım kompleks sorgu ve raporlama mantığını içerir ...
-    print(f"[{timezone.now().isoformat()}] Haftalık komisyon raporu oluşturma görevi çalıştı.")
-    return "Haftalık raporlama tamamlandı."
\ No newline at end of file
+    total = rebuild_service_cards(chunk_size=chunk_size)
+    return f"Hizmet kartları yeniden kuruldu. {total} kart."
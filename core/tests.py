@@ -411,3 +411,2079 @@ class OwnershipPermissionTest(TestCase):
         # Verify referral2 is still pending
         referral2.refresh_from_db()
         self.assertEqual(referral2.status, 'pending')
+
+
+class ReferralExportTest(TestCase):
+    """
+    Test streaming CSV/NDJSON exports for admins and firms.
+    """
+
+    def setUp(self):
+        self.client = Client()
+
+        self.firm = Firm.objects.create(name='Export Firm', slug='export-firm')
+        self.company = Company.objects.create(
+            name='Export Firm', slug='export-firm', description='', location_text='Izmir'
+        )
+        self.other_company = Company.objects.create(
+            name='Other Firm', slug='other-firm', description='', location_text='Ankara'
+        )
+        User.objects.create_user(
+            username='exporter', email='exporter@example.com', password='Pass123!',
+            firm=self.firm, is_firm_manager=True, role='firm_manager'
+        )
+        User.objects.create_superuser(username='root', email='root@example.com', password='Pass123!')
+
+        service = Service.objects.create(company=self.company, title='Boya', description='Ev boyama')
+        other_service = Service.objects.create(company=self.other_company, title='Tesisat', description='Su tesisatı')
+        ReferralRequest.objects.create(
+            target_company=self.company, requested_service=service,
+            customer_name='Ali', customer_email='ali@example.com'
+        )
+        ReferralRequest.objects.create(
+            target_company=self.company, requested_service=service,
+            customer_name='Ayşe', customer_email='ayse@example.com', status='accepted'
+        )
+        ReferralRequest.objects.create(
+            target_company=self.other_company, requested_service=other_service,
+            customer_name='Veli', customer_email='veli@example.com'
+        )
+
+    def _token(self, username):
+        response = self.client.post(
+            '/auth/token/',
+            data=json.dumps({'username': username, 'password': 'Pass123!'}),
+            content_type='application/json'
+        )
+        return response.json()['access']
+
+    def test_admin_export_csv_streams_all_rows(self):
+        response = self.client.get(
+            '/api/core/admin/referrals/export',
+            HTTP_AUTHORIZATION=f'Bearer {self._token("root")}'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode('utf-8').strip().splitlines()
+        self.assertTrue(lines[0].startswith('id,customer_name,customer_email,status'))
+        self.assertEqual(len(lines), 4)
+
+    def test_firm_export_ndjson_is_scoped_and_filtered(self):
+        response = self.client.get(
+            '/api/core/firm/referrals/export?format=ndjson&status=pending',
+            HTTP_AUTHORIZATION=f'Bearer {self._token("exporter")}'
+        )
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['customer_email'], 'ali@example.com')
+        self.assertEqual(rows[0]['company_id'], self.company.id)
+
+    def test_admin_export_requires_superuser(self):
+        response = self.client.get(
+            '/api/core/admin/referrals/export',
+            HTTP_AUTHORIZATION=f'Bearer {self._token("exporter")}'
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_csv_export_neutralizes_formula_cells_but_ndjson_keeps_them(self):
+        ReferralRequest.objects.create(
+            target_company=self.company, customer_name='=HYPERLINK("http://evil.example","x")',
+            customer_email='formula@example.com'
+        )
+        token = self._token('exporter')
+
+        response = self.client.get(
+            '/api/core/firm/referrals/export', HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+        body = b''.join(response.streaming_content).decode('utf-8')
+        line = next(line for line in body.splitlines() if 'formula@example.com' in line)
+        self.assertIn('"\'=HYPERLINK(""http://evil.example"",""x"")"', line)
+
+        response = self.client.get(
+            '/api/core/firm/referrals/export?format=ndjson', HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode('utf-8').splitlines()]
+        row = next(row for row in rows if row['customer_email'] == 'formula@example.com')
+        self.assertEqual(row['customer_name'], '=HYPERLINK("http://evil.example","x")')
+
+
+class ReferralBatchCreateTest(TestCase):
+    """
+    Test fan-out of one customer request to several firms in a single call.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.company1 = Company.objects.create(name='A', slug='a', description='', location_text='Izmir')
+        self.company2 = Company.objects.create(name='B', slug='b', description='', location_text='Izmir')
+        self.service1 = Service.objects.create(company=self.company1, title='Kombi Bakımı', description='')
+        self.service2 = Service.objects.create(company=self.company2, title='Kombi Bakımı', description='')
+
+    def _post(self, items):
+        return self.client.post(
+            '/api/core/referral/create-batch',
+            data=json.dumps({
+                'customer_name': 'Deniz',
+                'customer_email': 'deniz@example.com',
+                'items': items,
+            }),
+            content_type='application/json'
+        )
+
+    def test_batch_creates_one_referral_per_firm(self):
+        items = [
+            {'target_company_id': self.company1.id, 'requested_service_id': self.service1.id},
+            {'target_company_id': self.company2.id, 'requested_service_id': self.service2.id},
+            {'target_company_id': self.company2.id, 'requested_service_id': self.service2.id},
+        ]
+        # 2 doğrulama sorgusu + tek INSERT (ve transaction savepoint'leri) + 2 istatistik sorgusu
+        with self.assertNumQueries(7):
+            response = self._post(items)
+
+        self.assertEqual(response.status_code, 201, response.content)
+        body = response.json()
+        self.assertEqual(len(body), 2)
+        self.assertEqual(body[0]['requested_service']['company']['id'], self.company1.id)
+        self.assertEqual(ReferralRequest.objects.filter(customer_email='deniz@example.com').count(), 2)
+
+    def test_batch_rejects_service_of_another_company(self):
+        response = self._post([
+            {'target_company_id': self.company1.id, 'requested_service_id': self.service2.id},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ReferralRequest.objects.exists())
+
+    def test_batch_unknown_company_is_404(self):
+        response = self._post([
+            {'target_company_id': 9999, 'requested_service_id': self.service1.id},
+        ])
+        self.assertEqual(response.status_code, 404)
+
+
+class ReferralTimeoutTaskTest(TestCase):
+    """
+    Test the deadline-driven timeout sweeper in core.tasks.
+    """
+
+    def setUp(self):
+        self.company = Company.objects.create(name='T', slug='t', description='', location_text='Bursa')
+        self.service = Service.objects.create(company=self.company, title='Nakliyat', description='')
+
+    def _referral(self, **kwargs):
+        return ReferralRequest.objects.create(
+            target_company=self.company, requested_service=self.service,
+            customer_name='Can', customer_email='can@example.com', **kwargs
+        )
+
+    def test_expires_at_is_set_on_create(self):
+        referral = self._referral()
+        self.assertIsNotNone(referral.expires_at)
+        self.assertGreater(referral.expires_at, referral.created_at)
+
+    def test_only_expired_pending_rows_time_out_in_batches(self):
+        from django.utils import timezone
+        from datetime import timedelta
+        from core.tasks import check_referral_timeout
+
+        past = timezone.now() - timedelta(minutes=1)
+        expired = [self._referral(expires_at=past) for _ in range(5)]
+        accepted = self._referral(expires_at=past, status='accepted')
+        fresh = self._referral()
+
+        result = check_referral_timeout(batch_size=2)
+
+        self.assertIn('5 talep', result)
+        for referral in expired:
+            referral.refresh_from_db()
+            self.assertEqual(referral.status, 'timeout')
+        accepted.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(accepted.status, 'accepted')
+        self.assertEqual(fresh.status, 'pending')
+
+
+    def test_lock_error_retries_only_the_failing_batch(self):
+        from unittest import mock
+        from django.db import OperationalError
+        from django.test import override_settings
+        from django.utils import timezone
+        from datetime import timedelta
+        from core.stats import record_transition
+        from core.tasks import check_referral_timeout
+
+        past = timezone.now() - timedelta(minutes=1)
+        expired = [self._referral(expires_at=past) for _ in range(4)]
+        calls = []
+
+        def flaky_transition(referrals, status):
+            calls.append([referral.id for referral in referrals])
+            if len(calls) == 2:
+                raise OperationalError('database is locked')
+            return record_transition(referrals, status)
+
+        with override_settings(DB_LOCK_RETRY_BACKOFF=0), \
+                mock.patch('core.tasks.record_transition', side_effect=flaky_transition), \
+                mock.patch('core.db.connection') as connection:
+            # TestCase'in dış transaction'ı yokmuş gibi davran (bkz. LockRetryTest)
+            connection.in_atomic_block = False
+            result = check_referral_timeout(batch_size=2)
+
+        self.assertIn('4 talep', result)
+        self.assertEqual(calls, [[r.id for r in expired[:2]], [r.id for r in expired[2:]], [r.id for r in expired[2:]]])
+        self.assertEqual(ReferralRequest.objects.filter(status='timeout').count(), 4)
+
+
+class NotificationHubTest(TestCase):
+    """
+    Test the in-process pub/sub used by the SSE notification stream.
+    """
+
+    def test_dispatch_and_resume_from_last_event_id(self):
+        import asyncio
+        from core.notifications import EventHub, Event
+
+        async def scenario():
+            hub = EventHub(history_size=10)
+            loop = asyncio.get_running_loop()
+            subscription, missed = hub.subscribe(['company:1'], loop)
+            self.assertEqual(missed, [])
+
+            for _ in range(3):
+                hub.dispatch(Event(id=hub.next_id(), topic='company:1', type='referral.created', data={}))
+            hub.dispatch(Event(id=hub.next_id(), topic='company:2', type='referral.created', data={}))
+            await asyncio.sleep(0)
+
+            received = [subscription.queue.get_nowait().id for _ in range(subscription.queue.qsize())]
+            self.assertEqual(received, [1, 2, 3])
+            hub.unsubscribe(subscription)
+            self.assertEqual(hub.subscriber_count(), 0)
+
+            _, missed = hub.subscribe(['company:1'], loop, last_event_id=1)
+            self.assertEqual([e.id for e in missed], [2, 3])
+
+        asyncio.run(scenario())
+
+    def test_referral_creation_notifies_company_topic(self):
+        from unittest import mock
+
+        company = Company.objects.create(name='N', slug='n', description='', location_text='Adana')
+        service = Service.objects.create(company=company, title='Çilingir', description='')
+
+        with mock.patch('core.notifications._publish_now') as publish_now:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = Client().post(
+                    '/api/core/referral/create',
+                    data=json.dumps({
+                        'target_company_id': company.id,
+                        'requested_service_id': service.id,
+                        'customer_name': 'Ece',
+                        'customer_email': 'ece@example.com',
+                        'description': '',
+                    }),
+                    content_type='application/json'
+                )
+
+        self.assertEqual(response.status_code, 201)
+        publish_now.assert_called_once()
+        topic, event_type, data = publish_now.call_args.args
+        self.assertEqual(topic, f'company:{company.id}')
+        self.assertEqual(event_type, 'referral.created')
+        self.assertEqual(data['customer_name'], 'Ece')
+
+
+class SSEStreamTest(TestCase):
+    """
+    Test the SSE ASGI application: token auth, topic resolution, streaming and replay.
+    """
+
+    def setUp(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        firm = Firm.objects.create(name='Akış', slug='akis')
+        self.company = Company.objects.create(name='Akış', slug='akis', description='', location_text='Bursa')
+        user = User.objects.create_user(
+            username='akis', email='Akis@example.com', password='Pass123!',
+            firm=firm, is_firm_manager=True, role='firm_manager'
+        )
+        self.token = str(AccessToken.for_user(user))
+
+    def _stream(self, scenario, query_string=b'', headers=()):
+        from unittest import mock
+        from asgiref.sync import async_to_sync
+        from asgiref.testing import ApplicationCommunicator
+        from core.notifications import EventHub, STREAM_PATH, sse_application
+
+        hub = EventHub(history_size=10)
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': STREAM_PATH,
+            'query_string': query_string, 'headers': list(headers),
+        }
+
+        async def run():
+            communicator = ApplicationCommunicator(sse_application, scope)
+            try:
+                return await scenario(communicator, hub)
+            finally:
+                await communicator.send_input({'type': 'http.disconnect'})
+                await communicator.wait(timeout=1)
+
+        with mock.patch('core.notifications.hub', hub):
+            return async_to_sync(run)()
+
+    def test_missing_or_invalid_token_is_rejected(self):
+        async def scenario(communicator, hub):
+            start = await communicator.receive_output(timeout=1)
+            await communicator.receive_output(timeout=1)
+            return start['status']
+
+        self.assertEqual(self._stream(scenario), 401)
+        self.assertEqual(self._stream(scenario, query_string=b'token=broken'), 401)
+
+    def test_streams_events_of_own_topics(self):
+        from core.notifications import Event
+
+        async def scenario(communicator, hub):
+            start = await communicator.receive_output(timeout=1)
+            self.assertEqual(start['status'], 200)
+            self.assertEqual(dict(start['headers'])[b'content-type'], b'text/event-stream')
+            self.assertEqual((await communicator.receive_output(timeout=1))['body'], b'retry: 3000\n\n')
+
+            hub.dispatch(Event(id=hub.next_id(), topic='company:0', type='referral.created', data={'id': 1}))
+            hub.dispatch(Event(id=hub.next_id(), topic=f'company:{self.company.id}', type='referral.created', data={'id': 2}))
+            hub.dispatch(Event(id=hub.next_id(), topic='customer:akis@example.com', type='referral.status', data={'id': 3}))
+            return [(await communicator.receive_output(timeout=1))['body'] for _ in range(2)]
+
+        bodies = self._stream(scenario, headers=[(b'authorization', f'Bearer {self.token}'.encode())])
+        self.assertEqual(bodies, [
+            b'id: 2\nevent: referral.created\ndata: {"id": 2}\n\n',
+            b'id: 3\nevent: referral.status\ndata: {"id": 3}\n\n',
+        ])
+
+    def test_replays_missed_events_after_last_event_id(self):
+        from core.notifications import Event
+
+        async def scenario(communicator, hub):
+            for number in range(3):
+                hub.dispatch(Event(id=hub.next_id(), topic=f'company:{self.company.id}', type='referral.created', data={'id': number}))
+            await communicator.receive_output(timeout=1)
+            await communicator.receive_output(timeout=1)
+            return [(await communicator.receive_output(timeout=1))['body'] for _ in range(2)]
+
+        bodies = self._stream(
+            scenario, query_string=f'token={self.token}'.encode(), headers=[(b'last-event-id', b'1')]
+        )
+        self.assertEqual([body.split(b'\n')[0] for body in bodies], [b'id: 2', b'id: 3'])
+
+    def test_redis_listener_reconnects_after_connection_loss(self):
+        import asyncio
+        from unittest import mock
+        from core import notifications
+        from core.notifications import EventHub
+
+        class Stop(Exception):
+            pass
+
+        message = {'data': json.dumps({'id': 7, 'topic': 'company:1', 'type': 'referral.created', 'data': {}})}
+        first, second = mock.Mock(), mock.Mock()
+        first.listen.side_effect = ConnectionError('bağlantı koptu')
+        second.listen.return_value = iter([message])
+        client = mock.Mock()
+        client.pubsub.side_effect = [first, second]
+        hub = EventHub()
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 2:
+                raise Stop
+
+        with mock.patch('core.notifications._get_redis', return_value=client), \
+                mock.patch('core.notifications.hub', hub), \
+                mock.patch('core.notifications.time.sleep', side_effect=sleep), \
+                self.assertLogs('core.notifications', 'WARNING'), self.assertRaises(Stop):
+            notifications._redis_listen()
+
+        self.assertEqual(client.pubsub.call_count, 2)
+        self.assertEqual(sleeps, [1, 1])
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        _, missed = hub.subscribe(['company:1'], loop, last_event_id=0)
+        self.assertEqual([event.id for event in missed], [7])
+
+    def test_broker_check_warns_without_redis(self):
+        from unittest import mock
+        from core.notifications import check_notification_broker
+
+        with mock.patch('core.notifications.REDIS_URL', None):
+            self.assertEqual([w.id for w in check_notification_broker(None)], ['core.W001'])
+        with mock.patch('core.notifications.REDIS_URL', 'redis://localhost:6379/0'):
+            self.assertEqual(check_notification_broker(None), [])
+
+
+class CommissionLedgerTest(TestCase):
+    """
+    Test the append-only commission ledger, weekly rollups and reconciliation.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.firm = Firm.objects.create(name='Ledger Firm', slug='ledger-firm')
+        self.company = Company.objects.create(name='Ledger Firm', slug='ledger-firm', description='', location_text='Izmir')
+        User.objects.create_user(
+            username='ledger', email='ledger@example.com', password='Pass123!',
+            firm=self.firm, is_firm_manager=True, role='firm_manager'
+        )
+        self.service = Service.objects.create(company=self.company, title='Klima', description='')
+        token_response = self.client.post(
+            '/auth/token/',
+            data=json.dumps({'username': 'ledger', 'password': 'Pass123!'}),
+            content_type='application/json'
+        )
+        self.token = token_response.json()['access']
+
+    def _accept_new_referral(self):
+        referral = ReferralRequest.objects.create(
+            target_company=self.company, requested_service=self.service,
+            customer_name='Oya', customer_email='oya@example.com'
+        )
+        response = self.client.post(
+            f'/api/core/company/request/{referral.id}/action',
+            data=json.dumps({'action': 'accept'}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {self.token}'
+        )
+        self.assertEqual(response.status_code, 200)
+        return referral
+
+    def test_accept_appends_ledger_entry_and_bumps_rollup(self):
+        from core.models import CommissionLedgerEntry, WeeklyCommissionRollup
+        from core.commissions import week_start_for, reconcile
+
+        self._accept_new_referral()
+        self._accept_new_referral()
+
+        self.assertEqual(CommissionLedgerEntry.objects.filter(company=self.company).count(), 2)
+        rollup = WeeklyCommissionRollup.objects.get(company=self.company, week_start=week_start_for())
+        self.assertEqual(rollup.referral_count, 2)
+        self.assertEqual(rollup.total_amount, Decimal('150.00'))
+        self.assertEqual(reconcile(chunk_size=1), [])
+
+    def test_weekly_report_reads_rollups(self):
+        from core.commissions import week_start_for
+        from core.tasks import generate_weekly_commission_report
+
+        self._accept_new_referral()
+        result = generate_weekly_commission_report(week_start=week_start_for())
+        self.assertIn('1 firma', result)
+        self.assertIn('75.00', result)
+
+    def test_reconcile_reports_missing_ledger_entry(self):
+        from core.commissions import reconcile
+
+        referral = ReferralRequest.objects.create(
+            target_company=self.company, requested_service=self.service,
+            customer_name='Eski', customer_email='eski@example.com',
+            status='accepted', is_commission_due=True
+        )
+        mismatches = reconcile()
+        self.assertEqual(len(mismatches), 1)
+        self.assertEqual(mismatches[0]['referral_id'], referral.id)
+
+
+    def test_reconcile_flags_ledger_of_no_longer_due_referral_and_stray_rollups(self):
+        from datetime import date
+        from core.commissions import reconcile, week_start_for
+        from core.models import WeeklyCommissionRollup
+
+        referrals = [self._accept_new_referral() for _ in range(3)]
+        other = Company.objects.create(name='Diğer', slug='diger', description='', location_text='Izmir')
+        WeeklyCommissionRollup.objects.create(company=other, week_start=week_start_for(), referral_count=1, total_amount=5)
+        WeeklyCommissionRollup.objects.create(company=other, week_start=date(2030, 1, 7), referral_count=1, total_amount=5)
+        ReferralRequest.objects.filter(pk=referrals[0].pk).update(is_commission_due=False)
+
+        mismatches = reconcile(chunk_size=1)
+
+        self.assertEqual(
+            [(m['type'], m.get('referral_id'), m.get('company_id'), m['expected']) for m in mismatches],
+            [('referral', referrals[0].id, None, None),
+             ('rollup', None, other.id, None), ('rollup', None, other.id, None)],
+        )
+
+class ReferralTransitionTest(TestCase):
+    """
+    Test conditional single-statement transitions and the bulk action endpoint.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.firm = Firm.objects.create(name='Bulk Firm', slug='bulk-firm')
+        self.company = Company.objects.create(name='Bulk Firm', slug='bulk-firm', description='', location_text='Izmir')
+        self.other_company = Company.objects.create(name='Other', slug='other', description='', location_text='Izmir')
+        User.objects.create_user(
+            username='bulk', email='bulk@example.com', password='Pass123!',
+            firm=self.firm, is_firm_manager=True, role='firm_manager'
+        )
+        self.service = Service.objects.create(company=self.company, title='Parke', description='')
+        token_response = self.client.post(
+            '/auth/token/',
+            data=json.dumps({'username': 'bulk', 'password': 'Pass123!'}),
+            content_type='application/json'
+        )
+        self.token = token_response.json()['access']
+
+    def _referral(self, company=None, **kwargs):
+        return ReferralRequest.objects.create(
+            target_company=company or self.company, requested_service=self.service,
+            customer_name='Mert', customer_email='mert@example.com', **kwargs
+        )
+
+    def test_second_transition_on_same_referral_is_rejected(self):
+        from core.referrals import transition_referrals
+
+        referral = self._referral()
+        self.assertEqual(len(transition_referrals([referral.id], 'accept', company_id=self.company.id)), 1)
+        self.assertEqual(transition_referrals([referral.id], 'reject', company_id=self.company.id), [])
+        referral.refresh_from_db()
+        self.assertEqual(referral.status, 'accepted')
+        self.assertTrue(referral.is_commission_due)
+
+    def test_fallback_without_update_returning(self):
+        from unittest import mock
+        from core.referrals import transition_referrals
+
+        referral, other = self._referral(), self._referral(company=self.other_company)
+        with mock.patch('core.referrals._supports_update_returning', return_value=False):
+            updated = transition_referrals([referral.id, other.id], 'reject', company_id=self.company.id)
+        self.assertEqual([r.id for r in updated], [referral.id])
+        other.refresh_from_db()
+        self.assertEqual(other.status, 'pending')
+
+    def test_bulk_action_updates_only_own_pending_referrals(self):
+        pending = [self._referral() for _ in range(3)]
+        done = self._referral(status='rejected')
+        foreign = self._referral(company=self.other_company)
+        ids = [r.id for r in pending] + [done.id, foreign.id]
+
+        response = self.client.post(
+            '/api/core/company/requests/bulk-action',
+            data=json.dumps({'ids': ids, 'action': 'accept'}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {self.token}'
+        )
+
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        self.assertEqual(body['updated'], [r.id for r in pending])
+        self.assertEqual(body['skipped'], [done.id, foreign.id])
+        self.assertEqual(ReferralRequest.objects.filter(status='accepted').count(), 3)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.status, 'pending')
+
+    def test_already_processed_referral_returns_400(self):
+        referral = self._referral(status='accepted')
+        response = self.client.post(
+            f'/api/core/company/request/{referral.id}/action',
+            data=json.dumps({'action': 'reject'}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {self.token}'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class ReferralEventLogTest(TestCase):
+    """
+    Test the buffered referral event log and the timeline endpoint.
+    """
+
+    def setUp(self):
+        from core.events import referral_events
+
+        self.client = Client()
+        self.firm = Firm.objects.create(name='Event Firm', slug='event-firm')
+        self.company = Company.objects.create(name='Event Firm', slug='event-firm', description='', location_text='Izmir')
+        self.manager = User.objects.create_user(
+            username='events', email='events@example.com', password='Pass123!',
+            firm=self.firm, is_firm_manager=True, role='firm_manager'
+        )
+        self.service = Service.objects.create(company=self.company, title='Cam', description='')
+        token_response = self.client.post(
+            '/auth/token/',
+            data=json.dumps({'username': 'events', 'password': 'Pass123!'}),
+            content_type='application/json'
+        )
+        self.auth = {'HTTP_AUTHORIZATION': f"Bearer {token_response.json()['access']}"}
+        referral_events.flush()
+
+    def test_events_are_buffered_and_listed_in_timeline(self):
+        from core.models import ReferralEvent
+        from core.events import referral_events
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/core/referral/create',
+                data=json.dumps({
+                    'target_company_id': self.company.id,
+                    'requested_service_id': self.service.id,
+                    'customer_name': 'Selin',
+                    'customer_email': 'selin@example.com',
+                    'description': '',
+                }),
+                content_type='application/json'
+            )
+        referral_id = response.json()['id']
+
+        # Olay yanıt döndükten sonra da henüz yazılmamış, tamponda bekliyor
+        self.assertEqual(len(referral_events), 1)
+        self.assertFalse(ReferralEvent.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get('/api/core/firm/my-referrals', **self.auth)
+            self.client.post(
+                f'/api/core/company/request/{referral_id}/action',
+                data=json.dumps({'action': 'accept'}),
+                content_type='application/json', **self.auth
+            )
+
+        response = self.client.get(f'/api/core/company/request/{referral_id}/timeline', **self.auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        timeline = response.json()
+        self.assertEqual([e['event_type'] for e in timeline], ['created', 'viewed', 'accepted'])
+        self.assertIsNone(timeline[0]['actor_id'])
+        self.assertEqual(timeline[2]['actor_id'], self.manager.id)
+        self.assertEqual(len(referral_events), 0)
+
+    def test_buffer_flushes_in_one_bulk_insert(self):
+        from core.models import ReferralEvent
+        from core.events import ReferralEventBuffer
+
+        referrals = [
+            ReferralRequest.objects.create(
+                target_company=self.company, requested_service=self.service,
+                customer_name='X', customer_email='x@example.com'
+            )
+            for _ in range(5)
+        ]
+        buffer = ReferralEventBuffer(batch_size=100, max_delay=60)
+        with self.captureOnCommitCallbacks(execute=True):
+            buffer.record([r.id for r in referrals], 'timeout')
+        self.assertFalse(buffer.due())
+
+        with self.assertNumQueries(1):
+            self.assertEqual(buffer.flush(), 5)
+        self.assertEqual(ReferralEvent.objects.filter(event_type='timeout').count(), 5)
+
+    def test_polling_records_only_the_first_view(self):
+        from core.models import ReferralEvent
+        from core.events import referral_events
+
+        referral = ReferralRequest.objects.create(
+            target_company=self.company, requested_service=self.service, customer_name='X', customer_email='x@example.com'
+        )
+        # İlk iki yenileme tampon boşaltılmadan gelir; kopya kısıt tarafından elenir
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.get('/api/core/firm/my-referrals', **self.auth)
+        referral_events.flush()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get('/api/core/firm/my-referrals', **self.auth)
+        self.assertEqual(len(referral_events), 0)
+        self.assertEqual(ReferralEvent.objects.filter(referral=referral, event_type='viewed').count(), 1)
+
+
+class FirmStatsTest(TestCase):
+    """
+    Test precomputed firm dashboard statistics and the mergeable percentile sketch.
+    """
+
+    def test_sketch_quantiles_are_within_relative_accuracy_after_merge(self):
+        from core.sketches import LogHistogram, RELATIVE_ACCURACY
+
+        first, second = LogHistogram(), LogHistogram()
+        for value in range(1, 501):
+            first.add(value)
+        for value in range(501, 1001):
+            second.add(value)
+
+        merged = LogHistogram.from_dict(first.to_dict()).merge(LogHistogram.from_dict(second.to_dict()))
+        self.assertEqual(merged.count, 1000)
+        for q, exact in ((0.5, 500.5), (0.9, 900.1), (0.99, 990.01)):
+            self.assertLessEqual(abs(merged.quantile(q) - exact) / exact, RELATIVE_ACCURACY + 0.01)
+
+    def test_stats_endpoint_reads_rollups(self):
+        firm = Firm.objects.create(name='Stats Firm', slug='stats-firm')
+        company = Company.objects.create(name='Stats Firm', slug='stats-firm', description='', location_text='Izmir')
+        User.objects.create_user(
+            username='stats', email='stats@example.com', password='Pass123!',
+            firm=firm, is_firm_manager=True, role='firm_manager'
+        )
+        service = Service.objects.create(company=company, title='Elektrik', description='')
+        client = Client()
+        token = client.post(
+            '/auth/token/',
+            data=json.dumps({'username': 'stats', 'password': 'Pass123!'}),
+            content_type='application/json'
+        ).json()['access']
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+        ids = []
+        for name in ('A', 'B', 'C'):
+            response = client.post(
+                '/api/core/referral/create',
+                data=json.dumps({
+                    'target_company_id': company.id, 'requested_service_id': service.id,
+                    'customer_name': name, 'customer_email': f'{name.lower()}@example.com', 'description': '',
+                }),
+                content_type='application/json'
+            )
+            ids.append(response.json()['id'])
+        client.post('/api/core/company/requests/bulk-action', data=json.dumps({'ids': ids[:2], 'action': 'accept'}),
+                    content_type='application/json', **auth)
+        client.post(f'/api/core/company/request/{ids[2]}/action', data=json.dumps({'action': 'reject'}),
+                    content_type='application/json', **auth)
+
+        with self.assertNumQueries(3):  # kullanıcı + firma çözümü + özet satırları
+            response = client.get('/api/core/firm/stats?period=week', **auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        self.assertEqual(len(body['buckets']), 1)
+        totals = body['totals']
+        self.assertEqual((totals['created'], totals['accepted'], totals['rejected']), (3, 2, 1))
+        self.assertAlmostEqual(totals['acceptance_rate'], 0.6667)
+        self.assertIsNotNone(totals['response_p50_seconds'])
+
+
+class DuplicateReferralTest(TestCase):
+    """
+    Test duplicate/spam suppression on referral creation.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.company = Company.objects.create(name='D', slug='d', description='', location_text='Izmir')
+        self.service = Service.objects.create(company=self.company, title='Tadilat', description='')
+
+    def _create(self, email):
+        return self.client.post(
+            '/api/core/referral/create',
+            data=json.dumps({
+                'target_company_id': self.company.id,
+                'requested_service_id': self.service.id,
+                'customer_name': 'Spam',
+                'customer_email': email,
+                'description': '',
+            }),
+            content_type='application/json'
+        )
+
+    def test_repeated_request_is_rejected_before_any_write(self):
+        self.assertEqual(self._create('Spammer@Example.com ').status_code, 201)
+
+        with self.assertNumQueries(1):  # yalnızca indeksli doğrulama sorgusu
+            response = self._create('spammer@example.com')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(ReferralRequest.objects.count(), 1)
+        self.assertEqual(ReferralRequest.objects.get().customer_email, 'spammer@example.com')
+
+    def test_rotating_bloom_filter_forgets_after_window(self):
+        from core.dedup import RotatingBloomFilter
+
+        now = [0.0]
+        bloom = RotatingBloomFilter(window_seconds=60, capacity=1000, generations=4, clock=lambda: now[0])
+        bloom.add('a|1|1')
+        now[0] = 59
+        self.assertIn('a|1|1', bloom)
+        self.assertNotIn('b|1|1', bloom)
+        now[0] = 200
+        self.assertNotIn('a|1|1', bloom)
+
+
+class LockRetryTest(TestCase):
+    """
+    Test retrying transient SQLite lock errors.
+    """
+
+    def test_retries_transient_lock_error_then_succeeds(self):
+        from django.db import OperationalError
+        from core.db import retry_on_lock
+
+        calls = []
+
+        @retry_on_lock(retries=2, backoff=0)
+        def write():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return 'ok'
+
+        # TestCase her testi bir transaction içinde çalıştırır; dış atomic bloğu yokmuş gibi davran
+        from unittest import mock
+        with mock.patch('core.db.connection') as connection:
+            connection.in_atomic_block = False
+            self.assertEqual(write(), 'ok')
+        self.assertEqual(len(calls), 3)
+
+    def test_other_operational_errors_are_not_retried(self):
+        from django.db import OperationalError
+        from core.db import retry_on_lock
+
+        calls = []
+
+        @retry_on_lock(retries=3, backoff=0)
+        def broken():
+            calls.append(1)
+            raise OperationalError('no such table: missing')
+
+        with self.assertRaises(OperationalError):
+            broken()
+        self.assertEqual(len(calls), 1)
+
+
+class ReplicaRoutingTest(TestCase):
+    """
+    Test primary/replica routing decisions and read-your-writes stickiness.
+    """
+
+    def setUp(self):
+        from django.test import RequestFactory
+        from core.replicas import replica_metrics
+        self.factory = RequestFactory()
+        replica_metrics.reset()
+
+    def _route(self, request, view):
+        """Run `view` behind the middleware with one healthy fake replica."""
+        from unittest import mock
+        from django.test import override_settings
+        from core.replicas import ReplicaRoutingMiddleware
+
+        with override_settings(DB_REPLICA_ALIASES=['replica_1']), \
+                mock.patch('core.replicas.replica_lag', return_value=0.5):
+            return ReplicaRoutingMiddleware(view)(request)
+
+    def test_catalog_get_reads_from_replica(self):
+        from django.http import HttpResponse
+        from core.replicas import PrimaryReplicaRouter
+        seen = {}
+
+        def view(request):
+            seen['alias'] = PrimaryReplicaRouter().db_for_read(Service)
+            return HttpResponse()
+
+        response = self._route(self.factory.get('/api/core/services/search'), view)
+        self.assertEqual(seen['alias'], 'replica_1')
+        self.assertNotIn('srdb_primary', response.cookies)
+
+    def test_write_pins_request_and_client_to_primary(self):
+        from django.http import HttpResponse
+        from core.replicas import PrimaryReplicaRouter, replica_metrics
+        router = PrimaryReplicaRouter()
+        seen = []
+
+        def view(request):
+            seen.append(router.db_for_read(Service))
+            router.db_for_write(Service)
+            seen.append(router.db_for_read(Service))
+            return HttpResponse()
+
+        response = self._route(self.factory.get('/api/core/categories'), view)
+        self.assertEqual(seen, ['replica_1', 'default'])
+        self.assertIn('srdb_primary', response.cookies)
+
+        # Sonraki istek çerez süresince primary'den okur
+        request = self.factory.get('/api/core/categories')
+        request.COOKIES['srdb_primary'] = '1'
+        self._route(request, lambda r: seen.append(router.db_for_read(Service)) or HttpResponse())
+        self.assertEqual(seen[-1], 'default')
+        self.assertEqual(replica_metrics.snapshot()['decisions']['primary:sticky'], 1)
+
+    def test_cross_origin_client_echoes_last_write_header(self):
+        from unittest import mock
+        from django.test import override_settings
+
+        company = Company.objects.create(name='Yaz', slug='yaz', description='', location_text='Izmir')
+        service = Service.objects.create(company=company, title='Boya', description='')
+        origin = {'HTTP_ORIGIN': 'http://localhost:5173'}
+
+        # 'replica_1' DATABASES'te yok: replikaya giden bir okuma hata verirdi
+        with override_settings(DB_REPLICA_ALIASES=['replica_1']), \
+                mock.patch('core.replicas.replica_lag', return_value=0.5):
+            response = self.client.post('/api/core/referral/create', data=json.dumps({
+                'target_company_id': company.id, 'requested_service_id': service.id,
+                'customer_name': 'Ece', 'customer_email': 'ece@example.com', 'description': '',
+            }), content_type='application/json', **origin)
+            self.assertEqual(response.status_code, 201, response.content)
+            written_at = response['X-DB-Last-Write']
+            self.assertIn('x-db-last-write', response['Access-Control-Expose-Headers'].lower())
+
+            # Çerez gönderilmeden, yalnızca başlık geri gönderilerek okuma primary'den yapılır
+            self.client.cookies.clear()
+            response = self.client.get('/api/core/categories', HTTP_X_DB_LAST_WRITE=written_at, **origin)
+        self.assertEqual(response.status_code, 200)
+
+    def test_stale_or_future_last_write_header_is_ignored(self):
+        import time
+        from django.http import HttpResponse
+        from core.replicas import PrimaryReplicaRouter
+        router = PrimaryReplicaRouter()
+
+        for written_at in (time.time() - 60, time.time() + 3600, 'abc'):
+            with self.subTest(written_at=written_at):
+                seen = []
+                request = self.factory.get('/api/core/categories', HTTP_X_DB_LAST_WRITE=str(written_at))
+                self._route(request, lambda r: seen.append(router.db_for_read(Service)) or HttpResponse())
+                self.assertEqual(seen, ['replica_1'])
+
+    def test_lagging_replica_and_private_paths_use_primary(self):
+        from unittest import mock
+        from django.http import HttpResponse
+        from django.test import override_settings
+        from core.replicas import PrimaryReplicaRouter, ReplicaRoutingMiddleware
+        seen = []
+
+        def view(request):
+            seen.append(PrimaryReplicaRouter().db_for_read(Service))
+            return HttpResponse()
+
+        self._route(self.factory.get('/api/core/firm/my-referrals'), view)
+        with override_settings(DB_REPLICA_ALIASES=['replica_1'], DB_REPLICA_MAX_LAG=10), \
+                mock.patch('core.replicas.replica_lag', return_value=60):
+            ReplicaRoutingMiddleware(view)(self.factory.get('/api/core/services/1'))
+        self.assertEqual(seen, ['default', 'default'])
+
+    def test_replica_lag_from_heartbeat(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from core.models import ReplicaHeartbeat
+        from core.replicas import replica_lag, _lag_cache
+
+        ReplicaHeartbeat.objects.create(pk=1, beat_at=timezone.now() - timedelta(seconds=30))
+        _lag_cache.clear()
+        self.assertAlmostEqual(replica_lag('default'), 30, delta=2)
+
+
+class QueryPlanIndexTest(TestCase):
+    """
+    EXPLAIN QUERY PLAN checks: every hot query must be served by an index.
+
+    Endpoints that intentionally read whole tables (admin export without
+    filters, substring search fallbacks, ledger reconciliation) are not listed.
+    """
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        full_scans = [
+            line for line in plan.splitlines()
+            if line.split(None, 3)[-1].startswith('SCAN ') and 'USING' not in line
+        ]
+        self.assertFalse(full_scans, f"Full table scan in plan:\n{plan}\n\nSQL: {queryset.query}")
+
+    def test_referral_queries_use_indexes(self):
+        from django.utils import timezone
+        now = timezone.now()
+        referrals = ReferralRequest.objects
+
+        # Firma paneli (durum filtresiyle ve filtresiz) ve dışa aktarma
+        self.assertUsesIndex(referrals.filter(target_company_id=1).order_by('-created_at'))
+        self.assertUsesIndex(referrals.filter(target_company_id=1, status='pending').order_by('-created_at'))
+        self.assertUsesIndex(referrals.filter(target_company_id=1, created_at__gte=now).order_by('-created_at'))
+        # Admin listesi
+        self.assertUsesIndex(referrals.filter(status='accepted').order_by('-created_at'))
+        self.assertUsesIndex(referrals.filter(created_at__gte=now, created_at__lt=now).order_by('-created_at'))
+        # Zaman aşımı görevi
+        self.assertUsesIndex(
+            referrals.filter(status='pending', expires_at__lte=now).order_by('expires_at').values_list('id', flat=True)[:500]
+        )
+        # Kabul/red (tekil ve toplu)
+        self.assertUsesIndex(referrals.filter(id__in=[1, 2], status='pending', target_company_id=1))
+        # Tekrarlanan talep kontrolü
+        self.assertUsesIndex(referrals.filter(
+            target_company_id=1, requested_service_id=1, customer_email='a@example.com', created_at__gte=now,
+        ))
+        # Komisyon mutabakatı (id ile parça parça)
+        self.assertUsesIndex(referrals.filter(is_commission_due=True, id__gt=0).order_by('id')[:1000])
+
+    def test_company_and_catalog_queries_use_indexes(self):
+        from django.db.models import Subquery
+        from core.models import (
+            Category, CommissionLedgerEntry, CompanyReferralStats, ReferralEvent, WeeklyCommissionRollup,
+        )
+
+        self.assertUsesIndex(Company.objects.filter(slug='firma'))
+        self.assertUsesIndex(Company.objects.filter(
+            slug=Subquery(Firm.objects.filter(name='Firma').values('slug')[:1])
+        ).values_list('id', flat=True))
+        self.assertUsesIndex(Service.objects.filter(company_id=1).select_related('company', 'category'))
+        self.assertUsesIndex(Service.objects.filter(company_id=1, category_id=1))
+        self.assertUsesIndex(Service.objects.filter(id=1).select_related('company', 'category'))
+        self.assertUsesIndex(Category.objects.filter(slug='temizlik'))
+        self.assertUsesIndex(Category.objects.filter(Category.subtree_q('000001/')))
+        self.assertUsesIndex(ReferralEvent.objects.filter(referral_id=1).order_by('created_at', 'id'))
+        self.assertUsesIndex(ReferralEvent.objects.filter(referral_id__in=[1, 2], actor_id=1, event_type='viewed'))
+        self.assertUsesIndex(
+            CompanyReferralStats.objects.filter(company_id=1, period='day').order_by('-bucket_start')[:30]
+        )
+        self.assertUsesIndex(
+            WeeklyCommissionRollup.objects.filter(week_start='2025-01-06').select_related('company')
+            .order_by('-total_amount')
+        )
+        self.assertUsesIndex(CommissionLedgerEntry.objects.filter(referral_id__in=[1, 2]))
+
+    def test_user_queries_use_indexes(self):
+        from users.models import CustomerAddress
+
+        self.assertUsesIndex(User.objects.filter(email='a@example.com'))
+        self.assertUsesIndex(User.objects.filter(username='a'))
+        self.assertUsesIndex(User.objects.filter(firm_id='00000000-0000-0000-0000-000000000000').order_by('username'))
+        # Çalışan listesi: keyset sayfalama, rol filtresi ve önek araması
+        self.assertUsesIndex(User.objects.filter(username__gt='m').order_by('username')[:51])
+        self.assertUsesIndex(User.objects.filter(role='firm_employee', username__gt='m').order_by('username')[:51])
+        from django.db.models import Value
+        from django.db.models.functions import Lower
+        from firm.api import _prefix_q
+        self.assertUsesIndex(User.objects.alias(
+            username_lower=Lower('username'), email_lower=Lower('email'), full_name_lower=Lower('full_name'),
+        ).filter(_prefix_q('Ali')).order_by('username')[:51])
+        self.assertUsesIndex(CustomerAddress.objects.filter(user_id=1).order_by('-is_default', '-created_at'))
+        self.assertUsesIndex(CustomerAddress.objects.filter(user_id=1, is_default=True))
+        self.assertUsesIndex(CustomerAddress.objects.filter(id=1, user_id=1))
+
+
+class EndpointQueryBudgetTest(TestCase):
+    """
+    Call every operation on the Ninja `api` and assert a per-endpoint query budget.
+
+    Each operation runs twice: once on the base fixtures and once after every list
+    grew. The count must stay the same, so serialization never lazy-loads per row.
+    Every call runs inside a rolled-back transaction.
+    """
+
+    # (method, path) -> (user, izin verilen en fazla sorgu)
+    BUDGETS = {
+        ('GET', '/core/status'): (None, 0),
+        ('GET', '/core/services/search'): (None, 2),
+        ('GET', '/core/services/{service_id}'): (None, 2),
+        ('POST', '/core/referral/create'): (None, 6),
+        ('POST', '/core/referral/create-batch'): (None, 5),
+        ('GET', '/core/firm/my-referrals'): ('manager', 5),
+        ('GET', '/core/firm/referrals/export'): ('manager', 4),
+        ('POST', '/core/company/request/{request_id}/action'): ('manager', 11),
+        ('GET', '/core/company/request/{request_id}/timeline'): ('manager', 4),
+        ('GET', '/core/firm/stats'): ('manager', 3),
+        ('POST', '/core/company/requests/bulk-action'): ('manager', 8),
+        ('GET', '/core/firm/company'): ('manager', 4),
+        ('PUT', '/core/firm/company'): ('manager', 6),
+        ('PATCH', '/core/firm/company'): ('manager', 6),
+        ('POST', '/core/users/register'): (None, 3),
+        ('POST', '/core/firm/register'): ('admin', 7),
+        ('GET', '/core/firm/services'): ('manager', 4),
+        ('POST', '/core/firm/services'): ('manager', 8),
+        ('GET', '/core/firm/services/{service_id}'): ('manager', 4),
+        ('PUT', '/core/firm/services/{service_id}'): ('manager', 8),
+        ('PATCH', '/core/firm/services/{service_id}'): ('manager', 8),
+        ('DELETE', '/core/firm/services/{service_id}'): ('manager', 9),
+        ('POST', '/core/firm/services/batch'): ('manager', 11),
+        ('GET', '/core/admin/referrals'): ('admin', 2),
+        ('GET', '/core/admin/referrals/export'): ('admin', 2),
+        ('GET', '/core/admin/db/replicas'): ('admin', 1),
+        ('GET', '/core/categories'): (None, 3),
+        ('GET', '/core/categories/tree'): (None, 3),
+        ('GET', '/core/firm/management/users'): ('manager', 4),
+        ('POST', '/core/firm/management/users'): ('manager', 5),
+        ('POST', '/core/firm/management/users/bulk'): ('manager', 5),
+        ('POST', '/core/firm/management/users/import'): ('manager', 5),
+        ('PUT', '/core/firm/management/users/{user_id}'): ('manager', 4),
+        ('DELETE', '/core/firm/management/users/{user_id}'): ('manager', 12),
+        ('GET', '/users/addresses'): ('customer', 2),
+        ('POST', '/users/addresses'): ('customer', 3),
+        ('GET', '/users/addresses/{address_id}'): ('customer', 2),
+        ('PUT', '/users/addresses/{address_id}'): ('customer', 3),
+        ('DELETE', '/users/addresses/{address_id}'): ('customer', 3),
+        ('PUT', '/users/addresses/{address_id}/default'): ('customer', 4),
+    }
+
+    def setUp(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+        from core.models import Category
+
+        self.client = Client()
+        self.firm = Firm.objects.create(name='Bütçe Firma', slug='butce-firma')
+        self.company = Company.objects.create(name='Bütçe Firma', slug='butce-firma', description='', location_text='Izmir')
+        self.manager = User.objects.create_user(
+            username='manager', email='manager@example.com', password='x', firm=self.firm,
+            is_firm_manager=True, role='firm_manager',
+        )
+        self.employee = User.objects.create_user(username='employee', email='employee@example.com', password='x', firm=self.firm)
+        admin = User.objects.create_superuser(username='root', email='root@example.com', password='x')
+        customer = User.objects.create_user(username='customer', email='customer@example.com', password='x')
+        self.tokens = {
+            'manager': str(RefreshToken.for_user(self.manager).access_token),
+            'admin': str(RefreshToken.for_user(admin).access_token),
+            'customer': str(RefreshToken.for_user(customer).access_token),
+        }
+        self.customer = customer
+        self.category = Category.objects.create(name='Tesisat', slug='tesisat')
+        self.size = 0
+        self._grow()
+        self.service = Service.objects.filter(company=self.company).first()
+        self.referral = ReferralRequest.objects.filter(target_company=self.company).first()
+        self.address = self.customer.addresses.first()
+
+    def _grow(self, count=1):
+        """Add `count` more rows to every list the endpoints return."""
+        from core.models import Category, ReferralEvent
+        from users.models import CustomerAddress
+        from core.stats import record_created
+
+        for _ in range(count):
+            self.size += 1
+            n = self.size
+            category = Category.objects.create(name=f'Kategori {n}', slug=f'kategori-{n}')
+            service = Service.objects.create(company=self.company, category=category, title=f'Hizmet {n}', description='')
+            referral = ReferralRequest.objects.create(
+                target_company=self.company, requested_service=service,
+                customer_name='Müşteri', customer_email=f'musteri{n}@example.com',
+            )
+            ReferralEvent.objects.create(referral=referral, event_type='created')
+            record_created([referral])
+            User.objects.create_user(username=f'calisan{n}', email=f'calisan{n}@example.com', password='x', firm=self.firm)
+            CustomerAddress.objects.create(
+                user=self.customer, full_address='Adres', street='Sokak', district='Konak',
+                city='Izmir', postal_code='35000', phone='555', is_default=(n == 1),
+            )
+
+    def _call(self, method, path, user, run):
+        url = '/api' + path.format(
+            service_id=self.service.id, request_id=self.referral.id,
+            user_id=self.employee.id, address_id=self.address.id,
+        )
+        service_body = {'title': 'Yeni', 'description': '', 'price_range_min': 1, 'price_range_max': 2,
+                        'category': self.category.id}
+        address_body = {'full_address': 'Adres', 'street': 'Sokak', 'district': 'Konak', 'city': 'Izmir',
+                        'postal_code': '35000', 'phone': '555', 'is_default': True}
+        bodies = {
+            '/core/referral/create': {
+                'target_company_id': self.company.id, 'requested_service_id': self.service.id,
+                'customer_name': 'Ali', 'customer_email': f'ali{run}@example.com', 'description': '',
+            },
+            '/core/referral/create-batch': {
+                'customer_name': 'Ali', 'customer_email': f'toplu{run}@example.com',
+                'items': [{'target_company_id': self.company.id, 'requested_service_id': self.service.id}],
+            },
+            '/core/company/request/{request_id}/action': {'action': 'accept'},
+            '/core/company/requests/bulk-action': {'ids': [self.referral.id], 'action': 'reject'},
+            '/core/firm/company': {
+                'name': 'Bütçe Firma', 'description': 'Yeni açıklama', 'location_text': 'Izmir',
+                'phone': None, 'email': None, 'tax_number': None, 'trade_registry_number': None, 'logo': None,
+                'cover_image': None, 'working_hours': None, 'special_days': None, 'min_order_amount': None,
+                'default_delivery_fee': None, 'estimated_delivery_time_minutes': None, 'delivery_areas': None,
+            },
+            '/core/users/register': {'username': f'yeni{run}', 'email': f'yeni{run}@example.com',
+                                     'full_name': 'Yeni', 'password': 'x'},
+            '/core/firm/register': {'username': f'yonetici{run}', 'email': f'yonetici{run}@example.com',
+                                    'full_name': 'Yönetici', 'password': 'x', 'firm_name': f'Yeni Firma {run}'},
+            '/core/firm/services': service_body,
+            '/core/firm/services/{service_id}': service_body,
+            '/core/firm/services/batch': {'operations': [
+                {'op': 'create', **service_body},
+                {'op': 'update', 'id': self.service.id, 'price_range_max': 5},
+            ]},
+            '/core/firm/management/users': {'username': f'ek{run}', 'email': f'ek{run}@example.com',
+                                            'full_name': 'Ek', 'password': 'x'},
+            '/core/firm/management/users/bulk': {'items': [{'username': f'toplu{run}', 'email': f'toplu{run}@example.com',
+                                                            'full_name': 'Toplu', 'password': 'x'}]},
+            '/core/firm/management/users/{user_id}': {'is_firm_manager': True},
+            '/users/addresses': address_body,
+            '/users/addresses/{address_id}': address_body,
+        }
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {self.tokens[user]}'} if user else {}
+        if path == '/core/firm/management/users/import':
+            from django.core.files.uploadedfile import SimpleUploadedFile
+            csv_body = f'username,email,full_name,password\ncsv{run},csv{run}@example.com,Csv,x\n'.encode()
+            return self.client.post(url, {'file': SimpleUploadedFile('users.csv', csv_body)}, **headers)
+        body = bodies.get(path) if method in ('POST', 'PUT', 'PATCH') else None
+        return getattr(self.client, method.lower())(
+            url, data=json.dumps(body or {}) if body is not None else None,
+            content_type='application/json', **headers,
+        ) if body is not None else getattr(self.client, method.lower())(url, **headers)
+
+    def _count(self, method, path, user, run):
+        from django.db import connection, transaction
+        from django.test.utils import CaptureQueriesContext
+
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                response = self._call(method, path, user, run)
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+            transaction.set_rollback(True)
+        self.assertLess(response.status_code, 400, f'{method} {path}: {content[:300]}')
+        # Savepoint'ler sorgu değildir
+        return [q['sql'] for q in queries.captured_queries if 'SAVEPOINT' not in q['sql']]
+
+    def _operations(self):
+        from core.api.router import api
+        for prefix, router in api._routers:
+            for path, path_view in router.path_operations.items():
+                for operation in path_view.operations:
+                    for method in operation.methods:
+                        yield method, prefix + path
+
+    def test_every_operation_has_a_budget(self):
+        self.assertEqual(set(self._operations()), set(self.BUDGETS))
+
+    def test_query_budgets_are_met_independent_of_result_size(self):
+        small = {}
+        for (method, path), (user, _) in self.BUDGETS.items():
+            small[method, path] = self._count(method, path, user, run=1)
+        self._grow(5)
+        for (method, path), (user, budget) in self.BUDGETS.items():
+            with self.subTest(endpoint=f'{method} {path}'):
+                large = self._count(method, path, user, run=2)
+                self.assertEqual(len(large), len(small[method, path]),
+                                 'Query count grows with result size:\n' + '\n'.join(large))
+                self.assertLessEqual(len(large), budget, '\n'.join(large))
+
+    def test_repeated_query_middleware_logs_n_plus_one(self):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from core.querylog import RepeatedQueryMiddleware
+
+        def view(request):
+            # Kasıtlı N+1: her hizmet için firmayı ayrı sorguyla yükle
+            for service in Service.objects.all():
+                service.company.name
+            return HttpResponse()
+
+        self._grow(3)
+        with self.assertLogs('core.querylog', level='WARNING') as logs:
+            RepeatedQueryMiddleware(view)(RequestFactory().get('/api/core/services/search'))
+        self.assertIn('core_company', logs.output[0])
+        self.assertIn('test_repeated_query_middleware_logs_n_plus_one', logs.output[0])
+
+
+class FernetKeyRotationTest(TestCase):
+    """
+    Test MultiFernet decryption and batched, resumable key rotation.
+    """
+
+    def setUp(self):
+        from cryptography.fernet import Fernet
+        self.old_key = Fernet.generate_key().decode()
+        self.new_key = Fernet.generate_key().decode()
+        self.companies = []
+        for i in range(5):
+            company = Company.objects.create(name=f'F{i}', slug=f'f{i}', description='', location_text='')
+            company.encrypted_sensitive_data = Fernet(self.old_key.encode()).encrypt(f'iban-{i}'.encode()).decode()
+            company.save()
+            self.companies.append(company)
+
+    def _fernet(self, *keys):
+        from unittest import mock
+        from cryptography.fernet import Fernet, MultiFernet
+        return mock.patch('core.models.FERNET', MultiFernet([Fernet(key.encode()) for key in keys]))
+
+    def test_rotation_moves_rows_to_new_key_in_chunks(self):
+        from core.keyrotation import rotate_sensitive_data
+        chunks = []
+
+        progress = rotate_sensitive_data(
+            chunk_size=2, keys=[self.new_key, self.old_key], on_progress=lambda p: chunks.append(p.last_pk),
+        )
+        self.assertEqual((progress.rotated, progress.skipped, progress.failed), (5, 0, 0))
+        self.assertEqual(len(chunks), 3)
+
+        # Eski anahtar listeden çıkarıldıktan sonra da okunabilir
+        with self._fernet(self.new_key):
+            for i, company in enumerate(Company.objects.order_by('pk')):
+                self.assertEqual(company.sensitive_data, f'iban-{i}')
+
+        # Tekrar çalıştırmak hiçbir şeyi yeniden şifrelemez (kaldığı yerden devam güvenli)
+        again = rotate_sensitive_data(keys=[self.new_key, self.old_key])
+        self.assertEqual((again.rotated, again.skipped), (0, 5))
+
+    def test_resume_after_pk_and_unknown_key_rows_are_reported(self):
+        from cryptography.fernet import Fernet
+        from core.keyrotation import rotate_sensitive_data
+
+        stray = self.companies[-1]
+        stray.encrypted_sensitive_data = Fernet(Fernet.generate_key()).encrypt(b'x').decode()
+        stray.save()
+
+        progress = rotate_sensitive_data(start_after=self.companies[1].pk, keys=[self.new_key, self.old_key])
+        self.assertEqual((progress.rotated, progress.failed), (2, 1))
+        self.assertEqual(progress.last_pk, stray.pk)
+
+    def test_decrypted_value_is_cached_per_instance(self):
+        from unittest import mock
+        company = Company.objects.get(pk=self.companies[0].pk)
+
+        with self._fernet(self.old_key) as fernet:
+            with mock.patch.object(fernet, 'decrypt', wraps=fernet.decrypt) as decrypt:
+                self.assertEqual(company.sensitive_data, 'iban-0')
+                self.assertEqual(company.sensitive_data, 'iban-0')
+                self.assertEqual(decrypt.call_count, 1)
+
+                company.sensitive_data = 'yeni-iban'
+                self.assertEqual(company.sensitive_data, 'yeni-iban')
+                self.assertEqual(decrypt.call_count, 1)
+
+
+class ServiceCardReadModelTest(TestCase):
+    """
+    Test that the flattened ServiceCard table follows Service/Company/Category writes.
+    """
+
+    def setUp(self):
+        from core.models import Category
+        self.category = Category.objects.create(name='Tesisat', slug='tesisat')
+        self.company = Company.objects.create(name='Usta', slug='usta', description='', location_text='Izmir')
+        self.service = Service.objects.create(
+            company=self.company, category=self.category, title='Kombi Bakımı', description='', price_range_min=100,
+        )
+
+    def test_card_follows_source_rows(self):
+        from core.models import ServiceCard
+
+        card = ServiceCard.objects.get(service=self.service)
+        self.assertEqual((card.company_name, card.category_slug), ('Usta', 'tesisat'))
+
+        self.company.name = 'Usta Tesisat'
+        self.company.save()
+        self.category.name = 'Su Tesisatı'
+        self.category.save()
+        self.service.title = 'Kombi Servisi'
+        self.service.save()
+        card.refresh_from_db()
+        self.assertEqual((card.title, card.company_name, card.category_name), ('Kombi Servisi', 'Usta Tesisat', 'Su Tesisatı'))
+
+        self.category.delete()
+        card.refresh_from_db()
+        self.assertIsNone(card.category_id)
+
+        self.service.delete()
+        self.assertFalse(ServiceCard.objects.exists())
+
+    def test_search_reads_cards_without_joins(self):
+        from core.cards import rebuild_service_cards
+
+        Service.objects.create(company=self.company, title='Petek Temizliği', description='')
+        self.assertEqual(rebuild_service_cards(), 2)
+
+        # Collection version, category subtree paths, cards
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/core/services/search', {'category': 'tesisat', 'location': 'izmir'})
+        body = response.json()
+        self.assertEqual([item['id'] for item in body], [self.service.id])
+        self.assertEqual(body[0]['company'], {
+            'id': self.company.id, 'name': 'Usta', 'slug': 'usta', 'location_text': 'Izmir', 'logo': None,
+        })
+        self.assertEqual(body[0]['category'], {'id': self.category.id, 'name': 'Tesisat', 'slug': 'tesisat'})
+
+    def test_backfill_migration_writes_cards_in_batches(self):
+        from importlib import import_module
+        from unittest import mock
+        from django.apps import apps
+        from core.models import ServiceCard
+
+        migration = import_module('core.migrations.0012_service_card')
+        for index in range(4):
+            Service.objects.create(company=self.company, title=f'Hizmet {index}', description='')
+        ServiceCard.objects.all().delete()
+
+        with mock.patch.object(migration, 'CHUNK_SIZE', 2), \
+                mock.patch.object(ServiceCard.objects, 'bulk_create', wraps=ServiceCard.objects.bulk_create) as bulk_create:
+            migration.build_service_cards(apps, None)
+
+        self.assertEqual([len(call.args[0]) for call in bulk_create.call_args_list], [2, 2, 1])
+        self.assertEqual(ServiceCard.objects.count(), 5)
+
+
+class BulkSerializationTest(TestCase):
+    """
+    Test that the values()-based bulk path and the orjson renderer match the schema path.
+    """
+
+    def setUp(self):
+        from core.models import Category
+        category = Category.objects.create(name='Temizlik', slug='temizlik', description='Ev ve ofis')
+        company = Company.objects.create(
+            name='Işıl Temizlik', slug='isil', description='Açıklama "tırnaklı"', location_text='İzmir',
+            min_order_amount=Decimal('150.50'), estimated_delivery_time_minutes=30,
+        )
+        with_category = Service.objects.create(
+            company=company, category=category, title='Koltuk Yıkama', description='',
+            price_range_min=Decimal('100.00'), price_range_max=Decimal('249.99'),
+        )
+        without_category = Service.objects.create(company=company, title='Cam Silme', description='')
+        deleted = Service.objects.create(company=company, category=category, title='Silinecek', description='')
+        for service in (with_category, without_category, deleted):
+            ReferralRequest.objects.create(
+                customer_name='Ayşe', customer_email='ayse@example.com', target_company=company,
+                requested_service=service, commission_amount=Decimal('75.00'),
+            )
+        # requested_service SET_NULL: talep hizmetsiz kalır
+        deleted.delete()
+
+    def test_bulk_rows_render_byte_identical_to_schema_dump(self):
+        from core.api.schemas import ReferralRequestOut, ServiceCardSchema, ServiceSchema, SERVICE_CARD_SOURCES
+        from core.api.serialization import renderer, serialize_rows
+        from core.models import ServiceCard
+
+        cases = [
+            (ServiceSchema, Service.objects.select_related('company', 'category').order_by('pk'), None),
+            (ReferralRequestOut, ReferralRequest.objects.select_related(
+                'requested_service__company', 'requested_service__category').order_by('pk'), None),
+            (ServiceCardSchema, ServiceCard.objects.order_by('pk'), SERVICE_CARD_SOURCES),
+        ]
+        for schema, queryset, sources in cases:
+            with self.subTest(schema=schema.__name__):
+                expected = [schema.from_orm(obj).model_dump() for obj in queryset]
+                self.assertEqual(serialize_rows(queryset, schema, sources), expected)
+                self.assertEqual(
+                    renderer.render(None, serialize_rows(queryset, schema, sources), response_status=200),
+                    renderer.render(None, expected, response_status=200),
+                )
+
+    def test_referral_with_deleted_service_has_null_service(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        admin = User.objects.create_superuser(username='kok', email='kok@example.com', password='x')
+        response = self.client.get(
+            '/api/core/admin/referrals', HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(admin).access_token}'
+        )
+        self.assertEqual(response.status_code, 200)
+        services = [item['requested_service'] for item in response.json()]
+        self.assertEqual(services.count(None), 1)
+        self.assertEqual(sorted(s['title'] for s in services if s), ['Cam Silme', 'Koltuk Yıkama'])
+        self.assertIn(None, [s['category'] for s in services if s])
+
+    def test_orjson_renderer_matches_default_renderer_values(self):
+        from ninja.renderers import JSONRenderer
+        from core.api.schemas import ReferralRequestOut
+        from core.api.serialization import renderer
+
+        data = [ReferralRequestOut.from_orm(obj).model_dump() for obj in ReferralRequest.objects.all()]
+        legacy = JSONRenderer().render(None, data, response_status=200)
+        rendered = json.loads(renderer.render(None, data, response_status=200))
+        self.assertEqual(rendered, json.loads(legacy))
+        self.assertTrue(rendered[0]['created_at'].endswith('Z'))
+
+
+class SparseFieldsetTest(TestCase):
+    """
+    Test that `fields=` trims catalog responses and the SQL column list together.
+    """
+
+    def setUp(self):
+        from core.models import Category
+        self.category = Category.objects.create(name='Nakliyat', slug='nakliyat')
+        self.company = Company.objects.create(
+            name='Hızlı Nakliyat', slug='hizli', description='Uzun açıklama', location_text='Izmir',
+            working_hours={'pzt': '09-18'},
+        )
+        self.service = Service.objects.create(
+            company=self.company, category=self.category, title='Ev Taşıma', description='', price_range_min=1000,
+        )
+
+    def _get(self, path, **params):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(path, params)
+        return response, ' '.join(query['sql'] for query in ctx.captured_queries)
+
+    def test_search_returns_and_selects_only_requested_fields(self):
+        response, sql = self._get('/api/core/services/search', fields='id,title,price_range_min,company.name')
+        self.assertEqual(response.json(), [
+            {'id': self.service.id, 'title': 'Ev Taşıma', 'price_range_min': 1000.0, 'company': {'name': 'Hızlı Nakliyat'}},
+        ])
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('company_slug', sql)
+
+    def test_detail_projection_skips_company_json_columns(self):
+        response, sql = self._get(f'/api/core/services/{self.service.id}', fields='title,company.name,category')
+        self.assertEqual(response.json(), {
+            'title': 'Ev Taşıma',
+            'company': {'name': 'Hızlı Nakliyat'},
+            'category': {'id': self.category.id, 'name': 'Nakliyat', 'slug': 'nakliyat', 'description': None},
+        })
+        self.assertNotIn('working_hours', sql)
+        self.assertEqual(self.client.get('/api/core/services/999999', {'fields': 'id'}).status_code, 404)
+
+    def test_unknown_field_is_rejected(self):
+        for path in ('/api/core/services/search', f'/api/core/services/{self.service.id}', '/api/core/categories'):
+            with self.subTest(path=path):
+                response = self.client.get(path, {'fields': 'id,company.owner'})
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/core/categories', {'fields': 'slug'}).json(), [{'slug': 'nakliyat'}])
+
+
+class ConditionalGetTest(TestCase):
+    """
+    Test ETag/Last-Modified validators and 304 answers from version lookups alone.
+    """
+
+    def setUp(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+        from core.models import Category
+
+        self.category = Category.objects.create(name='Boya', slug='boya')
+        firm = Firm.objects.create(name='Renk', slug='renk')
+        self.company = Company.objects.create(name='Renk', slug='renk', description='', location_text='Izmir')
+        self.service = Service.objects.create(company=self.company, category=self.category, title='Boya Badana', description='')
+        manager = User.objects.create_user(
+            username='renk', email='renk@example.com', password='x', firm=firm, is_firm_manager=True, role='firm_manager',
+        )
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(manager).access_token}'}
+
+    def _assert_revalidates(self, path, change, params=None, queries=1, **headers):
+        first = self.client.get(path, params or {}, **headers)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first['ETag'].startswith('W/"'))
+        self.assertIn('Last-Modified', first)
+
+        with self.assertNumQueries(queries):
+            cached = self.client.get(path, params or {}, HTTP_IF_NONE_MATCH=first['ETag'], **headers)
+        self.assertEqual((cached.status_code, cached.content), (304, b''))
+        self.assertEqual(cached['ETag'], first['ETag'])
+
+        change()
+        fresh = self.client.get(path, params or {}, HTTP_IF_NONE_MATCH=first['ETag'], **headers)
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh['ETag'], first['ETag'])
+
+    def test_search_uses_collection_version(self):
+        def rename_company():
+            self.company.name = 'Renk Boya'
+            self.company.save()
+
+        self._assert_revalidates('/api/core/services/search', rename_company, {'location': 'izmir'})
+        etags = {self.client.get('/api/core/services/search', {'fields': f}).get('ETag') for f in ('id', 'title')}
+        self.assertEqual(len(etags), 2)
+
+    def test_service_detail_uses_row_versions(self):
+        def rename_category():
+            self.category.name = 'Boya & Badana'
+            self.category.save()
+
+        self._assert_revalidates(f'/api/core/services/{self.service.id}', rename_category)
+
+    def test_service_detail_revalidates_after_category_delete(self):
+        # Hizmet en son yazılan satırdır; SET_NULL tek başına ETag'i değiştirmezdi
+        self.service.save()
+        self._assert_revalidates(f'/api/core/services/{self.service.id}', self.category.delete)
+
+    def test_categories_and_company_revalidate(self):
+        from core.models import Category
+
+        self._assert_revalidates(
+            '/api/core/categories', lambda: Category.objects.create(name='Çatı', slug='cati'))
+        def change_phone():
+            self.company.phone = '0232 111 11 11'
+            self.company.save()
+
+        # Auth (user + firm) and the company version lookup
+        self._assert_revalidates('/api/core/firm/company', change_phone, queries=3, **self.auth)
+
+
+class CategoryTreeTest(TestCase):
+    """
+    Test materialized paths, subtree search and the versioned category tree cache.
+    """
+
+    def setUp(self):
+        from core.models import Category
+
+        self.home = Category.objects.create(name='Ev', slug='ev')
+        self.cleaning = Category.objects.create(name='Temizlik', slug='temizlik', parent=self.home)
+        self.carpet = Category.objects.create(name='Halı Yıkama', slug='hali', parent=self.cleaning)
+        self.moving = Category.objects.create(name='Nakliyat', slug='nakliyat')
+        self.company = Company.objects.create(name='Pırıl', slug='piril', description='', location_text='Izmir')
+        for category, title in ((self.carpet, 'Halı'), (self.carpet, 'Kilim'), (self.cleaning, 'Ev Temizliği')):
+            Service.objects.create(company=self.company, category=category, title=title, description='')
+
+    def test_paths_follow_moves(self):
+        from core.models import Category
+
+        self.assertEqual(self.carpet.path, f'{self.home.pk:06d}/{self.cleaning.pk:06d}/{self.carpet.pk:06d}/')
+        self.cleaning.parent = self.moving
+        self.cleaning.save()
+        self.carpet.refresh_from_db()
+        self.assertTrue(self.carpet.path.startswith(self.moving.path))
+        self.assertEqual(set(Category.objects.filter(Category.subtree_q(self.moving.path))),
+                         {self.moving, self.cleaning, self.carpet})
+
+        self.moving.parent = self.carpet
+        with self.assertRaises(ValueError):
+            self.moving.save()
+
+    def test_parent_is_protected_and_path_width_is_enforced(self):
+        from unittest import mock
+        from django.db.models import ProtectedError
+        from core.models import Category
+
+        with self.assertRaises(ProtectedError):
+            self.cleaning.delete()
+        self.carpet.delete()
+        self.cleaning.delete()
+
+        with mock.patch('core.models.CATEGORY_PATH_STEP', 0), self.assertRaises(ValueError):
+            Category.objects.create(name='Çok Uzun', slug='cok-uzun')
+        self.assertFalse(Category.objects.filter(slug='cok-uzun').exists())
+
+    def test_search_matches_whole_subtree(self):
+        titles = {item['title'] for item in self.client.get('/api/core/services/search', {'category': 'ev'}).json()}
+        self.assertEqual(titles, {'Halı', 'Kilim', 'Ev Temizliği'})
+        titles = {item['title'] for item in self.client.get('/api/core/services/search', {'category': 'hali'}).json()}
+        self.assertEqual(titles, {'Halı', 'Kilim'})
+
+    def test_counts_are_cached_until_a_version_changes(self):
+        counts = {c['slug']: (c['service_count'], c['subtree_service_count'])
+                  for c in self.client.get('/api/core/categories').json()}
+        self.assertEqual(counts, {'ev': (0, 3), 'temizlik': (1, 3), 'hali': (2, 2), 'nakliyat': (0, 0)})
+
+        with self.assertNumQueries(1):
+            tree = self.client.get('/api/core/categories/tree').json()
+        self.assertEqual([root['slug'] for root in tree], ['ev', 'nakliyat'])
+        self.assertEqual(tree[0]['children'][0]['children'][0]['slug'], 'hali')
+
+        Service.objects.create(company=self.company, category=self.moving, title='Ev Taşıma', description='')
+        counts = {c['slug']: c['subtree_service_count'] for c in self.client.get('/api/core/categories').json()}
+        self.assertEqual(counts['nakliyat'], 1)
+
+
+class ImportCatalogTest(TestCase):
+    """
+    Test the bulk catalog import: upserts, card refresh, rejected rows and re-runs.
+    """
+
+    def setUp(self):
+        import tempfile
+        from core.models import Category
+
+        Category.objects.create(name='Tesisat', slug='tesisat')
+        Company.objects.create(name='Eski Ad', slug='usta', description='', location_text='Izmir')
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _write(self, name, text):
+        import os
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(text)
+        return path
+
+    def _import(self, companies, services):
+        import io
+        from django.core.management import call_command
+
+        rejects = self._write('rejects.jsonl', '')
+        call_command('import_catalog', companies=companies, services=services, rejects=rejects,
+                     batch_size=2, skip_index=True, stdout=io.StringIO())
+        with open(rejects, encoding='utf-8') as handle:
+            return [json.loads(line) for line in handle]
+
+    def test_import_upserts_and_reports_rejects(self):
+        from core.models import ServiceCard
+
+        companies = self._write('firms.csv', (
+            'name,slug,location_text,email,min_order_amount\n'
+            'Usta Tesisat,usta,Izmir,info@usta.com,100.50\n'
+            'Yeni Firma,yeni,Ankara,,\n'
+            'Bozuk,bozuk slug,Izmir,not-an-email,abc\n'
+        ))
+        services = self._write('services.jsonl', '\n'.join([
+            json.dumps({'company_slug': 'usta', 'external_id': 'K-1', 'title': 'Kombi Bakımı', 'category_slug': 'tesisat', 'price_range_min': '100'}),
+            json.dumps({'company_slug': 'yeni', 'title': 'Ev Taşıma', 'external_id': 'T-1'}),
+            json.dumps({'company_slug': 'yok', 'external_id': 'S-1', 'title': 'Sahipsiz'}),
+            json.dumps({'company_slug': 'usta', 'external_id': 'P-1', 'title': 'Pahalı', 'price_range_min': '500', 'price_range_max': '100'}),
+            '{bozuk json',
+            # Aynı başlıklı ikinci hizmet kimliksiz gelirse birincinin üzerine yazılmaz
+            json.dumps({'company_slug': 'usta', 'title': 'Kombi Bakımı', 'price_range_min': '999'}),
+        ]))
+        rejects = self._import(companies, services)
+
+        self.assertEqual(Company.objects.get(slug='usta').name, 'Usta Tesisat')
+        self.assertEqual(Company.objects.get(slug='usta').min_order_amount, Decimal('100.50'))
+        self.assertEqual(sorted(Service.objects.values_list('external_id', flat=True)), ['K-1', 'T-1'])
+        card = ServiceCard.objects.get(service__external_id='K-1')
+        self.assertEqual((card.company_name, card.category_slug), ('Usta Tesisat', 'tesisat'))
+        self.assertEqual(
+            [(r['kind'], r['line'], sorted(r['errors'])) for r in rejects],
+            [('companies', 4, ['email', 'min_order_amount', 'slug']),
+             ('services', 3, ['company_slug']), ('services', 4, ['price_range_max']), ('services', 5, ['__all__']),
+             ('services', 6, ['external_id'])],
+        )
+
+        # Re-run: existing rows are updated in place, columns missing from the file are kept
+        services = self._write('services.jsonl', json.dumps({'company_slug': 'usta', 'external_id': 'K-1', 'title': 'Kombi Bakımı', 'price_range_min': '150'}))
+        self.assertEqual(self._import(self._write('firms.csv', 'name,slug,location_text\nUsta,usta,Izmir\n'), services), [])
+        service = Service.objects.get(external_id='K-1')
+        self.assertEqual((Service.objects.count(), service.price_range_min, service.category.slug), (2, Decimal('150'), 'tesisat'))
+        self.assertEqual(Company.objects.get(slug='usta').email, 'info@usta.com')
+        self.assertEqual(ServiceCard.objects.get(pk=service.pk).company_name, 'Usta')
+
+
+    def test_rows_with_different_columns_in_one_chunk_keep_omitted_values(self):
+        from core.models import Category
+
+        usta = Company.objects.get(slug='usta')
+        kept = Service.objects.create(
+            company=usta, external_id='K-1', title='Kombi', description='', keywords='kw2',
+            category=Category.objects.get(slug='tesisat'),
+        )
+        Company.objects.create(name='Diğer', slug='diger', description='Eski açıklama', location_text='Izmir')
+        companies = self._write('firms.jsonl', '\n'.join([
+            json.dumps({'name': 'Usta', 'slug': 'usta', 'location_text': 'Izmir', 'description': 'Yeni açıklama'}),
+            json.dumps({'name': 'Diğer Firma', 'slug': 'diger', 'location_text': 'Izmir'}),
+        ]))
+        services = self._write('services.jsonl', '\n'.join([
+            json.dumps({'company_slug': 'usta', 'external_id': 'K-1', 'title': 'Kombi Bakımı'}),
+            json.dumps({'company_slug': 'usta', 'external_id': 'K-2', 'title': 'Petek', 'keywords': 'petek',
+                        'category_slug': ''}),
+        ]))
+        self.assertEqual(self._import(companies, services), [])
+
+        kept.refresh_from_db()
+        self.assertEqual((kept.title, kept.keywords, kept.category.slug), ('Kombi Bakımı', 'kw2', 'tesisat'))
+        self.assertIsNone(Service.objects.get(external_id='K-2').category_id)
+        self.assertEqual(Company.objects.get(slug='diger').description, 'Eski açıklama')
+        self.assertEqual(Company.objects.get(slug='usta').description, 'Yeni açıklama')
+
+class LoadCategoriesTest(TestCase):
+    """
+    Test the set-based load_categories: bulk create/update, no-op reloads and --delete-missing.
+    """
+
+    def setUp(self):
+        import os
+        import tempfile
+        from core.models import Category
+
+        self.kept = Category.objects.create(name='Tesisat', slug='tesisat', description='Eski')
+        self.stale = Category.objects.create(name='Eski Kategori', slug='eski')
+        self.company = Company.objects.create(name='Usta', slug='usta', description='', location_text='Izmir')
+        Service.objects.create(company=self.company, category=self.kept, title='Kombi Bakımı', description='')
+        handle = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8')
+        json.dump([
+            {'name': 'Su Tesisatı', 'slug': 'tesisat', 'description': 'Yeni'},
+            {'name': 'Nakliyat', 'slug': 'nakliyat'},
+            {'slug': 'adsiz'},
+        ], handle)
+        handle.close()
+        self.path = handle.name
+        self.addCleanup(os.unlink, self.path)
+
+    def _load(self, **options):
+        import io
+        from django.core.management import call_command
+
+        out = io.StringIO()
+        call_command('load_categories', file=self.path, stdout=out, **options)
+        return out.getvalue()
+
+    def test_applies_diff_in_bulk_and_reload_is_a_single_select(self):
+        from core.models import Category, ServiceCard
+
+        self.assertIn('Would load categories: 1 new, 1 updated, 0 unchanged, 1 deleted', self._load(dry_run=True, delete_missing=True))
+        self.assertFalse(Category.objects.filter(slug='nakliyat').exists())
+
+        self.assertIn('1 new, 1 updated, 0 unchanged, 1 deleted', self._load(delete_missing=True))
+        self.assertEqual(sorted(Category.objects.values_list('slug', flat=True)), ['nakliyat', 'tesisat'])
+        created = Category.objects.get(slug='nakliyat')
+        self.assertEqual((created.path, created.description), (f'{created.pk:06d}/', ''))
+        self.assertEqual(ServiceCard.objects.get().category_name, 'Su Tesisatı')
+
+        with self.assertNumQueries(1):
+            output = self._load()
+        self.assertIn('0 new, 0 updated, 2 unchanged', output)
+
+    def test_delete_missing_refuses_to_cascade_into_kept_children(self):
+        from core.models import Category
+
+        self.kept.parent = self.stale
+        self.kept.save()
+
+        output = self._load(delete_missing=True)
+
+        self.assertIn('Refusing to delete', output)
+        self.assertIn('eski', output)
+        self.assertTrue(Category.objects.filter(slug='tesisat').exists())
+        self.assertFalse(Category.objects.filter(slug='nakliyat').exists())
+
+
+    def test_delete_missing_removes_whole_missing_subtrees(self):
+        from core.models import Category
+
+        child = Category.objects.create(name='Eski Alt', slug='eski-alt', parent=self.stale)
+        Category.objects.create(name='Eski Torun', slug='eski-torun', parent=child)
+
+        self.assertIn('3 deleted', self._load(delete_missing=True))
+        self.assertEqual(sorted(Category.objects.values_list('slug', flat=True)), ['nakliyat', 'tesisat'])
+
+class FirmEmployeeBulkOnboardingTest(TestCase):
+    """
+    Test bulk employee onboarding: per-row results, de-duplication and pooled hashing.
+    """
+
+    def setUp(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        self.firm = Firm.objects.create(name='Toplu Firma', slug='toplu-firma')
+        manager = User.objects.create_user(
+            username='manager', email='manager@example.com', password='x', firm=self.firm,
+            is_firm_manager=True, role='firm_manager',
+        )
+        User.objects.create_user(username='mevcut', email='mevcut@example.com', password='x')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(manager).access_token}'}
+
+    def test_bulk_create_reports_each_row(self):
+        items = [
+            {'username': 'ali', 'email': 'ali@example.com', 'full_name': 'Ali', 'password': 'Gizli123!'},
+            {'username': 'mevcut', 'email': 'yeni@example.com', 'full_name': 'Mevcut', 'password': 'x'},
+            {'username': 'veli', 'email': 'ALI@example.com', 'full_name': 'Veli', 'password': 'x'},
+            {'username': 'ayse', 'email': 'gecersiz', 'full_name': 'Ayşe', 'password': 'x'},
+            {'username': 'fatma', 'email': 'fatma@example.com', 'full_name': '', 'password': 'x'},
+            {'username': 'baska', 'email': 'MEVCUT@Example.com', 'full_name': 'Başka', 'password': 'x'},
+        ]
+        response = self.client.post('/api/core/firm/management/users/bulk', data=json.dumps({'items': items}),
+                                    content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        self.assertEqual((body['created'], body['rejected']), (1, 5))
+        self.assertEqual([(r['line'], r['status']) for r in body['results']],
+                         [(1, 'created'), (2, 'rejected'), (3, 'rejected'), (4, 'rejected'), (5, 'rejected'), (6, 'rejected')])
+        self.assertIn('zaten kullanımda', body['results'][5]['detail'])
+        user = User.objects.get(username='ali')
+        self.assertEqual((body['results'][0]['id'], user.firm_id, user.role), (user.id, self.firm.id, 'firm_employee'))
+        self.assertTrue(user.check_password('Gizli123!'))
+
+    def test_csv_import_hashes_passwords_in_a_process_pool(self):
+        from concurrent.futures import ProcessPoolExecutor
+        from unittest import mock
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        import firm.onboarding
+
+        def upload(prefix):
+            lines = ['username,email,full_name,password'] + [
+                f'{prefix}{n},{prefix}{n}@example.com,Teknisyen {n},Sifre{n}!' for n in range(8)
+            ]
+            return SimpleUploadedFile('users.csv', '\n'.join(lines).encode('utf-8'))
+
+        with mock.patch('firm.onboarding.HASH_POOL_MIN_ITEMS', 4), mock.patch('firm.onboarding.HASH_POOL_WORKERS', 2), \
+                mock.patch('firm.onboarding._hash_pool', None), \
+                mock.patch('firm.onboarding.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            response = self.client.post('/api/core/firm/management/users/import', {'file': upload('tek')}, **self.auth)
+            again = self.client.post('/api/core/firm/management/users/import', {'file': upload('usta')}, **self.auth)
+            firm.onboarding._hash_pool.shutdown()
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((response.json()['created'], again.json()['created']), (8, 8))
+        # Havuz ilk ihtiyaçta bir kez kurulur, sonraki istekler aynı havuzu kullanır
+        self.assertEqual(pool.call_count, 1)
+        self.assertEqual(response.json()['results'][0]['line'], 2)
+        self.assertTrue(User.objects.get(username='tek7').check_password('Sifre7!'))
+
+
+class FirmEmployeeListingTest(TestCase):
+    """
+    Test the paginated employee listing: keyset pages, prefix search, role filter and counts.
+    """
+
+    def setUp(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        firm = Firm.objects.create(name='Liste Firma', slug='liste-firma')
+        manager = User.objects.create_user(
+            username='manager', email='manager@example.com', password='x', firm=firm,
+            is_firm_manager=True, role='firm_manager',
+        )
+        for n, name in enumerate(['Ali Yılmaz', 'Ayşe Demir', 'Mehmet Ak', 'ALİCAN Kaya', 'Zeynep Can']):
+            User.objects.create_user(username=f'calisan{n}', email=f'c{n}@example.com', password='x',
+                                     full_name=name, firm=firm, role='firm_employee')
+        User.objects.create_user(username='alici', email='alici@example.com', password='x')  # başka firma değil
+        admin = User.objects.create_superuser(username='root', email='root@example.com', password='x')
+        self.manager_auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(manager).access_token}'}
+        self.admin_auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(admin).access_token}'}
+
+    def _get(self, auth, **params):
+        response = self.client.get('/api/core/firm/management/users', params, **auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_keyset_pages_cover_the_firm_in_username_order(self):
+        usernames, cursor = [], None
+        while True:
+            page = self._get(self.manager_auth, limit=2, **({'cursor': cursor} if cursor else {}))
+            self.assertEqual((page['count'], page['count_is_estimate']), (6, False))
+            usernames += [item['username'] for item in page['items']]
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(usernames, ['calisan0', 'calisan1', 'calisan2', 'calisan3', 'calisan4', 'manager'])
+
+    def test_prefix_search_and_role_filter(self):
+        page = self._get(self.manager_auth, q='al')
+        # ASCII harfler büyük/küçük harf duyarsız eşleşir; başka firmanın kullanıcısı görünmez
+        self.assertEqual([item['full_name'] for item in page['items']], ['Ali Yılmaz', 'ALİCAN Kaya'])
+        self.assertEqual([item['username'] for item in self._get(self.manager_auth, q='c3@')['items']], ['calisan3'])
+        self.assertEqual([item['username'] for item in self._get(self.manager_auth, role='firm_manager')['items']], ['manager'])
+
+    def test_superuser_gets_estimated_count(self):
+        page = self._get(self.admin_auth, limit=3)
+        self.assertTrue(page['count_is_estimate'])
+        self.assertGreaterEqual(page['count'], User.objects.count())
+        self.assertEqual(len(page['items']), 3)
+        self.assertEqual(self._get(self.admin_auth, q='alici')['count'], 1)
+        response = self.client.get('/api/core/firm/management/users', {'cursor': '***'}, **self.admin_auth)
+        self.assertEqual(response.status_code, 400)
+
+
+class FirmServiceBatchTest(TestCase):
+    """
+    Test /firm/services/batch: bulk writes, per-item results and one deferred index update.
+    """
+
+    def setUp(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+        from core.models import Category
+
+        firm = Firm.objects.create(name='Fiyat Firma', slug='fiyat-firma')
+        self.company = Company.objects.create(name='Fiyat Firma', slug='fiyat-firma', description='', location_text='Izmir')
+        other = Company.objects.create(name='Diğer', slug='diger', description='', location_text='Izmir')
+        self.category = Category.objects.create(name='Tesisat', slug='tesisat')
+        self.kombi = Service.objects.create(company=self.company, title='Kombi', description='', price_range_min=100, price_range_max=200)
+        self.petek = Service.objects.create(company=self.company, title='Petek', description='')
+        self.foreign = Service.objects.create(company=other, title='Yabancı', description='')
+        manager = User.objects.create_user(username='manager', email='manager@example.com', password='x', firm=firm,
+                                           is_firm_manager=True, role='firm_manager')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(manager).access_token}'}
+
+    def test_batch_applies_valid_operations_and_defers_indexing(self):
+        from unittest import mock
+        from core.models import ServiceCard
+
+        operations = [
+            {'op': 'create', 'title': 'Şofben', 'price_range_min': 50, 'price_range_max': 80, 'category': self.category.id},
+            {'op': 'update', 'id': self.kombi.id, 'price_range_max': 250},
+            {'op': 'delete', 'id': self.petek.id},
+            {'op': 'update', 'id': self.foreign.id, 'title': 'Ele geçir'},
+            {'op': 'update', 'id': self.kombi.id, 'title': 'İkinci kez'},
+            {'op': 'create', 'title': 'Ters', 'price_range_min': 9, 'price_range_max': 1},
+        ]
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/api/core/firm/services/batch', data=json.dumps({'operations': operations}),
+                                        content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        self.assertEqual((body['created'], body['updated'], body['deleted']), (1, 1, 1))
+        self.assertEqual([r['status'] for r in body['results']], ['ok', 'ok', 'ok', 'error', 'error', 'error'])
+
+        created = Service.objects.get(title='Şofben')
+        self.kombi.refresh_from_db()
+        self.assertEqual((self.kombi.title, self.kombi.price_range_max, self.kombi.price_range_min), ('Kombi', Decimal('250'), Decimal('100')))
+        self.assertFalse(Service.objects.filter(pk=self.petek.pk).exists())
+        self.assertEqual(ServiceCard.objects.get(pk=created.pk).category_slug, 'tesisat')
+        self.assertEqual(ServiceCard.objects.get(pk=self.kombi.pk).price_range_max, Decimal('250'))
+
+        # İndeks tek commit geri çağrısında, hizmet başına tek belge yazımıyla güncellenir
+        batch = callbacks[-1].__self__
+        self.assertEqual(batch.updated[Service], {created.pk, self.kombi.pk})
+        self.assertEqual(batch.removed[Service], {f'core.service.{self.petek.pk}'})
+        with mock.patch('haystack.backends.whoosh_backend.WhooshSearchBackend.update') as update, \
+                mock.patch('core.search._remove_documents') as remove:
+            batch.flush()
+        self.assertEqual(update.call_count, 1)
+        self.assertEqual(sorted(obj.pk for obj in update.call_args[0][1]), sorted([created.pk, self.kombi.pk]))
+        remove.assert_called_once()
+
+    def test_rejected_operations_leave_no_values_behind(self):
+        operations = [
+            {'op': 'update', 'id': self.kombi.id, 'price_range_min': 900},  # max 200'den büyük: reddedilir
+            {'op': 'update', 'id': self.petek.id, 'price_range_min': 10, 'keywords': None, 'description': None},
+            {'op': 'update', 'id': self.kombi.id, 'title': 'Kombi Bakımı'},
+            {'op': 'update', 'id': self.petek.id, 'title': None},
+        ]
+        response = self.client.post('/api/core/firm/services/batch', data=json.dumps({'operations': operations}),
+                                    content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([r['status'] for r in response.json()['results']], ['error', 'ok', 'ok', 'error'])
+        self.kombi.refresh_from_db()
+        self.petek.refresh_from_db()
+        self.assertEqual((self.kombi.title, self.kombi.price_range_min), ('Kombi Bakımı', Decimal('100')))
+        self.assertEqual((self.petek.title, self.petek.keywords, self.petek.price_range_min), ('Petek', '', Decimal('10')))
+
+
+class PartialUpdateTest(TestCase):
+    """
+    Test PATCH on company/service: only changed columns are written, no-ops write nothing,
+    and cards, versions and the search index react only to the fields they copy.
+    """
+
+    def setUp(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        firm = Firm.objects.create(name='Kısmi Firma', slug='kismi-firma')
+        self.company = Company.objects.create(name='Kısmi Firma', slug='kismi-firma', description='', location_text='Izmir')
+        self.service = Service.objects.create(company=self.company, title='Kombi', description='', price_range_min=100, price_range_max=200)
+        manager = User.objects.create_user(username='manager', email='manager@example.com', password='x', firm=firm,
+                                           is_firm_manager=True, role='firm_manager')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(manager).access_token}'}
+
+    def _patch(self, url, body):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from unittest import mock
+
+        with CaptureQueriesContext(connection) as queries, \
+                mock.patch('haystack.indexes.SearchIndex.update_object') as reindex:
+            response = self.client.patch(url, data=json.dumps(body), content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        writes = [q['sql'] for q in queries.captured_queries if q['sql'].startswith(('UPDATE', 'INSERT', 'DELETE'))]
+        return response.json(), writes, reindex.call_count
+
+    def test_company_patch_writes_only_changed_columns(self):
+        from core.versions import SERVICES, current_version
+
+        version = current_version(SERVICES)[0]
+        body, writes, reindexed = self._patch('/api/core/firm/company', {'phone': '555 00 00', 'location_text': 'Izmir'})
+        self.assertEqual(body['phone'], '555 00 00')
+        self.assertEqual(len(writes), 1)
+        self.assertIn('"phone"', writes[0])
+        self.assertNotIn('"location_text"', writes[0])
+        self.assertEqual((current_version(SERVICES)[0], reindexed), (version, 0))
+
+        _, writes, _ = self._patch('/api/core/firm/company', {'phone': '555 00 00'})
+        self.assertEqual(writes, [])
+
+        _, writes, _ = self._patch('/api/core/firm/company', {'location_text': 'Ankara'})
+        self.assertNotEqual(current_version(SERVICES)[0], version)
+        self.assertTrue(any('core_servicecard' in sql for sql in writes))
+
+    def test_service_patch_reindexes_only_searchable_changes(self):
+        from core.models import ServiceCard
+
+        body, writes, reindexed = self._patch(f'/api/core/firm/services/{self.service.id}', {'price_range_max': 250})
+        self.assertEqual((body['price_range_max'], body['price_range_min']), (250.0, 100.0))
+        self.assertEqual(ServiceCard.objects.get(pk=self.service.pk).price_range_max, Decimal('250'))
+        self.assertEqual(reindexed, 0)
+
+        _, writes, reindexed = self._patch(f'/api/core/firm/services/{self.service.id}', {'price_range_max': '250.00', 'title': 'Kombi'})
+        self.assertEqual((writes, reindexed), ([], 0))
+
+        _, writes, reindexed = self._patch(f'/api/core/firm/services/{self.service.id}', {'title': 'Kombi Bakımı'})
+        self.assertEqual(reindexed, 1)
+
+    def test_explicit_null_on_not_null_column(self):
+        # Boş bırakılabilen metin alanı '' olur; zorunlu alan 400 döner ve hiçbir şey yazılmaz
+        self.service.keywords = 'kombi'
+        self.service.save()
+        body, _, _ = self._patch(f'/api/core/firm/services/{self.service.id}', {'keywords': None})
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.keywords, '')
+        for field in ('name', 'location_text', 'description'):
+            response = self.client.patch('/api/core/firm/company', data=json.dumps({'phone': '1', field: None}),
+                                         content_type='application/json', **self.auth)
+            self.assertEqual(response.status_code, 400, field)
+        self.company.refresh_from_db()
+        self.assertIsNone(self.company.phone)
@@ -0,0 +1,81 @@
+# core/versions.py
+"""
+Liste endpointleri için koleksiyon sürüm sayaçları.
+
+Koleksiyondaki her yazma (`services`: hizmet/firma/kategori değişiklikleri, `categories`:
+kategori değişiklikleri) `CollectionVersion` satırını aynı transaction içinde bir artırır.
+Listeleme endpointleri ETag'i bu sayaçtan üretir; böylece `If-None-Match` tek satırlık
+bir sorguyla 304 olarak cevaplanabilir (bkz. core.api.conditional). Hizmet detayının
+sürümü satırların `updated_at` değerleridir; kategori silinirken (SET_NULL sinyal
+üretmez) bağlı hizmetlerin `updated_at` değeri ilerletilir.
+
+`bulk_create` / `QuerySet.update` sinyal üretmez; bu yollarla yazan kod `bump_version`
+çağırmalıdır (`core.cards.refresh_service_cards` bunu kendisi yapar).
+"""
+
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Category, CollectionVersion, Company, Service, ServiceCard
+
+SERVICES = 'services'
+CATEGORIES = 'categories'
+
+
+def bump_version(*names):
+    """Verilen koleksiyonların sürümünü bir artırır (satır yoksa oluşturur)."""
+    now = timezone.now()
+    for name in names:
+        if not CollectionVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=now):
+            CollectionVersion.objects.get_or_create(name=name, defaults={'version': 1, 'updated_at': now})
+
+
+def fields_touched(update_fields, fields):
+    """Kayıt `fields` içinden bir alanı değiştirmiş olabilir mi? (`update_fields` yoksa tüm alanlar yazılmıştır.)"""
+    return update_fields is None or not fields.isdisjoint(update_fields)
+
+
+def current_version(*names):
+    """Koleksiyonların birleşik (sürüm, son değişiklik zamanı) değerini tek sorguyla döndürür.
+
+    Sürüm "3" veya "3.12" gibi bir metindir; hiç yazılmamış koleksiyon 0 sayılır.
+    """
+    rows = {
+        name: (version, updated_at)
+        for name, version, updated_at in CollectionVersion.objects.filter(name__in=names)
+        .values_list('name', 'version', 'updated_at')
+    }
+    versions = [rows.get(name, (0, None)) for name in names]
+    last_modified = max((updated_at for _, updated_at in versions if updated_at), default=None)
+    return '.'.join(str(version) for version, _ in versions), last_modified
+
+
+@receiver(post_save, sender=Service, dispatch_uid='core.versions.service_saved')
+@receiver(post_delete, sender=Service, dispatch_uid='core.versions.service_deleted')
+def _service_changed(sender, raw=False, update_fields=None, **kwargs):
+    if not raw and fields_touched(update_fields, ServiceCard.SERVICE_SOURCE_FIELDS):
+        bump_version(SERVICES)
+
+
+@receiver(post_save, sender=Company, dispatch_uid='core.versions.company_saved')
+def _company_saved(sender, created=False, raw=False, update_fields=None, **kwargs):
+    # Yeni firmanın henüz hizmeti yoktur; listeyi etkilemez
+    if not (raw or created) and fields_touched(update_fields, ServiceCard.COMPANY_SOURCE_FIELDS):
+        bump_version(SERVICES)
+
+
+@receiver(post_save, sender=Category, dispatch_uid='core.versions.category_saved')
+@receiver(post_delete, sender=Category, dispatch_uid='core.versions.category_deleted')
+def _category_changed(sender, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    # Yeni kategori henüz hiçbir hizmete bağlı değildir
+    bump_version(*((CATEGORIES,) if created else (CATEGORIES, SERVICES)))
+
+
+@receiver(pre_delete, sender=Category, dispatch_uid='core.versions.category_deleting')
+def _category_deleting(sender, instance, **kwargs):
+    # SET_NULL hizmet satırlarını updated_at'e dokunmadan günceller; detay ETag'i eskimesin
+    Service.objects.filter(category_id=instance.pk).update(updated_at=timezone.now())
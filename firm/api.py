@@ -1,15 +1,24 @@
 # firm/api.py
 
-from ninja import Router
+from ninja import Router, File
+from ninja.files import UploadedFile
 from django.shortcuts import get_object_or_404
 from django.db import IntegrityError
+from django.db.models import Q, Value
+from django.db.models.functions import Concat, Lower
 from django.contrib.auth.hashers import make_password
-from typing import List
+from typing import List, Optional
+import base64
+import csv
 
 from users.models import User
-from firm.schemas import UserSchema, FirmEmployeeCreateSchema, FirmEmployeeUpdateSchema
+from firm.schemas import (
+    UserSchema, EmployeePageSchema, FirmEmployeeCreateSchema, FirmEmployeeUpdateSchema, FirmEmployeeBulkCreateSchema, EmployeeImportSchema,
+)
+from firm.onboarding import EMPLOYEE_BULK_MAX_ITEMS, onboard_employees, read_employee_csv
 from firm.permissions import IsFirmManager, IsFirmEmployee # Firma izinleri
 from core.api.schemas import ErrorSchema # Varsayılan hata şeması
+from core.db import estimate_count
 
 # Firmaya ait router
 router = Router(tags=["firm-management"])
@@ -18,34 +27,91 @@ router = Router(tags=["firm-management"])
 # Firma Çalışanı Yönetimi (Sadece Firma Yöneticisi Erişir)
 # =======================================================
 
+# Çalışan listesinde sayfa başına en fazla kullanıcı
+EMPLOYEE_PAGE_MAX_SIZE = 200
+
+
+def _encode_cursor(username):
+    return base64.urlsafe_b64encode(username.encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    return base64.b64decode(cursor, altchars=b'-_', validate=True).decode('utf-8')
+
+
+def _prefix_q(term):
+    """LOWER(alan) ifade indeksleriyle çalışan büyük/küçük harf duyarsız önek araması.
+
+    LIKE yerine aralık sorgusu kullanılır ([önek, önek + en büyük karakter)); terim
+    veritabanında küçültülür ki iki taraf aynı LOWER() kuralına tabi olsun.
+    """
+    low = Lower(Value(term))
+    high = Concat(low, Value('\U0010ffff'))
+    condition = Q()
+    for field in ('username', 'email', 'full_name'):
+        condition |= Q(**{f'{field}_lower__gte': low, f'{field}_lower__lt': high})
+    return condition
+
+
 @router.get(
     "/users", 
-    response={200: List[UserSchema], 403: ErrorSchema}, 
-    auth=IsFirmEmployee # Sadece bir firmaya bağlı olanlar görsün
+    response={200: EmployeePageSchema, 400: ErrorSchema, 403: ErrorSchema}, 
+    auth=IsFirmEmployee() # Sadece bir firmaya bağlı olanlar görsün
 )
-def list_firm_employees(request):
+def list_firm_employees(request, q: Optional[str] = None, role: Optional[str] = None,
+                        cursor: Optional[str] = None, limit: int = 50):
     """
     Firma Yöneticisi/Çalışanı kendi firmasına ait kullanıcıları listeler.
+
+    Kullanıcı adına göre sıralı keyset sayfalama yapılır (`cursor` = önceki sayfanın
+    `next_cursor` değeri). `q` kullanıcı adı, e-posta veya ad soyadın başıyla eşleşir;
+    `role` rol filtresidir.
     """
     user: User = request.auth
     
-    # Süper Admin ise tüm kullanıcıları getir (Test amaçlı)
+    # Süper Admin ise tüm kullanıcıları getir (firması olmayanlar dahil)
     if user.is_superuser:
-        # Süper Admin ise firması olmayanları da görmeli
-        return User.objects.all().order_by('username')
-    
+        employees = User.objects.all()
     # Firmanın ID'si üzerinden filtreleme
-    if user.firm:
-        employees = User.objects.filter(firm=user.firm).order_by('username')
-        return employees
-        
-    return 403, {"detail": "Bu işlem için bir firmaya bağlı olmanız gerekir."}
+    elif user.firm_id:
+        employees = User.objects.filter(firm_id=user.firm_id)
+    else:
+        return 403, {"detail": "Bu işlem için bir firmaya bağlı olmanız gerekir."}
+
+    if role:
+        employees = employees.filter(role=role)
+    if q and q.strip():
+        employees = employees.alias(
+            username_lower=Lower('username'), email_lower=Lower('email'), full_name_lower=Lower('full_name'),
+        ).filter(_prefix_q(q.strip()))
+
+    # Toplam sayı sayfa konumundan bağımsızdır
+    if user.is_superuser:
+        count, count_is_estimate = estimate_count(employees)
+    else:
+        count, count_is_estimate = employees.count(), False
+
+    if cursor:
+        try:
+            employees = employees.filter(username__gt=_decode_cursor(cursor))
+        except (ValueError, UnicodeDecodeError):
+            return 400, {"detail": "Geçersiz sayfa imleci."}
+
+    limit = max(1, min(limit, EMPLOYEE_PAGE_MAX_SIZE))
+    page = list(employees.order_by('username')[:limit + 1])
+    next_cursor = _encode_cursor(page[limit - 1].username) if len(page) > limit else None
+    return 200, {
+        "items": page[:limit],
+        "next_cursor": next_cursor,
+        "count": count,
+        "count_is_estimate": count_is_estimate,
+    }
 
 
 @router.post(
     "/users", 
     response={201: UserSchema, 400: ErrorSchema, 403: ErrorSchema}, 
-    auth=IsFirmManager # Sadece Firma Yöneticisi ekleyebilir
+    auth=IsFirmManager() # Sadece Firma Yöneticisi ekleyebilir
 )
 def create_firm_employee(request, payload: FirmEmployeeCreateSchema):
     """
@@ -86,10 +152,58 @@ def create_firm_employee(request, payload: FirmEmployeeCreateSchema):
         return 400, {"detail": f"Kullanıcı oluşturulurken bir hata oluştu: {str(e)}"}
 
 
+def _import_employees(manager, rows):
+    """Toplu ekleme endpointlerinin ortak gövdesi: limit kontrolü ve özet."""
+    if not manager.firm:
+        return 403, {"detail": "Bu işlemi yapmak için bir firmaya bağlı olmanız gerekir."}
+    if not rows:
+        return 400, {"detail": "En az bir çalışan gönderilmelidir."}
+    if len(rows) > EMPLOYEE_BULK_MAX_ITEMS:
+        return 400, {"detail": f"Tek seferde en fazla {EMPLOYEE_BULK_MAX_ITEMS} çalışan eklenebilir."}
+
+    try:
+        results = onboard_employees(manager.firm, rows)
+    except IntegrityError:
+        # Kontrol ile ekleme arasında aynı kullanıcı adı başka bir istekle alınmış olabilir
+        return 400, {"detail": "Veritabanı bütünlüğü hatası (Kullanıcı adı veya e-posta benzersiz değil)."}
+    created = sum(1 for result in results if result['status'] == 'created')
+    return 200, {"created": created, "rejected": len(results) - created, "results": results}
+
+
+@router.post(
+    "/users/bulk", 
+    response={200: EmployeeImportSchema, 400: ErrorSchema, 403: ErrorSchema}, 
+    auth=IsFirmManager()
+)
+def create_firm_employees_bulk(request, payload: FirmEmployeeBulkCreateSchema):
+    """
+    Firma Yöneticisi, tek istekte birden fazla çalışan ekler.
+    Geçersiz veya kullanımda olan satırlar atlanır; her satırın sonucu döner.
+    """
+    rows = [(line, item.dict()) for line, item in enumerate(payload.items, 1)]
+    return _import_employees(request.auth, rows)
+
+
+@router.post(
+    "/users/import", 
+    response={200: EmployeeImportSchema, 400: ErrorSchema, 403: ErrorSchema}, 
+    auth=IsFirmManager()
+)
+def import_firm_employees_csv(request, file: UploadedFile = File(...)):
+    """
+    Firma Yöneticisi, CSV dosyasından (username,email,full_name,password) çalışan ekler.
+    """
+    try:
+        rows = list(read_employee_csv(file.file))
+    except (UnicodeDecodeError, csv.Error):
+        return 400, {"detail": "CSV dosyası okunamadı (UTF-8 bekleniyor)."}
+    return _import_employees(request.auth, rows)
+
+
 @router.put(
     "/users/{user_id}", 
     response={200: UserSchema, 400: ErrorSchema, 403: ErrorSchema, 404: ErrorSchema}, 
-    auth=IsFirmManager # Sadece Firma Yöneticisi güncelleyebilir
+    auth=IsFirmManager() # Sadece Firma Yöneticisi güncelleyebilir
 )
 def update_firm_employee_role(request, user_id: int, payload: FirmEmployeeUpdateSchema):
     """
@@ -106,7 +220,7 @@ def update_firm_employee_role(request, user_id: int, payload: FirmEmployeeUpdate
     employee = get_object_or_404(User, id=user_id)
     
     # Yetki Kontrolü: Güncellenen kullanıcı, yöneticinin firmasına ait olmalı
-    if employee.firm != target_firm:
+    if employee.firm_id != target_firm.id:
         return 403, {"detail": "Sadece kendi firmanızın kullanıcılarını güncelleyebilirsiniz."}
         
     # Kontrol: Bir yönetici kendi yetkisini düşüremez (basit koruma)
@@ -126,7 +240,7 @@ def update_firm_employee_role(request, user_id: int, payload: FirmEmployeeUpdate
 @router.delete(
     "/users/{user_id}", 
     response={204: None, 403: ErrorSchema, 404: ErrorSchema}, 
-    auth=IsFirmManager
+    auth=IsFirmManager()
 )
 def delete_firm_employee(request, user_id: int):
     """
@@ -141,7 +255,7 @@ def delete_firm_employee(request, user_id: int):
     employee = get_object_or_404(User, id=user_id)
     
     # Yetki Kontrolü: Silinen kullanıcı, yöneticinin firmasına ait olmalı
-    if employee.firm != target_firm:
+    if employee.firm_id != target_firm.id:
         return 403, {"detail": "Sadece kendi firmanızın kullanıcılarını silebilirsiniz."}
     
     # Kontrol: Bir yönetici kendini silemez
@@ -0,0 +1,147 @@
+# firm/onboarding.py
+"""
+Toplu firma çalışanı ekleme (JSON listesi veya CSV yükleme).
+
+- Satırlar önce bellekte doğrulanır ve kendi aralarında tekilleştirilir; ardından
+  kullanıcı adları ve e-postalar veritabanına karşı birer `IN` sorgusuyla kontrol edilir.
+- Şifre hash'leme (PBKDF2) isteğin asıl maliyetidir; `HASH_POOL_MIN_ITEMS` ve üzeri
+  satırda süreç başına bir kez (ilk ihtiyaçta) kurulan, `HASH_POOL_WORKERS` ile sınırlı
+  ortak bir süreç havuzunda paralel yapılır; eşzamanlı istekler aynı havuzu paylaşır.
+  İşçiler `spawn` ile başlatılır: ASGI altında istek iş parçacığından `fork` güvenli
+  değildir. İşçiler ayarları DJANGO_SETTINGS_MODULE üzerinden okur; `override_settings`
+  onlara yansımaz.
+- Geçerli satırlar tek transaction içinde `bulk_create` ile eklenir. Her satır için
+  `created` / `rejected` sonucu döner; geçersiz satırlar diğerlerini engellemez.
+"""
+
+import atexit
+import csv
+import io
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from users.models import User
+
+# Tek istekte eklenebilecek en fazla çalışan
+EMPLOYEE_BULK_MAX_ITEMS = getattr(settings, 'FIRM_EMPLOYEE_BULK_MAX_ITEMS', 500)
+# Bu sayının altındaki şifreler süreç havuzu başlatılmadan sırayla hash'lenir
+HASH_POOL_MIN_ITEMS = getattr(settings, 'FIRM_EMPLOYEE_HASH_POOL_MIN_ITEMS', 16)
+HASH_POOL_WORKERS = getattr(settings, 'FIRM_EMPLOYEE_HASH_WORKERS', None) or min(os.cpu_count() or 1, 4)
+
+EMPLOYEE_FIELDS = ('username', 'email', 'full_name', 'password')
+
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+
+def _get_hash_pool():
+    """Süreç genelinde tek hash havuzunu ilk çağrıda kurar."""
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=HASH_POOL_WORKERS, mp_context=multiprocessing.get_context('spawn')
+            )
+            atexit.register(_hash_pool.shutdown)
+        return _hash_pool
+
+
+def _discard_hash_pool(pool):
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is pool:
+            _hash_pool = None
+
+
+def hash_passwords(passwords):
+    """Şifreleri sırayı koruyarak hash'ler; büyük listelerde ortak süreç havuzunu kullanır."""
+    passwords = list(passwords)
+    workers = min(HASH_POOL_WORKERS, math.ceil(len(passwords) / 4))
+    if len(passwords) < HASH_POOL_MIN_ITEMS or workers < 2:
+        return [make_password(password) for password in passwords]
+
+    pool = _get_hash_pool()
+    try:
+        return list(pool.map(make_password, passwords, chunksize=math.ceil(len(passwords) / workers)))
+    except BrokenProcessPool:
+        # Çöken bir işçi havuzu kullanılamaz bırakır; sonraki istek yenisini kurar
+        _discard_hash_pool(pool)
+        raise
+
+
+def read_employee_csv(file):
+    """Yüklenen CSV'yi (satır no, satır sözlüğü) çiftleri olarak okur (username,email,full_name,password)."""
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    for row in reader:
+        yield reader.line_num, {name: (row.get(name) or '').strip() for name in EMPLOYEE_FIELDS}
+
+
+def _result(line, row, status, detail=None, user_id=None):
+    return {'line': line, 'username': row.get('username') or '', 'status': status, 'id': user_id, 'detail': detail}
+
+
+def onboard_employees(firm, rows):
+    """`rows` içindeki (satır no, satır sözlüğü) çiftlerini firmaya çalışan olarak ekler.
+
+    Satır sırasıyla sonuç listesi döndürür.
+    """
+    results, accepted = {}, []
+    usernames, emails = set(), set()
+    for line, row in rows:
+        missing = [name for name in EMPLOYEE_FIELDS if not row.get(name)]
+        if missing:
+            results[line] = _result(line, row, 'rejected', f"Eksik alan: {', '.join(missing)}")
+            continue
+        try:
+            validate_email(row['email'])
+        except ValidationError:
+            results[line] = _result(line, row, 'rejected', "Geçersiz e-posta adresi.")
+            continue
+        email = row['email'].lower()
+        if row['username'] in usernames or email in emails:
+            results[line] = _result(line, row, 'rejected', "Kullanıcı adı veya e-posta dosyada birden fazla kez geçiyor.")
+            continue
+        usernames.add(row['username'])
+        emails.add(email)
+        accepted.append((line, row))
+
+    taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    # `emails` küçük harflidir; karşılaştırma Lower('email') ifade indeksini kullanır
+    taken_emails = set(
+        User.objects.annotate(email_lower=Lower('email')).filter(email_lower__in=emails)
+        .values_list('email_lower', flat=True)
+    )
+
+    pending = []
+    for line, row in accepted:
+        if row['username'] in taken_usernames or row['email'].lower() in taken_emails:
+            results[line] = _result(line, row, 'rejected', "Bu kullanıcı adı veya e-posta adresi zaten kullanımda.")
+        else:
+            pending.append((line, row))
+
+    hashes = hash_passwords(row['password'] for _, row in pending)
+    users = [
+        User(
+            username=row['username'], email=row['email'], full_name=row['full_name'], password=password,
+            role='firm_employee', firm=firm, is_staff=True, is_active=True,
+        )
+        for (_, row), password in zip(pending, hashes)
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+
+    for (line, row), user in zip(pending, users):
+        results[line] = _result(line, row, 'created', user_id=user.pk)
+    return [results[line] for line in sorted(results)]
@@ -1,25 +1,32 @@
 # firm/permissions.py
 
 from ninja.security import HttpBearer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework.exceptions import AuthenticationFailed
 from users.models import User
 
 # Kullanıcının JWT token'ı ile giriş yapıp yapmadığını ve bir firmaya bağlı olup olmadığını kontrol eder.
 # Bu, firma panelindeki tüm işlemlerin temel iznidir.
 class IsFirmEmployee(HttpBearer):
     def authenticate(self, request, token):
-        # Django Ninja, token doğrulamasını (JWT) zaten yapmıştır.
-        # Biz sadece kullanıcının bir firmaya bağlı olup olmadığını kontrol ediyoruz.
-        if not hasattr(request, 'auth') or not request.auth:
+        # Router seviyesindeki auth, API'nin GlobalAuth'unun yerine geçer;
+        # bu yüzden JWT doğrulamasını burada yapıyoruz.
+        try:
+            jwt_auth = JWTAuthentication()
+            user: User = jwt_auth.get_user(jwt_auth.get_validated_token(token))
+        except (InvalidToken, TokenError, AuthenticationFailed):
             return None # Kullanıcı doğrulanmadı
-        
-        user: User = request.auth # Doğrulanmış kullanıcı
+
+        if not user.is_active:
+            return None
         
         # Süper Adminler her şeye erişebilir (Admin Panelini atlamak için)
         if user.is_superuser:
             return user
         
         # Normal çalışan veya yönetici olmalı
-        if user.firm is not None:
+        if user.firm_id is not None:
             return user
             
         return None # Firmanın çalışanı değil
@@ -18,6 +18,38 @@ class UserSchema(Schema):
     # Sisteme ilk eklendiğinde belirlenen rol
     role: str 
 
+class EmployeePageSchema(Schema):
+    """
+    Firma çalışanı listesinin bir sayfası (keyset sayfalama)
+    """
+    items: List[UserSchema]
+    # Sonraki sayfa için `cursor` parametresi; son sayfada None
+    next_cursor: Optional[str] = None
+    # Filtreye uyan toplam kullanıcı sayısı
+    count: int
+    # Süper admin listesinde sayı tahminidir (COUNT(*) çalıştırılmaz)
+    count_is_estimate: bool = False
+
+class EmployeeImportResultSchema(Schema):
+    """
+    Toplu çalışan eklemede tek satırın sonucu
+    """
+    # JSON listesinde 1'den başlayan sıra, CSV'de dosyadaki satır numarası
+    line: int
+    username: str
+    # 'created' veya 'rejected'
+    status: str
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+class EmployeeImportSchema(Schema):
+    """
+    Toplu çalışan ekleme özeti
+    """
+    created: int
+    rejected: int
+    results: List[EmployeeImportResultSchema]
+
 class FirmSchema(Schema):
     """
     Kullanıcının bağlı olduğu Firma bilgileri şeması
@@ -37,6 +69,12 @@ class FirmEmployeeCreateSchema(Schema):
     full_name: str
     password: str
 
+class FirmEmployeeBulkCreateSchema(Schema):
+    """
+    Tek istekte birden fazla Firma Çalışanı oluşturma isteği
+    """
+    items: List[FirmEmployeeCreateSchema]
+
 class FirmEmployeeUpdateSchema(Schema):
     """
     Firma Çalışanının yetkilerini güncelleme isteği
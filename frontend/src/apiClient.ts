@@ -68,12 +68,31 @@ export async function fetchAllReferrals() {
 }
 
 // Firm employee management (mounted under /api/core/firm/management)
-export async function fetchFirmEmployees() {
-    const res = await fetch(`${API_BASE}/api/core/firm/management/users`, {
+export interface FirmEmployeeQuery {
+    q?: string;
+    role?: string;
+    cursor?: string | null;
+    limit?: number;
+}
+
+// Returns one keyset page; pass `nextCursor` back as `cursor` to load the next one.
+export async function fetchFirmEmployees({ q, role, cursor, limit = 50 }: FirmEmployeeQuery = {}) {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (q && q.trim()) params.set('q', q.trim());
+    if (role) params.set('role', role);
+    if (cursor) params.set('cursor', cursor);
+    const res = await fetch(`${API_BASE}/api/core/firm/management/users?${params}`, {
         headers: getAuthHeaders(),
     });
     if (!res.ok) throw new Error(`Failed to load employees: ${res.status}`);
-    return (await handleResponse(res)) || [];
+    // Endpoint returns a keyset page: { items, next_cursor, count, count_is_estimate }
+    const page = await handleResponse(res);
+    return {
+        items: page?.items || [],
+        nextCursor: (page?.next_cursor as string | null) || null,
+        count: (page?.count as number) || 0,
+        countIsEstimate: Boolean(page?.count_is_estimate),
+    };
 }
 
 export async function createFirmEmployee(payload: any) {
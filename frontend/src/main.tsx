@@ -2,6 +2,9 @@ import { StrictMode } from 'react';
 import { createRoot } from 'react-dom/client';
 import App from './App.tsx';
 import './index.css';
+import { installLastWriteTracking } from './utils/lastWrite';
+
+installLastWriteTracking();
 
 createRoot(document.getElementById('root')!).render(
   <StrictMode>
@@ -153,7 +153,7 @@ export default function AdminPanel() {
                                 >
                                     <div className="flex justify-between items-start mb-4">
                                         <h2 className="text-xl font-semibold text-gray-900">
-                                            {referral.requested_service.title}
+                                            {referral.requested_service?.title ?? 'Silinmiş hizmet'}
                                         </h2>
                                         {getStatusBadge(referral.status)}
                                     </div>
@@ -162,7 +162,7 @@ export default function AdminPanel() {
                                     <div className="grid grid-cols-1 md:grid-cols-2 gap-4 text-sm text-gray-700 mb-4">
                                         <p className="flex items-center">
                                             <Building2 className="w-4 h-4 mr-2 text-gray-500" />
-                                            Hedef Firma: <span className="font-medium ml-1">{referral.requested_service.company_name}</span>
+                                            Hedef Firma: <span className="font-medium ml-1">{referral.requested_service?.company_name ?? '-'}</span>
                                         </p>
                                         <p className="flex items-center">
                                             <Zap className="w-4 h-4 mr-2 text-gray-500" />
@@ -10,7 +10,7 @@ import {
 import { type IUser, type FirmEmployeeCreatePayload, type FirmEmployeeUpdatePayload } from '../types/api';
 import { useAuth } from '../hooks/useAuth'; 
 import { 
-    Users, UserPlus, Trash2, CheckCircle, XCircle, Loader2, Mail, User, Key, UserCheck, UserX 
+    Users, UserPlus, Trash2, CheckCircle, XCircle, Loader2, Mail, User, Key, UserCheck, UserX, Search
 } from 'lucide-react';
 
 // YENİ BİLEŞENLERİ İMPORT ET
@@ -54,6 +54,11 @@ export default function FirmUserManagement() {
     // Veri state'leri
     const [employees, setEmployees] = useState<IUser[]>([]);
     const [isLoading, setIsLoading] = useState(true);
+    // Sayfalama ve arama: sunucu keyset sayfası döner, sonraki sayfa istenince eklenir
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [totalCount, setTotalCount] = useState<{ count: number; estimate: boolean }>({ count: 0, estimate: false });
+    const [search, setSearch] = useState('');
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
     const [error, setError] = useState('');
     const [success, setSuccess] = useState('');
 
@@ -65,23 +70,43 @@ export default function FirmUserManagement() {
     // YENİ STATE: Silme veya Yetki değiştirme işlemi için ID tutucusu
     const [processingUserId, setProcessingUserId] = useState<number | null>(null);
 
-    // Çalışanları yükleme fonksiyonu
+    // Çalışanların ilk sayfasını (arama ile) yükleme fonksiyonu
     const loadEmployees = useCallback(async () => {
         try {
             setIsLoading(true);
-            const data = await fetchFirmEmployees();
-            setEmployees(data);
+            const page = await fetchFirmEmployees({ q: search });
+            setEmployees(page.items);
+            setNextCursor(page.nextCursor);
+            setTotalCount({ count: page.count, estimate: page.countIsEstimate });
         } catch (err) {
             const errorMessage = err instanceof Error ? err.message : 'Çalışanlar yüklenemedi';
             setError(errorMessage);
         } finally {
             setIsLoading(false);
         }
-    }, []);
+    }, [search]);
+
+    // Sonraki sayfayı mevcut listeye ekler
+    const loadMoreEmployees = async () => {
+        if (!nextCursor || isLoadingMore) return;
+        try {
+            setIsLoadingMore(true);
+            const page = await fetchFirmEmployees({ q: search, cursor: nextCursor });
+            setEmployees((current) => [...current, ...page.items]);
+            setNextCursor(page.nextCursor);
+        } catch (err) {
+            const errorMessage = err instanceof Error ? err.message : 'Çalışanlar yüklenemedi';
+            setError(errorMessage);
+        } finally {
+            setIsLoadingMore(false);
+        }
+    };
 
     useEffect(() => {
         if (isCompanyManager) {
-            loadEmployees();
+            // Yazarken her tuşta istek atmamak için kısa bekleme
+            const timer = window.setTimeout(loadEmployees, 300);
+            return () => window.clearTimeout(timer);
         } else {
             // Yönetici olmayanlar için sadece bir hata/bilgi mesajı gösterilebilir
             setIsLoading(false);
@@ -196,6 +221,22 @@ export default function FirmUserManagement() {
                 </div>
             )}
 
+            {/* Arama (kullanıcı adı, e-posta veya ad soyadın başıyla eşleşir) */}
+            <div className="flex items-center justify-between gap-4 mb-4">
+                <div className="w-full max-w-sm">
+                    <Input
+                        icon={Search}
+                        type="search"
+                        placeholder="Ad, kullanıcı adı veya e-posta ile ara"
+                        value={search}
+                        onChange={(e: React.ChangeEvent<HTMLInputElement>) => setSearch(e.target.value)}
+                    />
+                </div>
+                <span className="text-sm text-gray-500 whitespace-nowrap">
+                    {employees.length} / {totalCount.estimate ? `${totalCount.count}+` : totalCount.count} çalışan
+                </span>
+            </div>
+
             {isLoading ? (
                 <div className="text-center py-10 text-gray-500 flex items-center justify-center">
                     <Loader2 className="w-6 h-6 mr-2 animate-spin" />
@@ -277,6 +318,19 @@ export default function FirmUserManagement() {
                             })}
                         </tbody>
                     </table>
+                    {nextCursor && (
+                        <div className="flex justify-center py-4">
+                            <Button
+                                onClick={loadMoreEmployees}
+                                variant="info"
+                                isLoading={isLoadingMore}
+                                disabled={isLoadingMore}
+                                size="sm"
+                            >
+                                Daha Fazla Yükle
+                            </Button>
+                        </div>
+                    )}
                 </div>
             )}
 
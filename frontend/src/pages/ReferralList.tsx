@@ -120,7 +120,7 @@ export default function ReferralList() {
                             >
                                 <div className="flex justify-between items-start mb-3">
                                     <h2 className="text-xl font-semibold text-gray-900">
-                                        {referral.requested_service.title}
+                                        {referral.requested_service?.title ?? 'Silinmiş hizmet'}
                                     </h2>
                                     {getStatusBadge(referral.status)}
                                 </div>
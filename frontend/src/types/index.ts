@@ -64,7 +64,7 @@ export interface IReferral {
     created_at: string;
     status: 'pending' | 'approved' | 'rejected' | 'completed';
     target_company: ICompany;
-    requested_service: IService;
+    requested_service: IService | null; // null when the service was deleted
 }
 
 export interface IEmployee {
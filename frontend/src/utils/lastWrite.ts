@@ -0,0 +1,32 @@
+// Read-your-writes for the replica-routed API.
+//
+// After a write the API answers with `X-DB-Last-Write: <unix seconds>`. Echoing the
+// latest value on later requests keeps catalog reads on the primary for a few seconds,
+// so the user sees their own change. A cookie would not work here: the SPA calls the
+// API cross-origin without credentials.
+
+const HEADER = 'X-DB-Last-Write';
+const STORAGE_KEY = 'db_last_write';
+const API_BASE = import.meta.env.VITE_API_BASE_URL || 'http://127.0.0.1:8000';
+
+const isApiRequest = (input: RequestInfo | URL) => {
+    const url = input instanceof Request ? input.url : String(input);
+    return url.startsWith(API_BASE) || url.startsWith('/api');
+};
+
+export function installLastWriteTracking() {
+    const originalFetch = window.fetch.bind(window);
+
+    window.fetch = async (input: RequestInfo | URL, init: RequestInit = {}) => {
+        if (!isApiRequest(input)) return originalFetch(input, init);
+
+        const lastWrite = sessionStorage.getItem(STORAGE_KEY);
+        const headers = new Headers(init.headers || (input instanceof Request ? input.headers : undefined));
+        if (lastWrite) headers.set(HEADER, lastWrite);
+
+        const res = await originalFetch(input, { ...init, headers });
+        const written = res.headers.get(HEADER);
+        if (written) sessionStorage.setItem(STORAGE_KEY, written);
+        return res;
+    };
+}
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('firm', '0001_initial'),
+        ('users', '0002_customeraddress'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customeraddress',
+            index=models.Index(fields=['user', 'is_default', 'created_at'], name='address_user_default_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['email'], name='user_email_idx'),
+        ),
+        # FK indeksleri, yerlerini tutan bileşik indeksler oluşturulduktan sonra kaldırılır
+        migrations.AlterField(
+            model_name='customeraddress',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='addresses', to=settings.AUTH_USER_MODEL, verbose_name='Kullanıcı'),
+        ),
+    ]
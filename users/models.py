@@ -1,6 +1,7 @@
 # users/models.py
 
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
 from firm.models import Firm # YENİ OLUŞTURDUĞUMUZ FİRM MODELİNİ İMPORT ET
 
@@ -18,7 +19,9 @@ class User(AbstractUser):
         related_name='employees', 
         null=True, 
         blank=True,
-        verbose_name="Bağlı Firma"
+        verbose_name="Bağlı Firma",
+        # (firm, username) bileşik indeksi FK indeksinin yerini tutar
+        db_index=False,
     )
 
     # Firmanın kendi içinde yönetici yetkisi (Sistem Admini değil)
@@ -42,6 +45,17 @@ class User(AbstractUser):
     class Meta:
         verbose_name = "Kullanıcı"
         verbose_name_plural = "Kullanıcılar"
+        indexes = [
+            # Kayıt sırasında e-posta tekrar kontrolü (email alanı AbstractUser'da indekssiz)
+            models.Index(fields=['email'], name='user_email_idx'),
+            # Çalışan listesi: firma/rol filtresi + kullanıcı adına göre keyset sayfalama
+            models.Index(fields=['firm', 'username'], name='user_firm_username_idx'),
+            models.Index(fields=['role', 'username'], name='user_role_username_idx'),
+            # Büyük/küçük harf duyarsız önek araması (LOWER(alan) aralık sorgusu)
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+            models.Index(Lower('full_name'), name='user_full_name_lower_idx'),
+        ]
         
     # Python'un varsayılan User modelinin üzerine yazıldığı için 
     # __str__ metodunu kullanıyoruz
@@ -54,11 +68,13 @@ class CustomerAddress(models.Model):
     Müşteri adres modeli.
     Her müşteri birden fazla adres kaydedebilir (ev, iş, vb.).
     """
+    # (user, is_default, created_at) bileşik indeksi FK indeksinin yerini tutar
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='addresses',
-        verbose_name="Kullanıcı"
+        verbose_name="Kullanıcı",
+        db_index=False,
     )
     
     full_address = models.CharField(
@@ -110,6 +126,10 @@ class CustomerAddress(models.Model):
         verbose_name = "Müşteri Adresi"
         verbose_name_plural = "Müşteri Adresleri"
         ordering = ['-is_default', '-created_at']
+        indexes = [
+            # Adres listesi (varsayılan önce, en yeni önce) ve varsayılan adres sıfırlama
+            models.Index(fields=['user', 'is_default', 'created_at'], name='address_user_default_idx'),
+        ]
     
     def __str__(self):
         return f"{self.city} - {self.street} ({self.user.email})"
\ No newline at end of file